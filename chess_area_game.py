@@ -1,9 +1,79 @@
 from game_area import GameArea
+from game_constants import HEADLESS, PLAYER_HUMAN
+from chess_board import FLAG_PROMO
+from chess_render import BoardRenderer
+from colors import *
+if not HEADLESS:
+    import pygame as pg
 
 
 class GameAreaChessBoard(GameArea):
     def __init__(self, game, r):
         GameArea.__init__(self, game, r)
+        # boekzet die als tip getoond wordt (0 = geen tip)
+        self.hint_move = 0
+        # veld van het stuk dat de mens aangeklikt heeft (-1 = niets geselecteerd)
+        self.selected = -1
+        # bord en stukken worden 1 keer per veldgrootte en thema gerenderd en daarna enkel geblit
+        self.renderer = BoardRenderer()
+
+    def square_size(self):
+        return min(self.rect[2], self.rect[3]) // 8
+
+    def set_theme(self, theme):
+        self.renderer.set_theme(theme)
+        self.mark_dirty()
+
+    def square_center(self, sq):
+        # Middelpunt van een veld op het scherm, wit onderaan
+        x, y = self.rect[:2]
+        size = self.square_size()
+        return x + (sq & 7) * size + size // 2, y + (7 - (sq >> 3)) * size + size // 2
+
+    def square_at(self, mouse_x, mouse_y):
+        # Veld onder de muis, -1 buiten het bord
+        x, y = self.rect[:2]
+        size = self.square_size()
+        file, row = (mouse_x - x) // size, (mouse_y - y) // size
+        if 0 <= file < 8 and 0 <= row < 8:
+            return (7 - row) * 8 + file
+        return -1
+
+    def MOUSEBUTTONDOWN(self, mouse_x, mouse_y):
+        # Klik op een eigen stuk en dan op het doelveld; promoties worden een dame
+        game = self.game
+        board = game.chess_board
+        sq = self.square_at(mouse_x, mouse_y)
+        if sq < 0 or game.game_over or game.players[board.side] != PLAYER_HUMAN:
+            return
+        if self.selected >= 0:
+            moves = [m for m in board.legal_moves() if m & 63 == self.selected and m >> 6 & 63 == sq
+                     and (not m >> 12 & FLAG_PROMO or m >> 12 & 3 == 3)]
+            if moves:
+                self.selected = -1
+                game.play_move(moves[0])
+                return
+        piece = board.piece_at(sq)
+        self.selected = sq if piece is not None and piece[0] == board.side else -1
+        self.mark_dirty()
+
+    def hint(self):
+        # Zoekt de beste boekzet voor de stelling op het bord; geeft 0 buiten het boek of zonder boek
+        book = self.game.book
+        self.hint_move = book.pick(self.game.chess_board, best=True) if book is not None else 0
+        self.mark_dirty()
+        return self.hint_move
 
     def draw(self):
+        # De veldgrootte volgt uit de rechthoek: na set_rect rendert de renderer zelf opnieuw
+        size = self.square_size()
+        self.renderer.draw(self.game.win, self.rect[0], self.rect[1], size, self.game.chess_board.squares)
         GameArea.draw(self)
+        if self.selected >= 0:
+            cx, cy = self.square_center(self.selected)
+            pg.draw.rect(self.game.win, YELLOW, (cx - size // 2, cy - size // 2, size, size), 4)
+        if self.hint_move:
+            start = self.square_center(self.hint_move & 63)
+            end = self.square_center(self.hint_move >> 6 & 63)
+            pg.draw.line(self.game.win, GREEN, start, end, 6)
+            pg.draw.circle(self.game.win, GREEN, end, 10)
@@ -0,0 +1,625 @@
+import os
+import tempfile
+import time
+import random
+import sys
+import tracemalloc
+from chess_pieces import ChessPieceBishop, ChessPieceTower
+from chess_sliders import DIAGONAL_RAYS, ORTHOGONAL_RAYS, ray_attacks, bishop_attacks, tower_attacks
+from chess_tt import TranspositionTable, BOUND_EXACT
+from chess_board import ChessBoard, MoveStack, PIECE_CHARS, move_to_uci
+from chess_eval import evaluate, evaluate_full
+from chess_perft import PERFT_POSITIONS
+from chess_smp import ParallelSearch
+from chess_file_handler import PgnWriter, read_games, read_games_parallel
+from chess_database import GameDatabase, import_pgn
+from chess_book import OpeningBook, build_book
+from chess_tablebase import Tablebases, parse_signature
+from chess_engine import ChessEngine
+from chess_nnue import NnueBoard, NnueNetwork, random_network
+from chess_features import LinearEvaluator, MlpEvaluator, board_planes, evaluate_batch
+
+"""
+   Microbenchmarks voor de schaakmotor
+   Elke functie geeft een dict met de resultaten terug, chess_cli drukt ze af.
+"""
+
+
+def _timed(fn, repeat):
+    start = time.perf_counter()
+    fn(repeat)
+    return time.perf_counter() - start
+
+
+def walk_attacks(vectors, sq, occupied):
+    # Naieve aanpak zoals repeat_moves in chess_pieces: veld per veld verder schuiven tot er iets in de weg staat
+    attacks = 0
+    rank, file = divmod(sq, 8)
+    for d_rank, d_file in vectors:
+        r, f = rank + d_rank, file + d_file
+        while 0 <= r < 8 and 0 <= f < 8:
+            bit = 1 << (r * 8 + f)
+            attacks |= bit
+            if occupied & bit:
+                break
+            r, f = r + d_rank, f + d_file
+    return attacks
+
+
+def bench_sliders(samples=2000, repeat=20, seed=1):
+    """
+    Vergelijkt de aanvallen van lopers en torens: veld per veld wandelen, stralen met eerste blokkeerder,
+    en de bezettingstabellen. Gebruikt willekeurige bezettingen (ongeveer 1 op 4 velden bezet).
+    """
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(samples):
+        occupied = rng.getrandbits(64) & rng.getrandbits(64)
+        cases.append((rng.randrange(64), occupied))
+    bishop_vectors = ChessPieceBishop(None).possible_moves
+    tower_vectors = ChessPieceTower(None).possible_moves
+
+    def run_walk(n):
+        for _ in range(n):
+            for sq, occupied in cases:
+                walk_attacks(bishop_vectors, sq, occupied)
+                walk_attacks(tower_vectors, sq, occupied)
+
+    def run_rays(n):
+        for _ in range(n):
+            for sq, occupied in cases:
+                ray_attacks(DIAGONAL_RAYS, sq, occupied)
+                ray_attacks(ORTHOGONAL_RAYS, sq, occupied)
+
+    def run_table(n):
+        for _ in range(n):
+            for sq, occupied in cases:
+                bishop_attacks(sq, occupied)
+                tower_attacks(sq, occupied)
+
+    # eerst nagaan dat de drie methodes hetzelfde resultaat geven
+    for sq, occupied in cases:
+        expected = walk_attacks(bishop_vectors, sq, occupied), walk_attacks(tower_vectors, sq, occupied)
+        assert (bishop_attacks(sq, occupied), tower_attacks(sq, occupied)) == expected
+        assert (ray_attacks(DIAGONAL_RAYS, sq, occupied), ray_attacks(ORTHOGONAL_RAYS, sq, occupied)) == expected
+
+    lookups = 2 * samples * repeat
+    results = {}
+    for name, fn in (("walk", run_walk), ("rays", run_rays), ("table", run_table)):
+        results[name + "_per_sec"] = lookups / _timed(fn, repeat)
+    results["speedup_vs_walk"] = results["table_per_sec"] / results["walk_per_sec"]
+    return results
+
+
+def bench_tt(size_mb, operations=200000, key_space=None, seed=1):
+    """
+    Store en probe van willekeurige sleutels. Met key_space groter dan het aantal entries
+    zie je de vervangingsstrategie aan het werk (overwrites, hit rate).
+    """
+    rng = random.Random(seed)
+    tt = TranspositionTable(size_mb)
+    if key_space is None:
+        key_space = 2 * tt.buckets
+    keys = [rng.getrandbits(64) for _ in range(key_space)]
+    work = [(keys[rng.randrange(key_space)], rng.randrange(1, 20)) for _ in range(operations)]
+
+    def run(n):
+        for key, depth in work:
+            if tt.probe(key) is None:
+                tt.store(key, depth, BOUND_EXACT, depth * 10, depth)
+
+    results = {"operations_per_sec": operations / _timed(run, 1)}
+    results.update(tt.stats())
+    return results
+
+
+def bench_smp(max_threads, depth, size_mb, names=("startpos", "kiwipete", "position3", "position4")):
+    """
+    Lazy SMP schaling: tijd tot de hoofdzoeker diepte depth afwerkt, met 1 tot max_threads processen.
+    De tabel wordt voor elke stelling leeggemaakt zodat elke meting van nul begint.
+    """
+    results = {}
+    base_time = None
+    for threads in range(1, max_threads + 1):
+        with ParallelSearch(threads, size_mb) as smp:
+            seconds, nodes = 0.0, 0
+            for name in names:
+                smp.clear()
+                start = time.perf_counter()
+                result = smp.search(ChessBoard(PERFT_POSITIONS[name][0]), max_depth=depth)
+                seconds += time.perf_counter() - start
+                nodes += result["nodes"]
+        if base_time is None:
+            base_time = seconds
+        results[f"threads_{threads}_seconds"] = seconds
+        results[f"threads_{threads}_nps"] = nodes / seconds
+        results[f"threads_{threads}_speedup"] = base_time / seconds
+    return results
+
+
+def bench_ordering(depth, size_mb, names=("startpos", "kiwipete", "position3", "position4")):
+    """
+    Zetvolgorde (chess_ordering) per stelling: knopen en tijd tot diepte depth, first-move cutoff rate,
+    effectieve vertakkingsfactor van de laatste iteratie en hoeveel knopen geen stille zetten genereerden.
+    """
+    results = {}
+    total_nodes = total_seconds = 0
+    for name in names:
+        engine = ChessEngine(TranspositionTable(size_mb))
+        start = time.perf_counter()
+        engine.think(ChessBoard(PERFT_POSITIONS[name][0]), max_depth=depth)
+        seconds = time.perf_counter() - start
+        stats = engine.ordering.stats()
+        results[f"{name}_nodes"] = engine.nodes
+        results[f"{name}_seconds"] = seconds
+        results[f"{name}_first_move_cutoffs"] = stats["first_move_cutoff_rate"]
+        results[f"{name}_ebf"] = engine.branching_factor()
+        results[f"{name}_quiets_saved"] = stats["quiet_generations_saved"] / max(engine.ordering.nodes, 1)
+        total_nodes += engine.nodes
+        total_seconds += seconds
+    results["total_nodes"] = total_nodes
+    results["total_seconds"] = total_seconds
+    return results
+
+
+def _walk_lists(board, depth):
+    # Zoals perft: de laatste ply wordt gegenereerd en geteld, niet gespeeld, zodat de zetgeneratie het werk is
+    if depth == 1:
+        return len(board.legal_moves())
+    nodes = 0
+    for move in board.legal_moves():
+        board.make_move(move)
+        nodes += _walk_lists(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def _walk_buffers(board, stack, depth, ply=0):
+    moves = stack.moves[ply]
+    if depth == 1:
+        return board.legal_moves_into(moves, 0)
+    nodes = 0
+    for i in range(board.legal_moves_into(moves, 0)):
+        board.make_move(moves[i])
+        nodes += _walk_buffers(board, stack, depth - 1, ply + 1)
+        board.unmake_move()
+    return nodes
+
+
+def _walk_allocations(board, stack, depth, stats, ply=0):
+    """
+    Zelfde boom als hierboven, maar meet hoeveel geheugen (bytes en blokken) de zetgeneratie per knoop bijhoudt.
+    stack None = legal_moves (nieuwe lijst), anders legal_moves_into de buffer van de ply.
+    stats = [knopen met zetgeneratie, bytes, blokken]
+    """
+    if depth == 0:
+        return
+    bytes_before = tracemalloc.get_traced_memory()[0]
+    blocks_before = sys.getallocatedblocks()
+    if stack is None:
+        moves = board.legal_moves()
+        count = len(moves)
+    else:
+        moves = stack.moves[ply]
+        count = board.legal_moves_into(moves, 0)
+    stats[0] += 1
+    stats[1] += tracemalloc.get_traced_memory()[0] - bytes_before
+    stats[2] += sys.getallocatedblocks() - blocks_before
+    for i in range(count):
+        board.make_move(moves[i])
+        _walk_allocations(board, stack, depth - 1, stats, ply + 1)
+        board.unmake_move()
+
+
+def bench_move_buffers(depth=3, names=("startpos", "kiwipete", "position4"), repeat=5, generations=2000):
+    """
+    Boom doorlopen met een nieuwe zetlijst per knoop (legal_moves) tegenover de herbruikte MoveStack buffers,
+    en enkel de zetgeneratie (generations keer per stelling). De varianten lopen om beurten, repeat keer,
+    en de beste tijd telt: een enkele meting verschilt tussen twee runs meer dan de varianten onderling.
+    Het geheugen dat de zetgeneratie per knoop aanmaakt wordt daarna apart gemeten met tracemalloc (bytes)
+    en sys.getallocatedblocks (blokken), voor beide varianten op dezelfde manier.
+    """
+    results = {}
+    stack = MoveStack()
+    boards = [ChessBoard(PERFT_POSITIONS[name][0]) for name in names]
+    variants = (("lists", lambda b: _walk_lists(b, depth), lambda b: b.legal_moves(), None),
+                ("buffers", lambda b: _walk_buffers(b, stack, depth),
+                 lambda b: b.legal_moves_into(stack.moves[0], 0), stack))
+
+    best = {}
+    for i in range(repeat):
+        for label, walk, generate, _ in variants if i % 2 == 0 else variants[::-1]:
+            start = time.perf_counter()
+            nodes = sum(walk(board) for board in boards)
+            walk_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(generations):
+                for board in boards:
+                    generate(board)
+            generate_seconds = time.perf_counter() - start
+            walk_best, generate_best = best.get(label, (walk_seconds, generate_seconds))
+            best[label] = (min(walk_best, walk_seconds), min(generate_best, generate_seconds))
+            results[label + "_nodes"] = nodes
+
+    for label, _, _, buffers in variants:
+        walk_seconds, generate_seconds = best[label]
+        results[label + "_nodes_per_sec"] = results[label + "_nodes"] / walk_seconds
+        results[label + "_generations_per_sec"] = generations * len(boards) / generate_seconds
+
+        stats = [0, 0, 0]
+        tracemalloc.start()
+        try:
+            for name in names:
+                _walk_allocations(ChessBoard(PERFT_POSITIONS[name][0]), buffers, depth, stats)
+        finally:
+            tracemalloc.stop()
+        results[label + "_bytes_per_node"] = stats[1] / stats[0]
+        results[label + "_blocks_per_node"] = stats[2] / stats[0]
+    return results
+
+
+def _sample_positions(count, seed=1):
+    # Stellingen uit willekeurige partijen vanaf de teststellingen
+    rng = random.Random(seed)
+    fens = [fen for fen, _ in PERFT_POSITIONS.values()]
+    boards = []
+    while len(boards) < count:
+        board = ChessBoard(rng.choice(fens))
+        for _ in range(rng.randrange(40)):
+            moves = board.legal_moves()
+            if not moves:
+                break
+            board.make_move(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+
+def bench_eval(positions=500, repeat=20):
+    """
+    Evaluaties per seconde: alles herberekenen over 64 velden tegenover de accumulatoren van het bord lezen.
+    """
+    boards = _sample_positions(positions)
+    for board in boards:
+        assert evaluate(board) == evaluate_full(board)
+
+    def run_full(n):
+        for _ in range(n):
+            for board in boards:
+                evaluate_full(board)
+
+    def run_incremental(n):
+        for _ in range(n):
+            for board in boards:
+                evaluate(board)
+
+    evaluations = positions * repeat
+    results = {
+        "full_per_sec": evaluations / _timed(run_full, repeat),
+        "incremental_per_sec": evaluations / _timed(run_incremental, repeat),
+    }
+    results["speedup"] = results["incremental_per_sec"] / results["full_per_sec"]
+    return results
+
+
+def bench_batch_eval(positions=4096, repeat=5):
+    """
+    Stellingen per seconde: chess_eval.evaluate_full per bord tegenover numpy over de hele batch
+    (kenmerken uit de bitborden, dan de PST als lineaire evaluator en een klein MLP).
+    """
+    boards = _sample_positions(positions)
+    linear = LinearEvaluator.from_pst()
+    mlp = MlpEvaluator.random()
+    assert evaluate_batch(linear, boards).tolist() == [evaluate(board) for board in boards]
+    planes = board_planes(boards)
+
+    def run_python(n):
+        for _ in range(n):
+            for board in boards:
+                evaluate_full(board)
+
+    def run_planes(n):
+        for _ in range(n):
+            board_planes(boards)
+
+    def run_linear(n):
+        for _ in range(n):
+            linear(planes)
+
+    def run_mlp(n):
+        for _ in range(n):
+            mlp(planes)
+
+    def run_batch(n):
+        for _ in range(n):
+            evaluate_batch(linear, boards)
+
+    evaluations = positions * repeat
+    results = {
+        "python_per_sec": evaluations / _timed(run_python, repeat),
+        "planes_per_sec": evaluations / _timed(run_planes, repeat),
+        "linear_per_sec": evaluations / _timed(run_linear, repeat),
+        "mlp_per_sec": evaluations / _timed(run_mlp, repeat),
+        "batch_per_sec": evaluations / _timed(run_batch, repeat),
+    }
+    results["speedup"] = results["batch_per_sec"] / results["python_per_sec"]
+    return results
+
+
+def bench_nnue(positions=200, repeat=3, path=None):
+    """
+    make + evaluate + unmake voor elke legale zet van de teststellingen:
+    PST (chess_eval), het netwerk volledig herberekend, en het netwerk met incrementele accumulators.
+    Zonder path wordt een willekeurig netwerk gebruikt (de snelheid hangt niet af van de gewichten).
+    """
+    temp = None
+    if path is None:
+        path = temp = _temp_file(".nnue")
+        random_network(path)
+    try:
+        network = NnueNetwork(path)
+        boards = _sample_positions(positions)
+        nnue_boards = [NnueBoard(board.fen(), network) for board in boards]
+        work = [(board, board.legal_moves()) for board in boards]
+        nnue_work = [(board, board.legal_moves()) for board in nnue_boards]
+        for board, moves in nnue_work:
+            for move in moves:
+                board.make_move(move)
+                assert board.evaluate() == network.evaluate_full(board)
+                board.unmake_move()
+
+        def run(items, evaluate_fn):
+            def walk(n):
+                for _ in range(n):
+                    for board, moves in items:
+                        for move in moves:
+                            board.make_move(move)
+                            evaluate_fn(board)
+                            board.unmake_move()
+            return walk
+
+        evaluations = repeat * sum(len(moves) for _, moves in work)
+        results = {
+            "evaluations": evaluations,
+            "hidden": network.hidden,
+            "pst_per_sec": evaluations / _timed(run(work, evaluate), repeat),
+            "nnue_full_per_sec": evaluations / _timed(run(work, network.evaluate_full), repeat),
+            "nnue_incremental_per_sec": evaluations / _timed(run(nnue_work, NnueBoard.evaluate), repeat),
+        }
+        results["incremental_speedup"] = results["nnue_incremental_per_sec"] / results["nnue_full_per_sec"]
+        results["cost_vs_pst"] = results["pst_per_sec"] / results["nnue_incremental_per_sec"]
+        del network
+        return results
+    finally:
+        if temp is not None:
+            os.remove(temp)
+
+
+def _random_game(rng, max_plies=120):
+    # Willekeurige legale partij, als (headers, zetten in SAN, resultaat)
+    board = ChessBoard()
+    moves = []
+    result = "1/2-1/2"
+    for _ in range(max_plies):
+        legal = board.legal_moves()
+        if not legal:
+            result = ("0-1", "1-0")[board.side] if board.in_check() else "1/2-1/2"
+            break
+        move = rng.choice(legal)
+        moves.append(board.san(move))
+        board.make_move(move)
+    headers = {"Event": "bench", "Site": "TuringChessMate", "Date": "2024.01.01",
+               "White": f"player{rng.randrange(1000)}", "Black": f"player{rng.randrange(1000)}",
+               "WhiteElo": str(rng.randrange(1200, 2800)), "BlackElo": str(rng.randrange(1200, 2800))}
+    return headers, moves, result
+
+
+def _random_games(count, seed=1):
+    rng = random.Random(seed)
+    return [_random_game(rng) for _ in range(count)]
+
+
+def _write_pgn(path, samples, games):
+    # games partijen, de voorbeelden herhaald met een ander rondenummer
+    with PgnWriter(path) as writer:
+        for i in range(games):
+            headers, moves, result = samples[i % len(samples)]
+            headers["Round"] = str(i + 1)
+            writer.write_game(headers, moves, result)
+
+
+def _temp_file(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def _count_moves(game):
+    # op moduleniveau zodat de procespool ze kan oproepen
+    return len(game.moves)
+
+
+def bench_pgn(games=20000, unique=100, processes=None, replay=200, seed=1):
+    """
+    Schrijft games partijen (unique verschillende willekeurige partijen, herhaald) naar een tijdelijk PGN bestand
+    en leest ze terug: enkel de tags, met de zettekst ontleed, en ontleed over een procespool.
+    replay partijen worden ook nagespeeld (SAN naar zetten op het bord), dat is het duurste deel.
+    """
+    samples = _random_games(unique, seed)
+    path = _temp_file(".pgn")
+    results = {}
+    try:
+        start = time.perf_counter()
+        _write_pgn(path, samples, games)
+        results["write_games_per_sec"] = games / (time.perf_counter() - start)
+        results["file_mb"] = os.path.getsize(path) / (1 << 20)
+
+        start = time.perf_counter()
+        count = sum(1 for _ in read_games(path, headers_only=True))
+        results["headers_games_per_sec"] = count / (time.perf_counter() - start)
+        assert count == games
+
+        start = time.perf_counter()
+        plies = sum(len(game.moves) for game in read_games(path))
+        results["parse_games_per_sec"] = games / (time.perf_counter() - start)
+        assert plies == sum(len(samples[i % unique][1]) for i in range(games))
+
+        start = time.perf_counter()
+        parallel_plies = sum(read_games_parallel(path, _count_moves, processes=processes,
+                                                 chunk_bytes=max(os.path.getsize(path) // 64, 1 << 16)))
+        results["parallel_games_per_sec"] = games / (time.perf_counter() - start)
+        assert parallel_plies == plies
+
+        start = time.perf_counter()
+        replayed = 0
+        for game in read_games(path):
+            if replayed == replay:
+                break
+            for _ in game.replay():
+                pass
+            replayed += 1
+        results["replay_games_per_sec"] = replayed / (time.perf_counter() - start)
+    finally:
+        os.remove(path)
+    results["plies"] = plies
+    return results
+
+
+def bench_database(games=5000, unique=200, lookups=20000, processes=None, seed=1):
+    """
+    PGN naar binaire databank: omzetsnelheid, grootte per zet, en opzoekingen per seconde in de stellingsindex.
+    De gezochte stellingen komen uit de partijen zelf, de helft uit het eerste deel van de partij.
+    """
+    samples = _random_games(unique, seed)
+    pgn_path = _temp_file(".pgn")
+    db_path = _temp_file(".tcdb")
+    try:
+        _write_pgn(pgn_path, samples, games)
+        start = time.perf_counter()
+        results = import_pgn(pgn_path, db_path, processes=processes)
+        results["import_games_per_sec"] = games / (time.perf_counter() - start)
+        results["pgn_bytes"] = os.path.getsize(pgn_path)
+
+        rng = random.Random(seed)
+        keys = []
+        for _ in range(lookups):
+            headers, moves, result = rng.choice(samples)
+            board = ChessBoard()
+            for san in moves[:rng.randrange(min(len(moves), 20) if rng.random() < 0.5 else len(moves)) + 1]:
+                board.make_move(board.parse_san(san))
+            keys.append(board.key)
+
+        start = time.perf_counter()
+        with GameDatabase(db_path) as db:
+            results["open_seconds"] = time.perf_counter() - start
+            # zonder de index: zetten, tags en offsets per zet
+            results["game_bytes_per_ply"] = (db.offsets[len(db)] - db.offsets[0]) / results["plies"]
+            start = time.perf_counter()
+            found = sum(db.count(key) for key in keys)
+            results["lookups_per_sec"] = lookups / (time.perf_counter() - start)
+            results["average_games_per_lookup"] = found / lookups
+            start = time.perf_counter()
+            for key in keys[:1000]:
+                for game_id in db.find(key, limit=10):
+                    db.headers(game_id)
+                    db.moves(game_id)
+            results["find_and_load_per_sec"] = min(lookups, 1000) / (time.perf_counter() - start)
+    finally:
+        os.remove(pgn_path)
+        os.remove(db_path)
+    return results
+
+
+def bench_book(games=5000, unique=500, probes=20000, processes=None, seed=1):
+    """
+    Boek bouwen uit een PGN bestand en probes per seconde, half in en half buiten het boek.
+    """
+    samples = _random_games(unique, seed)
+    pgn_path = _temp_file(".pgn")
+    book_path = _temp_file(".bin")
+    try:
+        _write_pgn(pgn_path, samples, games)
+        start = time.perf_counter()
+        results = build_book(pgn_path, book_path, processes=processes)
+        results["build_games_per_sec"] = games / (time.perf_counter() - start)
+
+        rng = random.Random(seed)
+        boards = []
+        for _ in range(200):
+            headers, moves, result = rng.choice(samples)
+            board = ChessBoard()
+            for san in moves[:rng.randrange(30)]:
+                board.make_move(board.parse_san(san))
+            boards.append(board)
+        keys = [boards[i % len(boards)].key if i % 2 else rng.getrandbits(64) for i in range(probes)]
+
+        start = time.perf_counter()
+        with OpeningBook(book_path) as book:
+            results["open_seconds"] = time.perf_counter() - start
+            start = time.perf_counter()
+            hits = sum(1 for key in keys if book.entries(key))
+            results["probes_per_sec"] = probes / (time.perf_counter() - start)
+            results["hit_rate"] = hits / probes
+            start = time.perf_counter()
+            for board in boards:
+                book.pick(board, rng)
+            results["picks_per_sec"] = len(boards) / (time.perf_counter() - start)
+    finally:
+        os.remove(pgn_path)
+        os.remove(book_path)
+    return results
+
+
+def _random_endgame(signature, rng):
+    # Willekeurige geldige stelling met het materiaal van een tabel, wit of zwart als sterkste kant
+    pieces = parse_signature(signature)
+    while True:
+        squares = rng.sample(range(64), len(pieces))
+        if any(piece_type == 0 and not 8 <= sq < 56 for (_, piece_type), sq in zip(pieces, squares)):
+            continue
+        swap = rng.random() < 0.5
+        rows = []
+        for rank in range(7, -1, -1):
+            row, empty = "", 0
+            for file in range(8):
+                sq = rank * 8 + file
+                if sq in squares:
+                    side, piece_type = pieces[squares.index(sq)]
+                    row += (str(empty) if empty else "") + PIECE_CHARS[side * 6 + piece_type]
+                    empty = 0
+                else:
+                    empty += 1
+            rows.append(row + (str(empty) if empty else ""))
+        if swap:
+            rows = [row.swapcase() for row in reversed(rows)]
+        board = ChessBoard("/".join(rows) + " " + rng.choice("wb") + " - - 0 1")
+        if not board.in_check(board.side ^ 1):
+            return board
+
+
+def bench_tablebase(directory, probes=20000, depth=5, seed=1):
+    """
+    Opzoekingen per seconde in de tabellen van directory op willekeurige geldige stellingen,
+    en een zoektocht in een toren-eindspel (mat in 16) met en zonder de tabellen.
+    """
+    rng = random.Random(seed)
+    results = {}
+    with Tablebases(directory) as tb:
+        for signature in sorted(tb.paths, key=lambda s: (len(s), s)):
+            boards = [_random_endgame(signature, rng) for _ in range(min(probes, 2000))]
+            start = time.perf_counter()
+            for i in range(probes):
+                tb.probe(boards[i % len(boards)])
+            results[signature + "_probes_per_sec"] = probes / (time.perf_counter() - start)
+
+        if "KRK" in tb.paths:
+            board = ChessBoard("8/8/8/4k3/8/8/8/R3K3 w - - 0 1")
+            for label, tablebase in (("without", None), ("with", tb)):
+                engine = ChessEngine()
+                engine.tablebase = tablebase
+                engine.think(board, max_depth=depth)
+                info = engine.info()
+                results[f"krk_{label}_score"] = info["score"]
+                results[f"krk_{label}_nodes"] = info["nodes"]
+                results[f"krk_{label}_seconds"] = info["time"]
+                results[f"krk_{label}_move"] = move_to_uci(engine.best_move)
+    return results
@@ -1,3 +1,973 @@
+import random
+from chess_pieces import ChessPieceKing, ChessPieceKnight, ChessPiecePawn
+from chess_eval import PST_MG, PST_EG, PHASE_BY_CODE
+from chess_sliders import bishop_attacks, tower_attacks, BISHOP_TABLE, TOWER_TABLE, BISHOP_MASKS, TOWER_MASKS, \
+    BETWEEN, LINE
+
+"""
+   ChessBoard: het schaakbord als bitboards
+   Elk stuktype heeft per kleur een 64-bit integer, bit n staat aan als er op veld n zo een stuk staat.
+   Veld 0 = a1, veld 7 = h1, veld 63 = h8 (rank * 8 + file)
+
+   De aanvalstabellen voor paard, koning en pion worden 1 keer berekend uit de zet-vectoren van chess_pieces.
+   Lopers, torens en dames gebruiken de bezettingstabellen van chess_sliders.
+   Zetten worden als 16-bit integers gecodeerd: van (6 bits) | naar (6 bits) | vlag (4 bits)
+
+   make_move/unmake_move passen het bord ter plaatse aan met een undo-stapel,
+   en houden een 64-bit Zobrist sleutel bij als identiteit van de stelling.
+   Ook de evaluatie (chess_eval) wordt zo bijgehouden: mg_score, eg_score en phase.
+"""
+
+SIDE_WHITE, SIDE_BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, TOWER, QUEEN, KING = range(6)
+EMPTY = -1
+# FEN letters, index = side * 6 + piece type
+PIECE_CHARS = "PNBRQKpnbrqk"
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+BB_ALL = 0xFFFFFFFFFFFFFFFF
+BB_FILE_A = 0x0101010101010101
+BB_FILE_H = BB_FILE_A << 7
+BB_RANK_1 = 0xFF
+BB_RANK_3 = BB_RANK_1 << 16
+BB_RANK_6 = BB_RANK_1 << 40
+BB_RANK_8 = BB_RANK_1 << 56
+
+# Castling rights as bit flags
+CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ = 1, 2, 4, 8
+
+# Move flags (bits 12..15)
+FLAG_QUIET = 0
+FLAG_DOUBLE_PUSH = 1
+FLAG_CASTLE_KING = 2
+FLAG_CASTLE_QUEEN = 3
+FLAG_CAPTURE = 4
+FLAG_EP_CAPTURE = 5
+FLAG_PROMO = 8              # + promotion piece (0 = knight .. 3 = queen), + FLAG_CAPTURE for capture promotions
+FLAG_PROMO_CAPTURE = 12
+
+# Soorten zetten voor legal_moves
+GEN_ALL, GEN_CAPTURES, GEN_QUIETS = 0, 1, 2
+# Meer legale zetten dan dit bestaan er niet (het maximum is 218)
+MAX_MOVES = 256
+MAX_PLY = 128
+
+SQUARE_NAMES = [f + r for r in "12345678" for f in "abcdefgh"]
+
+
+def square(file, rank):
+    return rank * 8 + file
+
+
+def square_from_name(name):
+    return SQUARE_NAMES.index(name)
+
+
+def encode_move(frm, to, flag=FLAG_QUIET):
+    return frm | to << 6 | flag << 12
+
+
+def move_from(move):
+    return move & 63
+
+
+def move_to(move):
+    return move >> 6 & 63
+
+
+def move_flag(move):
+    return move >> 12
+
+
+def move_promotion(move):
+    # Returns the promotion piece type, or EMPTY
+    flag = move >> 12
+    return KNIGHT + (flag & 3) if flag & FLAG_PROMO else EMPTY
+
+
+def move_to_uci(move):
+    uci = SQUARE_NAMES[move & 63] + SQUARE_NAMES[move >> 6 & 63]
+    if move >> 12 & FLAG_PROMO:
+        uci += "nbrq"[move >> 12 & 3]
+    return uci
+
+
+def iter_bits(bb):
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def popcount(bb):
+    return bb.bit_count()
+
+
+def _step_attacks(vectors, forward=1):
+    # Bouwt per veld het bitboard van de velden die met 1 stap bereikt worden.
+    # Een vector is (d_rank, d_file); voor zwarte pionnen keert forward de richting om.
+    table = [0] * 64
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        for d_rank, d_file in vectors:
+            r, f = rank + d_rank * forward, file + d_file
+            if 0 <= r < 8 and 0 <= f < 8:
+                table[sq] |= 1 << square(f, r)
+    return table
+
+
+KNIGHT_ATTACKS = _step_attacks(ChessPieceKnight(None).possible_moves)
+KING_ATTACKS = _step_attacks(ChessPieceKing(None).possible_moves)
+_pawn = ChessPiecePawn(None)
+PAWN_ATTACKS = [_step_attacks(_pawn.capture_moves, 1), _step_attacks(_pawn.capture_moves, -1)]
+
+
+# Castling rights that survive a move from/to a square (king or tower moved or captured)
+CASTLING_KEEP = [15] * 64
+CASTLING_KEEP[0] &= ~CASTLE_WQ
+CASTLING_KEEP[7] &= ~CASTLE_WK
+CASTLING_KEEP[4] &= ~(CASTLE_WK | CASTLE_WQ)
+CASTLING_KEEP[56] &= ~CASTLE_BQ
+CASTLING_KEEP[63] &= ~CASTLE_BK
+CASTLING_KEEP[60] &= ~(CASTLE_BK | CASTLE_BQ)
+
+# Tower move when castling, indexed by king destination: (from, to)
+CASTLING_TOWER = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+# Zobrist keys, fixed seed so keys are identical between runs (opening book, databases, ...)
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_PIECES = [[_zobrist_rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+ZOBRIST_CASTLING = [_zobrist_rng.getrandbits(64) for _ in range(16)]
+ZOBRIST_EP_FILE = [_zobrist_rng.getrandbits(64) for _ in range(8)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+
+
+# Squares that must be empty / not attacked for castling: (right, king from, king to, empty mask, safe squares, flag)
+_CASTLING = [
+    [(CASTLE_WK, 4, 6, 0x60, (4, 5, 6), FLAG_CASTLE_KING),
+     (CASTLE_WQ, 4, 2, 0x0E, (4, 3, 2), FLAG_CASTLE_QUEEN)],
+    [(CASTLE_BK, 60, 62, 0x60 << 56, (60, 61, 62), FLAG_CASTLE_KING),
+     (CASTLE_BQ, 60, 58, 0x0E << 56, (60, 59, 58), FLAG_CASTLE_QUEEN)],
+]
+
+
+# Zetten van 1 stuk naar een set doelvelden, als tuple die in 1 slice-toekenning in de zetbuffer gaat.
+# Sleutel: doelvelden << 7 | vertrekveld << 1 | slag. Wordt gaandeweg gevuld en leeggemaakt boven de limiet.
+TARGET_MOVES_LIMIT = 1 << 17
+_target_moves = {}
+
+
+def _new_target_moves(key):
+    if len(_target_moves) >= TARGET_MOVES_LIMIT:
+        _target_moves.clear()
+    frm = key >> 1 & 63
+    flag = FLAG_CAPTURE << 12 if key & 1 else 0
+    moves = []
+    targets = key >> 7
+    while targets:
+        t = targets & -targets
+        targets ^= t
+        moves.append(frm | (t.bit_length() - 1) << 6 | flag)
+    moves = _target_moves[key] = tuple(moves)
+    return moves
+
+
+# Idem voor pionnen die allemaal over dezelfde afstand gaan: sleutel doelvelden << 4 | index in _PAWN_SHIFTS
+_PAWN_SHIFTS = ((8, 0), (-8, 0), (16, FLAG_DOUBLE_PUSH << 12), (-16, FLAG_DOUBLE_PUSH << 12),
+                (7, FLAG_CAPTURE << 12), (9, FLAG_CAPTURE << 12), (-9, FLAG_CAPTURE << 12), (-7, FLAG_CAPTURE << 12))
+_pawn_moves = {}
+
+
+def _new_pawn_moves(key):
+    if len(_pawn_moves) >= TARGET_MOVES_LIMIT:
+        _pawn_moves.clear()
+    delta, flag = _PAWN_SHIFTS[key & 15]
+    moves = []
+    targets = key >> 4
+    while targets:
+        t = targets & -targets
+        targets ^= t
+        to = t.bit_length() - 1
+        moves.append((to - delta) | to << 6 | flag)
+    moves = _pawn_moves[key] = tuple(moves)
+    return moves
+
+
+class MoveStack:
+    """
+    Per ply een vaste buffer van MAX_MOVES zetten en een buffer voor hun scores.
+    Wordt 1 keer aangemaakt en over de hele zoektocht hergebruikt: board.legal_moves_into(stack.moves[ply], 0)
+    Een array('H') werkt ook (een zet past in 16 bits), maar die maakt bij elke lees-operatie een nieuw
+    int object aan en was in de zoektocht trager dan een lijst die de int objecten bijhoudt.
+    """
+    def __init__(self, max_ply=MAX_PLY):
+        self.moves = [[0] * MAX_MOVES for _ in range(max_ply)]
+        self.scores = [[0] * MAX_MOVES for _ in range(max_ply)]
+
 
 class ChessBoard:
-    def __init__(self): pass
+    def __init__(self, fen=START_FEN):
+        # pieces[side][piece_type] = bitboard
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        self.all = 0
+        # mailbox: per veld de stukcode (side * 6 + type) of EMPTY
+        self.squares = [EMPTY] * 64
+        self.side = SIDE_WHITE
+        self.castling = 0
+        self.ep_square = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.key = 0
+        # evaluatie-accumulatoren (wit min zwart) en spelfase, zie chess_eval
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+        # undo_stack: per gespeelde zet (move, captured code, castling, ep_square, halfmove_clock, key,
+        #                                mg_score, eg_score, phase)
+        self.undo_stack = []
+        self.set_fen(fen)
+
+    def clear(self):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        self.all = 0
+        self.squares = [EMPTY] * 64
+        self.side = SIDE_WHITE
+        self.castling = 0
+        self.ep_square = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.key = 0
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+        self.undo_stack = []
+
+    def put_piece(self, side, piece_type, sq):
+        bit = 1 << sq
+        self.pieces[side][piece_type] |= bit
+        self.occupied[side] |= bit
+        self.all |= bit
+        code = side * 6 + piece_type
+        self.squares[sq] = code
+        self.key ^= ZOBRIST_PIECES[code][sq]
+        self.mg_score += PST_MG[code][sq]
+        self.eg_score += PST_EG[code][sq]
+        self.phase += PHASE_BY_CODE[code]
+
+    def remove_piece(self, sq):
+        code = self.squares[sq]
+        side, piece_type = divmod(code, 6)
+        bit = 1 << sq
+        self.pieces[side][piece_type] ^= bit
+        self.occupied[side] ^= bit
+        self.all ^= bit
+        self.squares[sq] = EMPTY
+        self.key ^= ZOBRIST_PIECES[code][sq]
+        self.mg_score -= PST_MG[code][sq]
+        self.eg_score -= PST_EG[code][sq]
+        self.phase -= PHASE_BY_CODE[code]
+
+    def copy(self):
+        # Kopie van het bord, inclusief de undo-stapel (nodig voor herhalingen)
+        board = self.__class__.__new__(self.__class__)
+        board.pieces = [self.pieces[0][:], self.pieces[1][:]]
+        board.occupied = self.occupied[:]
+        board.all = self.all
+        board.squares = self.squares[:]
+        board.side = self.side
+        board.castling = self.castling
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        board.key = self.key
+        board.mg_score = self.mg_score
+        board.eg_score = self.eg_score
+        board.phase = self.phase
+        board.undo_stack = self.undo_stack[:]
+        return board
+
+    def piece_at(self, sq):
+        # Returns (side, piece_type) or None
+        code = self.squares[sq]
+        return None if code == EMPTY else divmod(code, 6)
+
+    def king_square(self, side):
+        return self.pieces[side][KING].bit_length() - 1
+
+    # ---------- FEN ----------
+
+    def set_fen(self, fen):
+        self.clear()
+        fields = fen.split()
+        rank, file = 7, 0
+        for c in fields[0]:
+            if c == "/":
+                rank, file = rank - 1, 0
+            elif c.isdigit():
+                file += int(c)
+            else:
+                code = PIECE_CHARS.index(c)
+                self.put_piece(code // 6, code % 6, square(file, rank))
+                file += 1
+        self.side = SIDE_WHITE if len(fields) < 2 or fields[1] == "w" else SIDE_BLACK
+        castling = fields[2] if len(fields) > 2 else "-"
+        for c, right in zip("KQkq", (CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ)):
+            if c in castling:
+                self.castling |= right
+        ep = fields[3] if len(fields) > 3 else "-"
+        self.ep_square = -1 if ep == "-" else square_from_name(ep)
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        if self.ep_square >= 0 and not PAWN_ATTACKS[self.side ^ 1][self.ep_square] & self.pieces[self.side][PAWN]:
+            # zelfde stelling, zelfde sleutel: en passant telt enkel mee als het slaan ook kan
+            self.ep_square = -1
+        self.key = self.compute_key()
+
+    def compute_key(self):
+        # Volledige berekening van de Zobrist sleutel, make_move houdt die incrementeel bij
+        key = 0
+        for sq, code in enumerate(self.squares):
+            if code != EMPTY:
+                key ^= ZOBRIST_PIECES[code][sq]
+        key ^= ZOBRIST_CASTLING[self.castling]
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+        if self.side == SIDE_BLACK:
+            key ^= ZOBRIST_SIDE
+        return key
+
+    def fen(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row, empty = "", 0
+            for file in range(8):
+                code = self.squares[square(file, rank)]
+                if code == EMPTY:
+                    empty += 1
+                else:
+                    if empty:
+                        row, empty = row + str(empty), 0
+                    row += PIECE_CHARS[code]
+            rows.append(row + (str(empty) if empty else ""))
+        castling = "".join(c for c, right in zip("KQkq", (CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ))
+                           if self.castling & right) or "-"
+        ep = "-" if self.ep_square < 0 else SQUARE_NAMES[self.ep_square]
+        return " ".join(("/".join(rows), "wb"[self.side], castling, ep,
+                         str(self.halfmove_clock), str(self.fullmove_number)))
+
+    def __str__(self):
+        lines = []
+        for rank in range(7, -1, -1):
+            lines.append(" ".join("." if self.squares[square(f, rank)] == EMPTY
+                                  else PIECE_CHARS[self.squares[square(f, rank)]] for f in range(8)))
+        return "\n".join(lines)
+
+    # ---------- Aanvallen ----------
+
+    def is_attacked(self, sq, by_side, occupied=None):
+        # occupied: optioneel een andere bezetting (bv. zonder de eigen koning)
+        if occupied is None:
+            occupied = self.all
+        pieces = self.pieces[by_side]
+        if KNIGHT_ATTACKS[sq] & pieces[KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & pieces[KING]:
+            return True
+        # een pion van by_side valt sq aan als een pion van de andere kleur op sq die pion zou aanvallen
+        if PAWN_ATTACKS[by_side ^ 1][sq] & pieces[PAWN]:
+            return True
+        diagonal = pieces[BISHOP] | pieces[QUEEN]
+        if diagonal and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        orthogonal = pieces[TOWER] | pieces[QUEEN]
+        if orthogonal and tower_attacks(sq, occupied) & orthogonal:
+            return True
+        return False
+
+    def in_check(self, side=None):
+        if side is None:
+            side = self.side
+        return self.is_attacked(self.king_square(side), side ^ 1)
+
+    # ---------- Zetgeneratie ----------
+
+    def checkers_and_pins(self):
+        """
+        Geeft (checkers, pinned) voor de speler aan zet:
+        checkers = bitboard van de stukken die de koning schaak zetten
+        pinned   = bitboard van de eigen stukken die gepind staan; zo een stuk mag enkel op LINE[koning][stuk] blijven
+        """
+        side = self.side
+        enemy = self.pieces[side ^ 1]
+        king = self.pieces[side][KING].bit_length() - 1
+        occupied = self.all
+        diagonal = enemy[BISHOP] | enemy[QUEEN]
+        orthogonal = enemy[TOWER] | enemy[QUEEN]
+        checkers = KNIGHT_ATTACKS[king] & enemy[KNIGHT] | PAWN_ATTACKS[side][king] & enemy[PAWN] \
+            | BISHOP_TABLE[king][occupied & BISHOP_MASKS[king]] & diagonal \
+            | TOWER_TABLE[king][occupied & TOWER_MASKS[king]] & orthogonal
+
+        pinned = 0
+        # Stralen vanuit de koning dwars door de eigen stukken: elke vijandelijke loper/toren/dame die zo
+        # geraakt wordt met precies 1 eigen stuk ertussen, pint dat stuk
+        enemy_occupied = self.occupied[side ^ 1]
+        snipers = BISHOP_TABLE[king][enemy_occupied & BISHOP_MASKS[king]] & diagonal \
+            | TOWER_TABLE[king][enemy_occupied & TOWER_MASKS[king]] & orthogonal
+        own = self.occupied[side]
+        while snipers:
+            lsb = snipers & -snipers
+            snipers ^= lsb
+            blockers = BETWEEN[king][lsb.bit_length() - 1] & own
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers
+        return checkers, pinned
+
+    def legal_moves(self, kind=GEN_ALL):
+        """
+        Geeft de legale zetten als lijst, zonder zetten uit te voeren om te testen.
+        kind: GEN_ALL, GEN_CAPTURES (slagen en promoties) of GEN_QUIETS (de rest)
+        """
+        moves = [0] * MAX_MOVES
+        del moves[self.legal_moves_into(moves, 0, kind):]
+        return moves
+
+    def legal_moves_into(self, buf, n, kind=GEN_ALL):
+        """
+        Schrijft de legale zetten in buf (bv. stack.moves[ply], een lijst van MAX_MOVES plaatsen) vanaf index n
+        en geeft de index na de laatste zet terug. Zo wordt er per knoop geen nieuwe lijst aangemaakt.
+        """
+        return self._legal(kind, buf, n)
+
+    def count_legal_moves(self):
+        # Zelfde als len(legal_moves()) maar telt bitboards in plaats van zetten aan te maken (perft bladeren)
+        return self._legal(GEN_ALL, None, 0)
+
+    def is_legal(self, move):
+        """
+        Is move legaal in deze stelling? Voor zetten die niet uit de generator komen (hashtabel, killers):
+        eerst de snelle controles per stuk, dan uitvoeren en kijken of de eigen koning schaak staat.
+        """
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        side = self.side
+        code = self.squares[frm]
+        if code == EMPTY or code // 6 != side or frm == to:
+            return False
+        target = self.squares[to]
+        if target != EMPTY and target // 6 == side:
+            return False
+        piece_type = code - side * 6
+        to_bit = 1 << to
+        occupied = self.all
+        if piece_type == PAWN:
+            push = 8 if side == SIDE_WHITE else -8
+            if bool(to_bit & (BB_RANK_8 | BB_RANK_1)) != bool(flag & FLAG_PROMO):
+                return False
+            if flag == FLAG_EP_CAPTURE:
+                if to != self.ep_square or not PAWN_ATTACKS[side][frm] & to_bit:
+                    return False
+            elif flag & FLAG_CAPTURE:
+                if (flag != FLAG_CAPTURE and flag & ~3 != FLAG_PROMO_CAPTURE) or target == EMPTY \
+                        or not PAWN_ATTACKS[side][frm] & to_bit:
+                    return False
+            elif flag == FLAG_DOUBLE_PUSH:
+                start_rank = BB_RANK_1 << 8 if side == SIDE_WHITE else BB_RANK_8 >> 8
+                if to != frm + 2 * push or not 1 << frm & start_rank or occupied & (to_bit | 1 << (frm + push)):
+                    return False
+            elif (flag != FLAG_QUIET and flag & ~3 != FLAG_PROMO) or to != frm + push or target != EMPTY:
+                return False
+        elif flag == FLAG_CASTLE_KING or flag == FLAG_CASTLE_QUEEN:
+            for right, c_frm, c_to, between, safe, c_flag in _CASTLING[side]:
+                if c_flag == flag:
+                    return c_frm == frm and c_to == to and bool(self.castling & right) \
+                        and not occupied & between and not any(self.is_attacked(sq, side ^ 1) for sq in safe)
+            return False
+        else:
+            if flag not in (FLAG_QUIET, FLAG_CAPTURE) or (flag == FLAG_CAPTURE) != (target != EMPTY):
+                return False
+            if piece_type == KNIGHT:
+                attacks = KNIGHT_ATTACKS[frm]
+            elif piece_type == KING:
+                attacks = KING_ATTACKS[frm]
+            elif piece_type == BISHOP:
+                attacks = bishop_attacks(frm, occupied)
+            elif piece_type == TOWER:
+                attacks = tower_attacks(frm, occupied)
+            else:
+                attacks = bishop_attacks(frm, occupied) | tower_attacks(frm, occupied)
+            if not attacks & to_bit:
+                return False
+        self.make_move(move)
+        legal = not self.in_check(side)
+        self.unmake_move()
+        return legal
+
+    def attackers_to(self, sq, occupied):
+        # Bitboard van alle stukken (beide kleuren) die sq aanvallen bij deze bezetting (voor SEE)
+        white = self.pieces[SIDE_WHITE]
+        black = self.pieces[SIDE_BLACK]
+        diagonal = white[BISHOP] | white[QUEEN] | black[BISHOP] | black[QUEEN]
+        orthogonal = white[TOWER] | white[QUEEN] | black[TOWER] | black[QUEEN]
+        return (PAWN_ATTACKS[SIDE_BLACK][sq] & white[PAWN] | PAWN_ATTACKS[SIDE_WHITE][sq] & black[PAWN]
+                | KNIGHT_ATTACKS[sq] & (white[KNIGHT] | black[KNIGHT])
+                | KING_ATTACKS[sq] & (white[KING] | black[KING])
+                | bishop_attacks(sq, occupied) & diagonal
+                | tower_attacks(sq, occupied) & orthogonal) & occupied
+
+    def _legal(self, kind, buf, n):
+        # buf is None: enkel tellen
+        side = self.side
+        enemy = side ^ 1
+        pieces = self.pieces[side]
+        own = self.occupied[side]
+        enemy_occupied = self.occupied[enemy]
+        occupied = self.all
+        king = pieces[KING].bit_length() - 1
+
+        if kind == GEN_CAPTURES:
+            kind_mask = enemy_occupied
+        elif kind == GEN_QUIETS:
+            kind_mask = ~occupied & BB_ALL
+        else:
+            kind_mask = ~own & BB_ALL
+
+        checkers, pinned = self.checkers_and_pins()
+
+        # Koning: het doelveld mag niet aangevallen zijn, ook niet als de koning zelf niet meer in de weg staat
+        targets = KING_ATTACKS[king] & kind_mask
+        without_king = occupied ^ (1 << king)
+        while targets:
+            lsb = targets & -targets
+            targets ^= lsb
+            to = lsb.bit_length() - 1
+            if not self.is_attacked(to, enemy, without_king):
+                if buf is not None:
+                    buf[n] = king | to << 6 | (FLAG_CAPTURE << 12 if lsb & enemy_occupied else 0)
+                n += 1
+
+        if checkers & (checkers - 1):
+            # dubbel schaak: enkel de koning kan bewegen
+            return n
+
+        if checkers:
+            # enkel schaak: het schaakgevende stuk slaan of ertussen komen
+            check_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+        else:
+            check_mask = BB_ALL
+        target_mask = kind_mask & check_mask
+        line = LINE[king]
+        target_moves = _target_moves
+
+        # Paarden (een gepind paard kan nooit bewegen), lopers, torens en dames
+        for piece_type in (KNIGHT, BISHOP, TOWER, QUEEN):
+            bb = pieces[piece_type]
+            if piece_type == KNIGHT:
+                bb &= ~pinned
+            while bb:
+                lsb = bb & -bb
+                bb ^= lsb
+                frm = lsb.bit_length() - 1
+                if piece_type == KNIGHT:
+                    targets = KNIGHT_ATTACKS[frm] & target_mask
+                elif piece_type == BISHOP:
+                    targets = BISHOP_TABLE[frm][occupied & BISHOP_MASKS[frm]] & target_mask
+                elif piece_type == TOWER:
+                    targets = TOWER_TABLE[frm][occupied & TOWER_MASKS[frm]] & target_mask
+                else:
+                    targets = (BISHOP_TABLE[frm][occupied & BISHOP_MASKS[frm]]
+                               | TOWER_TABLE[frm][occupied & TOWER_MASKS[frm]]) & target_mask
+                if lsb & pinned:
+                    targets &= line[frm]
+                if buf is None:
+                    n += targets.bit_count()
+                    continue
+                captures = targets & enemy_occupied
+                if captures:
+                    key = captures << 7 | frm << 1 | 1
+                    moves = target_moves.get(key) or _new_target_moves(key)
+                    k = n + len(moves)
+                    buf[n:k] = moves
+                    n = k
+                    targets ^= captures
+                if targets:
+                    key = targets << 7 | frm << 1
+                    moves = target_moves.get(key) or _new_target_moves(key)
+                    k = n + len(moves)
+                    buf[n:k] = moves
+                    n = k
+
+        n = self._legal_pawn_moves(kind, buf, n, check_mask, pinned, line)
+
+        if kind != GEN_CAPTURES and not checkers:
+            for right, frm, to, between, safe, flag in _CASTLING[side]:
+                if self.castling & right and not occupied & between \
+                        and not any(self.is_attacked(sq, enemy) for sq in safe):
+                    if buf is not None:
+                        buf[n] = frm | to << 6 | flag << 12
+                    n += 1
+        return n
+
+    def _legal_pawn_moves(self, kind, buf, n, check_mask, pinned, line):
+        side = self.side
+        enemy_occupied = self.occupied[side ^ 1]
+        empty = ~self.all & BB_ALL
+        pawns = self.pieces[side][PAWN]
+        free = pawns & ~pinned
+        if side == SIDE_WHITE:
+            push, promo_rank = 8, BB_RANK_8
+            single = free << 8 & empty
+            double = (single & BB_RANK_3) << 8 & empty & check_mask
+            left = (free & ~BB_FILE_A) << 7 & enemy_occupied & check_mask
+            right = (free & ~BB_FILE_H) << 9 & enemy_occupied & check_mask
+            left_delta, right_delta = 7, 9
+            shifts = 0, 2, 4, 5
+        else:
+            push, promo_rank = -8, BB_RANK_1
+            single = free >> 8 & empty
+            double = (single & BB_RANK_6) >> 8 & empty & check_mask
+            left = (free & ~BB_FILE_A) >> 9 & enemy_occupied & check_mask
+            right = (free & ~BB_FILE_H) >> 7 & enemy_occupied & check_mask
+            left_delta, right_delta = -9, -7
+            shifts = 1, 3, 6, 7
+        single &= check_mask
+        pawn_moves = _pawn_moves
+
+        if kind != GEN_CAPTURES:
+            quiet = single & ~promo_rank
+            if buf is None:
+                n += quiet.bit_count() + double.bit_count()
+            else:
+                for targets, shift in ((quiet, shifts[0]), (double, shifts[1])):
+                    if targets:
+                        key = targets << 4 | shift
+                        moves = pawn_moves.get(key) or _new_pawn_moves(key)
+                        k = n + len(moves)
+                        buf[n:k] = moves
+                        n = k
+
+        if kind != GEN_QUIETS:
+            # slagen en alle promoties
+            promos = single & promo_rank
+            if buf is None:
+                n += 4 * promos.bit_count()
+            else:
+                while promos:
+                    t = promos & -promos
+                    promos ^= t
+                    to = t.bit_length() - 1
+                    for promo in (3, 2, 1, 0):
+                        buf[n] = (to - push) | to << 6 | (FLAG_PROMO | promo) << 12
+                        n += 1
+            for targets, delta, shift in ((left, left_delta, shifts[2]), (right, right_delta, shifts[3])):
+                if buf is None:
+                    n += targets.bit_count() + 3 * (targets & promo_rank).bit_count()
+                    continue
+                promo_targets = targets & promo_rank
+                if targets ^ promo_targets:
+                    key = (targets ^ promo_targets) << 4 | shift
+                    moves = pawn_moves.get(key) or _new_pawn_moves(key)
+                    k = n + len(moves)
+                    buf[n:k] = moves
+                    n = k
+                while promo_targets:
+                    t = promo_targets & -promo_targets
+                    promo_targets ^= t
+                    to = t.bit_length() - 1
+                    for promo in (3, 2, 1, 0):
+                        buf[n] = (to - delta) | to << 6 | (FLAG_PROMO_CAPTURE | promo) << 12
+                        n += 1
+
+        # Gepinde pionnen een voor een: alleen langs de lijn door de koning
+        bb = pawns & pinned
+        while bb:
+            lsb = bb & -bb
+            bb ^= lsb
+            frm = lsb.bit_length() - 1
+            allowed = line[frm] & check_mask
+            to = frm + push
+            if 1 << to & empty:
+                if 1 << to & promo_rank:
+                    if kind != GEN_QUIETS and 1 << to & allowed:
+                        n = self._add_promotions(buf, n, frm, to, FLAG_PROMO)
+                elif kind != GEN_CAPTURES:
+                    if 1 << to & allowed:
+                        if buf is not None:
+                            buf[n] = frm | to << 6
+                        n += 1
+                    to2 = to + push
+                    if lsb & (BB_RANK_1 << 8 if side == SIDE_WHITE else BB_RANK_8 >> 8) \
+                            and 1 << to2 & empty & allowed:
+                        if buf is not None:
+                            buf[n] = frm | to2 << 6 | FLAG_DOUBLE_PUSH << 12
+                        n += 1
+            if kind != GEN_QUIETS:
+                targets = PAWN_ATTACKS[side][frm] & enemy_occupied & allowed
+                while targets:
+                    t = targets & -targets
+                    targets ^= t
+                    to = t.bit_length() - 1
+                    if t & promo_rank:
+                        n = self._add_promotions(buf, n, frm, to, FLAG_PROMO_CAPTURE)
+                    else:
+                        if buf is not None:
+                            buf[n] = frm | to << 6 | FLAG_CAPTURE << 12
+                        n += 1
+
+        # En passant: zeldzaam genoeg om gewoon uit te proberen (de horizontale pin is anders lastig)
+        if kind != GEN_QUIETS and self.ep_square >= 0:
+            bb = PAWN_ATTACKS[side ^ 1][self.ep_square] & pawns
+            while bb:
+                lsb = bb & -bb
+                bb ^= lsb
+                move = lsb.bit_length() - 1 | self.ep_square << 6 | FLAG_EP_CAPTURE << 12
+                self.make_move(move)
+                if not self.in_check(side):
+                    if buf is not None:
+                        buf[n] = move
+                    n += 1
+                self.unmake_move()
+        return n
+
+    @staticmethod
+    def _add_promotions(buf, n, frm, to, flag):
+        if buf is None:
+            return n + 4
+        for promo in (3, 2, 1, 0):
+            buf[n] = frm | to << 6 | (flag | promo) << 12
+            n += 1
+        return n
+
+    # ---------- Zetten uitvoeren en terugnemen ----------
+
+    def make_move(self, move):
+        """
+        Voert een (pseudo-legale) zet uit op het bord zelf. Alles wat nodig is om terug te keren
+        gaat op de undo-stapel, de Zobrist sleutel wordt stap voor stap aangepast.
+        """
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        side = self.side
+        enemy = side ^ 1
+        squares = self.squares
+        pieces = self.pieces[side]
+        occupied = self.occupied
+        code = squares[frm]
+        captured = squares[to]
+        key = self.key
+        mg = self.mg_score
+        eg = self.eg_score
+        self.undo_stack.append((move, captured, self.castling, self.ep_square, self.halfmove_clock, key,
+                                mg, eg, self.phase))
+
+        from_bit = 1 << frm
+        to_bit = 1 << to
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+            self.ep_square = -1
+
+        if captured != EMPTY:
+            self.pieces[enemy][captured - enemy * 6] ^= to_bit
+            occupied[enemy] ^= to_bit
+            self.all ^= to_bit
+            key ^= ZOBRIST_PIECES[captured][to]
+            mg -= PST_MG[captured][to]
+            eg -= PST_EG[captured][to]
+            self.phase -= PHASE_BY_CODE[captured]
+        elif flag == FLAG_EP_CAPTURE:
+            cap_sq = to - 8 if side == SIDE_WHITE else to + 8
+            cap_bit = 1 << cap_sq
+            self.pieces[enemy][PAWN] ^= cap_bit
+            occupied[enemy] ^= cap_bit
+            self.all ^= cap_bit
+            squares[cap_sq] = EMPTY
+            key ^= ZOBRIST_PIECES[enemy * 6 + PAWN][cap_sq]
+            mg -= PST_MG[enemy * 6 + PAWN][cap_sq]
+            eg -= PST_EG[enemy * 6 + PAWN][cap_sq]
+
+        piece_type = code - side * 6
+        move_bits = from_bit | to_bit
+        pieces[piece_type] ^= move_bits
+        occupied[side] ^= move_bits
+        self.all ^= move_bits
+        squares[frm] = EMPTY
+        squares[to] = code
+        key ^= ZOBRIST_PIECES[code][frm] ^ ZOBRIST_PIECES[code][to]
+        pst = PST_MG[code]
+        mg += pst[to] - pst[frm]
+        pst = PST_EG[code]
+        eg += pst[to] - pst[frm]
+
+        if flag & FLAG_PROMO:
+            promo_code = side * 6 + KNIGHT + (flag & 3)
+            pieces[PAWN] ^= to_bit
+            pieces[KNIGHT + (flag & 3)] |= to_bit
+            squares[to] = promo_code
+            key ^= ZOBRIST_PIECES[code][to] ^ ZOBRIST_PIECES[promo_code][to]
+            mg += PST_MG[promo_code][to] - PST_MG[code][to]
+            eg += PST_EG[promo_code][to] - PST_EG[code][to]
+            self.phase += PHASE_BY_CODE[promo_code]
+        elif flag == FLAG_CASTLE_KING or flag == FLAG_CASTLE_QUEEN:
+            t_from, t_to = CASTLING_TOWER[to]
+            tower_bits = 1 << t_from | 1 << t_to
+            tower_code = side * 6 + TOWER
+            pieces[TOWER] ^= tower_bits
+            occupied[side] ^= tower_bits
+            self.all ^= tower_bits
+            squares[t_from] = EMPTY
+            squares[t_to] = tower_code
+            key ^= ZOBRIST_PIECES[tower_code][t_from] ^ ZOBRIST_PIECES[tower_code][t_to]
+            mg += PST_MG[tower_code][t_to] - PST_MG[tower_code][t_from]
+            eg += PST_EG[tower_code][t_to] - PST_EG[tower_code][t_from]
+        elif flag == FLAG_DOUBLE_PUSH:
+            ep_square = (frm + to) >> 1
+            if PAWN_ATTACKS[side][ep_square] & self.pieces[enemy][PAWN]:
+                self.ep_square = ep_square
+                key ^= ZOBRIST_EP_FILE[ep_square & 7]
+
+        castling = self.castling & CASTLING_KEEP[frm] & CASTLING_KEEP[to]
+        if castling != self.castling:
+            key ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_CASTLING[castling]
+            self.castling = castling
+
+        if piece_type == PAWN or captured != EMPTY:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if side == SIDE_BLACK:
+            self.fullmove_number += 1
+        self.side = enemy
+        self.key = key ^ ZOBRIST_SIDE
+        self.mg_score = mg
+        self.eg_score = eg
+
+    def unmake_move(self):
+        # Neemt de laatste zet van de undo-stapel terug
+        move, captured, self.castling, self.ep_square, self.halfmove_clock, self.key, \
+            self.mg_score, self.eg_score, self.phase = self.undo_stack.pop()
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        side = self.side ^ 1
+        enemy = self.side
+        self.side = side
+        if side == SIDE_BLACK:
+            self.fullmove_number -= 1
+        squares = self.squares
+        pieces = self.pieces[side]
+        occupied = self.occupied
+        from_bit = 1 << frm
+        to_bit = 1 << to
+
+        if flag & FLAG_PROMO:
+            pieces[KNIGHT + (flag & 3)] ^= to_bit
+            pieces[PAWN] |= to_bit
+            squares[to] = side * 6 + PAWN
+        elif flag == FLAG_CASTLE_KING or flag == FLAG_CASTLE_QUEEN:
+            t_from, t_to = CASTLING_TOWER[to]
+            tower_bits = 1 << t_from | 1 << t_to
+            pieces[TOWER] ^= tower_bits
+            occupied[side] ^= tower_bits
+            self.all ^= tower_bits
+            squares[t_to] = EMPTY
+            squares[t_from] = side * 6 + TOWER
+
+        code = squares[to]
+        move_bits = from_bit | to_bit
+        pieces[code - side * 6] ^= move_bits
+        occupied[side] ^= move_bits
+        self.all ^= move_bits
+        squares[frm] = code
+        squares[to] = captured
+
+        if captured != EMPTY:
+            self.pieces[enemy][captured - enemy * 6] |= to_bit
+            occupied[enemy] |= to_bit
+            self.all |= to_bit
+        elif flag == FLAG_EP_CAPTURE:
+            cap_sq = to - 8 if side == SIDE_WHITE else to + 8
+            cap_bit = 1 << cap_sq
+            self.pieces[enemy][PAWN] |= cap_bit
+            occupied[enemy] |= cap_bit
+            self.all |= cap_bit
+            squares[cap_sq] = enemy * 6 + PAWN
+
+    def is_repetition(self):
+        # De stelling kwam al eens voor sinds de laatste onomkeerbare zet (enkel stellingen met dezelfde kant aan zet)
+        stack = self.undo_stack
+        limit = max(len(stack) - self.halfmove_clock, 0)
+        for i in range(len(stack) - 2, limit - 1, -2):
+            if stack[i][5] == self.key:
+                return True
+        return False
+
+    # ---------- SAN ----------
+
+    def san(self, move):
+        # Standaard algebraische notatie van een legale zet in deze stelling: e4, Nbd7, exd5, O-O, e8=Q+
+        frm, to, flag = move & 63, move >> 6 & 63, move >> 12
+        if flag == FLAG_CASTLE_KING:
+            text = "O-O"
+        elif flag == FLAG_CASTLE_QUEEN:
+            text = "O-O-O"
+        else:
+            piece_type = self.squares[frm] % 6
+            capture = "x" if flag & FLAG_CAPTURE else ""
+            if piece_type == PAWN:
+                text = (SQUARE_NAMES[frm][0] + capture if capture else "") + SQUARE_NAMES[to]
+                if flag & FLAG_PROMO:
+                    text += "=" + PIECE_CHARS[KNIGHT + (flag & 3)]
+            else:
+                # een ander stuk van hetzelfde type kan ook naar to: van-lijn, van-rij of beide vermelden
+                others = [m & 63 for m in self.legal_moves()
+                          if m >> 6 & 63 == to and m & 63 != frm and self.squares[m & 63] == self.squares[frm]]
+                hint = ""
+                if others:
+                    if all(o & 7 != frm & 7 for o in others):
+                        hint = SQUARE_NAMES[frm][0]
+                    elif all(o >> 3 != frm >> 3 for o in others):
+                        hint = SQUARE_NAMES[frm][1]
+                    else:
+                        hint = SQUARE_NAMES[frm]
+                text = PIECE_CHARS[piece_type] + hint + capture + SQUARE_NAMES[to]
+        self.make_move(move)
+        if self.in_check():
+            text += "+" if self.count_legal_moves() else "#"
+        self.unmake_move()
+        return text
+
+    def parse_san(self, san):
+        # Omgekeerde van san(): geeft de legale zet, of ValueError als de notatie niet klopt of niet eenduidig is
+        text = san.rstrip("+#!?")
+        legal = self.legal_moves()
+        if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+            flag = FLAG_CASTLE_KING if len(text) == 3 else FLAG_CASTLE_QUEEN
+            for move in legal:
+                if move >> 12 == flag:
+                    return move
+            raise ValueError(f"illegal move {san} in {self.fen()}")
+        promotion = EMPTY
+        if text and text[-1] in "NBRQ":
+            promotion = PIECE_CHARS.index(text[-1])
+            text = text[:-1].rstrip("=")
+        piece_type = PAWN
+        if text and text[0] in "NBRQK":
+            piece_type = PIECE_CHARS.index(text[0])
+            text = text[1:]
+        if len(text) < 2 or text[-2:] not in SQUARE_NAMES:
+            raise ValueError(f"invalid move {san}")
+        to = square_from_name(text[-2:])
+        hint = text[:-2].replace("x", "")
+        found = []
+        for move in legal:
+            frm = move & 63
+            if move >> 6 & 63 == to and self.squares[frm] % 6 == piece_type and move_promotion(move) == promotion \
+                    and all(c in SQUARE_NAMES[frm] for c in hint):
+                found.append(move)
+        if len(found) != 1:
+            raise ValueError(f"{'ambiguous' if found else 'illegal'} move {san} in {self.fen()}")
+        return found[0]
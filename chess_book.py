@@ -0,0 +1,210 @@
+import heapq
+import itertools
+import mmap
+import os
+import random
+import struct
+import tempfile
+from chess_file_handler import read_games_parallel
+
+"""
+   Openingsboek in de stijl van Polyglot: een gesorteerd bestand van records van 16 bytes
+       sleutel (8 bytes) | zet (2 bytes) | gewicht (2 bytes) | learn (4 bytes), big-endian
+   gesorteerd op sleutel en binnen een sleutel op dalend gewicht.
+   Het bestand wordt met mmap geopend en met een binaire zoektocht doorzocht: een boek van 100 MB
+   kost geen laadtijd en enkel de pagina's die bekeken worden komen in het geheugen.
+
+   De sleutel is de Zobrist sleutel van chess_board en de zet de 16-bit codering van chess_board,
+   dus het formaat is dat van Polyglot maar de bestanden zijn niet uitwisselbaar met Polyglot boeken.
+   In learn staat het aantal partijen waarin de zet gespeeld werd.
+
+   build_book("games.pgn", "book.bin")
+   with OpeningBook("book.bin") as book:
+       move = book.pick(board)          # 0 als de stelling niet in het boek staat
+"""
+
+BOOK_ENTRY = struct.Struct(">QHHI")
+BOOK_KEY = struct.Struct(">Q")
+BOOK_PLIES = 20
+MAX_WEIGHT = 0xFFFF
+# build_book: zoveel (sleutel, zet) paren in het geheugen, daarna gaat een gesorteerd stuk naar schijf
+BOOK_CHUNK_ENTRIES = 1 << 20
+# (sleutel, zet, aantal, punten) in de gesorteerde stukken, big-endian zodat de bytes sorteren als de getallen
+CHUNK_ENTRY = struct.Struct(">QHII")
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        # een leeg bestand kan niet gemapt worden, dat is een leeg boek
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.entries_count = size // BOOK_ENTRY.size
+
+    def __len__(self):
+        return self.entries_count
+
+    def _first(self, key):
+        # Binaire zoektocht naar het eerste record met sleutel >= key
+        lo, hi = 0, self.entries_count
+        mm = self.mm
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if BOOK_KEY.unpack_from(mm, mid * BOOK_ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def entries(self, key):
+        # Lijst van (move, weight, learn) voor deze sleutel, het zwaarste gewicht eerst
+        result = []
+        i = self._first(key)
+        while i < self.entries_count:
+            entry_key, move, weight, learn = BOOK_ENTRY.unpack_from(self.mm, i * BOOK_ENTRY.size)
+            if entry_key != key:
+                break
+            result.append((move, weight, learn))
+            i += 1
+        return result
+
+    def moves(self, board):
+        # (move, weight) van de boekzetten die legaal zijn in deze stelling (bescherming tegen sleutelbotsingen)
+        entries = self.entries(board.key)
+        if not entries:
+            return []
+        legal = board.legal_moves()
+        return [(move, weight) for move, weight, _ in entries if move in legal]
+
+    def pick(self, board, rng=random, best=False):
+        # Willekeurige boekzet volgens het gewicht, of de zwaarste met best=True; 0 als er geen is
+        moves = self.moves(board)
+        if not moves:
+            return 0
+        if best:
+            return moves[0][0]
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_book(path):
+    # Het boek als het bestand bestaat, anders None (het spel werkt ook zonder boek)
+    # Een relatief pad hoort bij de map van deze module, niet bij de map van waaruit gestart werd
+    if not path:
+        return None
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    return OpeningBook(path) if os.path.exists(path) else None
+
+
+def book_entries(game, max_plies=BOOK_PLIES):
+    """
+    (key, move, points) voor de eerste max_plies zetten van een partij, points vanuit de speler aan zet:
+    2 voor een winst, 1 voor remise, 0 voor verlies. Staat op moduleniveau voor read_games_parallel.
+    """
+    if "FEN" in game.headers or game.result not in ("1-0", "0-1", "1/2-1/2"):
+        return []
+    white_points = {"1-0": 2, "0-1": 0, "1/2-1/2": 1}[game.result]
+    entries = []
+    try:
+        for board, move in game.replay():
+            if len(entries) == max_plies:
+                break
+            entries.append((board.key, move, white_points if board.side == 0 else 2 - white_points))
+    except ValueError:
+        pass
+    return entries
+
+
+def _write_chunk(stats, directory):
+    # De tellingen gesorteerd op (sleutel, zet) naar een tijdelijk bestand, klaar om te mergen
+    f = tempfile.TemporaryFile(dir=directory)
+    for (key, move), (count, points) in sorted(stats.items()):
+        f.write(CHUNK_ENTRY.pack(key, move, min(count, 0xFFFFFFFF), min(points, 0xFFFFFFFF)))
+    f.seek(0)
+    return f
+
+
+def _read_chunk(f, records=4096):
+    while True:
+        data = f.read(CHUNK_ENTRY.size * records)
+        if not data:
+            return
+        yield from CHUNK_ENTRY.iter_unpack(data)
+
+
+def _merge_chunks(chunks):
+    # (sleutel, zet, aantal, punten) over alle stukken samengeteld, gesorteerd op (sleutel, zet)
+    merged = heapq.merge(*(_read_chunk(f) for f in chunks))
+    for (key, move), group in itertools.groupby(merged, key=lambda r: r[:2]):
+        count = points = 0
+        for _, _, c, p in group:
+            count += c
+            points += p
+        yield key, move, count, points
+
+
+def build_book(pgn_path, book_path, min_games=2, processes=None, chunk_entries=BOOK_CHUNK_ENTRIES):
+    """
+    Bouwt een boek uit een PGN bestand. Het gewicht van een zet is 2 * winst + remise over alle partijen
+    (frequentie en score samen, zoals bij Polyglot); zetten uit minder dan min_games partijen vallen weg.
+    De tellingen worden per chunk_entries (sleutel, zet) paren gesorteerd naar schijf geschreven en op het
+    einde samengevoegd, zodat het geheugen niet meegroeit met de grootte van de PGN verzameling.
+    Geeft een dict met de aantallen.
+    """
+    directory = os.path.dirname(os.path.abspath(book_path))
+    chunks = []
+    stats = {}
+    games = 0
+    try:
+        for entries in read_games_parallel(pgn_path, book_entries, processes=processes):
+            games += 1
+            for key, move, points in entries:
+                stat = stats.get((key, move))
+                if stat is None:
+                    stats[key, move] = [1, points]
+                else:
+                    stat[0] += 1
+                    stat[1] += points
+            if len(stats) >= chunk_entries:
+                chunks.append(_write_chunk(stats, directory))
+                stats = {}
+        chunks.append(_write_chunk(stats, directory))
+        stats = None
+
+        # eerste doorgang: per sleutel de zetten op dalend gewicht, nog ongeschaald (punten passen niet in 16 bits)
+        top = positions = entries_count = 0
+        with tempfile.TemporaryFile(dir=directory) as unscaled:
+            for key, group in itertools.groupby(_merge_chunks(chunks), key=lambda r: r[0]):
+                records = [(move, count, points) for _, move, count, points in group
+                           if count >= min_games and points > 0]
+                if not records:
+                    continue
+                records.sort(key=lambda r: -r[2])
+                top = max(top, records[0][2])
+                positions += 1
+                entries_count += len(records)
+                for move, count, points in records:
+                    unscaled.write(CHUNK_ENTRY.pack(key, move, count, points))
+
+            # tweede doorgang: gewichten passen in 16 bits, schalen als het nodig is maar nooit tot 0
+            scale = MAX_WEIGHT / top if top > MAX_WEIGHT else 1
+            unscaled.seek(0)
+            with open(book_path, "wb") as f:
+                for key, move, count, points in _read_chunk(unscaled):
+                    f.write(BOOK_ENTRY.pack(key, move, max(1, int(points * scale)), count))
+    finally:
+        for chunk in chunks:
+            chunk.close()
+    return {"games": games, "positions": positions, "entries": entries_count, "chunks": len(chunks),
+            "bytes": os.path.getsize(book_path)}
@@ -0,0 +1,304 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import chess_bench
+import chess_perft
+from chess_database import GameDatabase, import_pgn
+from chess_book import build_book
+from chess_tablebase import build_tablebase, tablebase_dir
+from chess_selfplay import SELFPLAY_DIR, SELFPLAY_DEPTH, SELFPLAY_SHARD_POSITIONS, run_selfplay
+from chess_board import ChessBoard, START_FEN, move_to_uci
+from chess_smp import ParallelSearch
+from game_constants import HASH_SIZE_MB
+
+"""
+   Commandolijn voor de schaakmotor (benchmarks, analyse, ...)
+   Voorbeeld: python chess_cli.py bench-sliders
+              python chess_cli.py perft --depth 4
+              python chess_cli.py perft --position kiwipete --depth 3 --divide
+              python chess_cli.py --hash 256 search --threads 8 --time 10
+              python chess_cli.py selfplay --games 1000 --depth 5 --processes 8
+"""
+
+
+def print_line(results):
+    # Een dict op 1 regel, voor voortgang tijdens lange opdrachten
+    print(", ".join(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}" for k, v in results.items()),
+          flush=True)
+
+
+def print_results(results):
+    for key, value in results.items():
+        if isinstance(value, float):
+            print(f"{key:>24}: {value:,.2f}")
+        else:
+            print(f"{key:>24}: {value}")
+
+
+def cmd_bench_sliders(args):
+    print_results(chess_bench.bench_sliders(samples=args.samples, repeat=args.repeat))
+
+
+def cmd_bench_tt(args):
+    print_results(chess_bench.bench_tt(args.hash, operations=args.operations))
+
+
+def cmd_perft(args):
+    if args.fen or args.divide:
+        if args.fen:
+            fen, expected = args.fen, None
+        else:
+            # --divide rekent 1 stelling uit, "all" wordt dan de beginstelling
+            name = "startpos" if args.position == "all" else args.position
+            fen, known = chess_perft.PERFT_POSITIONS[name]
+            expected = known.get(args.depth)
+            if expected is None:
+                print(f"warning: no known node count for {name} at depth {args.depth}, result is not checked",
+                      file=sys.stderr)
+        if args.divide:
+            board = ChessBoard(fen)
+            total = 0
+            for uci, nodes in chess_perft.divide(board, args.depth):
+                print(f"{uci}: {nodes}")
+                total += nodes
+            print(f"total: {total}")
+            return
+        results = [chess_perft.run_perft(fen, args.depth, expected)]
+        results[0]["name"] = "fen"
+    else:
+        names = list(chess_perft.PERFT_POSITIONS) if args.position == "all" else [args.position]
+        for name in names:
+            deepest = max(chess_perft.PERFT_POSITIONS[name][1])
+            if args.depth > deepest:
+                print(f"warning: {name} only has known node counts up to depth {deepest}, "
+                      f"stopping at depth {deepest} instead of {args.depth}", file=sys.stderr)
+        results = chess_perft.run_suite(args.depth, names)
+
+    failed = 0
+    total_nodes, total_seconds = 0, 0.0
+    for r in results:
+        status = "ok" if r["ok"] else f"FAILED (expected {r['expected']})"
+        print(f"{r['name']:>10} depth {r['depth']}: {r['nodes']:>10} nodes {r['seconds']:8.2f}s "
+              f"{r['nps']:>12,.0f} nps  {status}")
+        failed += not r["ok"]
+        total_nodes += r["nodes"]
+        total_seconds += r["seconds"]
+    if total_seconds > 0:
+        print(f"total: {total_nodes} nodes, {total_nodes / total_seconds:,.0f} nps")
+    if failed:
+        sys.exit(1)
+
+
+def cmd_search(args):
+    with ParallelSearch(args.threads, args.hash) as smp:
+        result = smp.search(ChessBoard(args.fen), time_limit=args.time, max_depth=args.depth)
+    result["move"] = move_to_uci(result["move"]) if result["move"] else "-"
+    print_results(result)
+
+
+def cmd_bench_smp(args):
+    print_results(chess_bench.bench_smp(args.threads, args.depth, args.hash))
+
+
+def cmd_bench_ordering(args):
+    print_results(chess_bench.bench_ordering(args.depth, args.hash))
+
+
+def cmd_bench_movegen(args):
+    print_results(chess_bench.bench_move_buffers(args.depth))
+
+
+def cmd_bench_eval(args):
+    print_results(chess_bench.bench_eval(args.positions, args.repeat))
+
+
+def cmd_bench_batch_eval(args):
+    print_results(chess_bench.bench_batch_eval(positions=args.positions, repeat=args.repeat))
+
+
+def cmd_bench_nnue(args):
+    print_results(chess_bench.bench_nnue(positions=args.positions, repeat=args.repeat, path=args.network))
+
+
+def cmd_bench_render(args):
+    # pygame enkel laden voor deze opdracht, de andere opdrachten hebben het niet nodig
+    from chess_render import bench_render
+    print_results(bench_render(frames=args.frames, size=args.size))
+
+
+def cmd_bench_pgn(args):
+    print_results(chess_bench.bench_pgn(args.games, processes=args.processes))
+
+
+def cmd_import_pgn(args):
+    print_results(import_pgn(args.pgn, args.database, processes=args.processes, index_plies=args.index_plies))
+
+
+def cmd_find(args):
+    board = ChessBoard(args.fen)
+    with GameDatabase(args.database) as db:
+        print(f"{db.count(board.key)} games")
+        for game_id in db.find(board.key, limit=args.limit):
+            headers = db.headers(game_id)
+            print(f"{game_id:>8}  {headers.get('White', '?')} - {headers.get('Black', '?')}  {headers['Result']}  "
+                  f"{headers.get('Event', '?')} {headers.get('Date', '')}")
+
+
+def cmd_bench_database(args):
+    print_results(chess_bench.bench_database(args.games, processes=args.processes))
+
+
+def cmd_build_book(args):
+    print_results(build_book(args.pgn, args.book, min_games=args.min_games, processes=args.processes))
+
+
+def cmd_bench_book(args):
+    print_results(chess_bench.bench_book(args.games, processes=args.processes))
+
+
+def cmd_build_tablebase(args):
+    for signature in args.tables:
+        build_tablebase(signature, args.dir, processes=args.processes, log=print_line)
+
+
+def cmd_bench_tablebase(args):
+    print_results(chess_bench.bench_tablebase(args.dir, depth=args.depth))
+
+
+def cmd_selfplay(args):
+    # een opgegeven map is relatief tot de huidige map, load_tablebases zou ze bij de module zoeken
+    tablebases = os.path.abspath(args.tablebases) if args.tablebases else None
+    print_results(run_selfplay(args.dir, games=args.games, depth=args.depth, processes=args.processes,
+                               shard_positions=args.shard_positions, seed=args.seed,
+                               tablebase_dir=tablebases, log=print_line))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="TuringChessMate engine tools")
+    parser.add_argument("--hash", type=int, default=HASH_SIZE_MB, help="transposition table size in MB")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("bench-sliders", help="compare slider attack generation methods")
+    p.add_argument("--samples", type=int, default=2000)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=cmd_bench_sliders)
+
+    p = commands.add_parser("bench-tt", help="transposition table throughput and replacement statistics")
+    p.add_argument("--operations", type=int, default=200000)
+    p.set_defaults(func=cmd_bench_tt)
+
+    p = commands.add_parser("perft", help="move generator correctness and speed on the standard test positions")
+    p.add_argument("--depth", type=int, default=3)
+    p.add_argument("--position", default="all", choices=["all"] + list(chess_perft.PERFT_POSITIONS))
+    p.add_argument("--fen", help="run on this position instead of the test positions")
+    p.add_argument("--divide", action="store_true",
+                   help="print the node count per root move (startpos when --position is all)")
+    p.set_defaults(func=cmd_perft)
+
+    p = commands.add_parser("bench-ordering", help="move ordering quality: first-move cutoffs and branching factor")
+    p.add_argument("--depth", type=int, default=5)
+    p.set_defaults(func=cmd_bench_ordering)
+
+    p = commands.add_parser("bench-movegen", help="move lists per node versus reused move buffers")
+    p.add_argument("--depth", type=int, default=3)
+    p.set_defaults(func=cmd_bench_movegen)
+
+    p = commands.add_parser("bench-eval", help="full evaluation versus the incrementally updated accumulators")
+    p.add_argument("--positions", type=int, default=500)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=cmd_bench_eval)
+
+    p = commands.add_parser("search", help="search a position, optionally with several processes (lazy SMP)")
+    p.add_argument("--fen", default=START_FEN)
+    p.add_argument("--threads", type=int, default=1)
+    p.add_argument("--time", type=float, default=None, help="seconds")
+    p.add_argument("--depth", type=int, default=6)
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser("bench-smp", help="lazy SMP speedup from 1 to --threads processes")
+    p.add_argument("--threads", type=int, default=mp.cpu_count())
+    p.add_argument("--depth", type=int, default=5)
+    p.set_defaults(func=cmd_bench_smp)
+
+    p = commands.add_parser("bench-batch-eval", help="per-board evaluation versus numpy feature planes and batched evaluators")
+    p.add_argument("--positions", type=int, default=4096)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=cmd_bench_batch_eval)
+
+    p = commands.add_parser("bench-nnue", help="incremental network accumulators versus full recomputation and PST")
+    p.add_argument("--positions", type=int, default=200)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--network", default=None, help="network file (default: random weights)")
+    p.set_defaults(func=cmd_bench_nnue)
+
+    p = commands.add_parser("bench-render", help="board drawing per frame with and without the pre-rendered surface cache")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--size", type=int, default=75, help="square size in pixels")
+    p.set_defaults(func=cmd_bench_render)
+
+    p = commands.add_parser("bench-pgn", help="PGN write, header scan, parse and replay throughput")
+    p.add_argument("--games", type=int, default=20000)
+    p.add_argument("--processes", type=int, default=None)
+    p.set_defaults(func=cmd_bench_pgn)
+
+    p = commands.add_parser("import-pgn", help="convert a PGN file to a binary game database with position index")
+    p.add_argument("pgn")
+    p.add_argument("database")
+    p.add_argument("--processes", type=int, default=None)
+    p.add_argument("--index-plies", type=int, default=None, help="only index the first N plies of each game")
+    p.set_defaults(func=cmd_import_pgn)
+
+    p = commands.add_parser("find", help="games in a database that reached a position")
+    p.add_argument("database")
+    p.add_argument("--fen", default=START_FEN)
+    p.add_argument("--limit", type=int, default=20)
+    p.set_defaults(func=cmd_find)
+
+    p = commands.add_parser("bench-db", help="PGN import speed, size per move and position index lookups")
+    p.add_argument("--games", type=int, default=5000)
+    p.add_argument("--processes", type=int, default=None)
+    p.set_defaults(func=cmd_bench_database)
+
+    p = commands.add_parser("build-book", help="build an opening book from a PGN file")
+    p.add_argument("pgn")
+    p.add_argument("book")
+    p.add_argument("--min-games", type=int, default=2)
+    p.add_argument("--processes", type=int, default=None)
+    p.set_defaults(func=cmd_build_book)
+
+    p = commands.add_parser("bench-book", help="opening book build speed and probes per second")
+    p.add_argument("--games", type=int, default=5000)
+    p.add_argument("--processes", type=int, default=None)
+    p.set_defaults(func=cmd_bench_book)
+
+    p = commands.add_parser("build-tablebase", help="build endgame tables by retrograde analysis, e.g. KQK KRK KPK KBNK")
+    p.add_argument("tables", nargs="+")
+    p.add_argument("--dir", default=tablebase_dir())
+    p.add_argument("--processes", type=int, default=None)
+    p.set_defaults(func=cmd_build_tablebase)
+
+    p = commands.add_parser("bench-tablebase", help="tablebase probes per second and a search with and without tables")
+    p.add_argument("--dir", default=tablebase_dir())
+    p.add_argument("--depth", type=int, default=5)
+    p.set_defaults(func=cmd_bench_tablebase)
+
+    p = commands.add_parser("selfplay", help="engine-vs-engine games as training data; restarts where it stopped")
+    p.add_argument("--dir", default=SELFPLAY_DIR)
+    p.add_argument("--games", type=int, default=100)
+    p.add_argument("--depth", type=int, default=SELFPLAY_DEPTH)
+    p.add_argument("--processes", type=int, default=None)
+    p.add_argument("--shard-positions", type=int, default=SELFPLAY_SHARD_POSITIONS)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--tablebases", default=None, help="tablebase directory used by the workers")
+    p.set_defaults(func=cmd_selfplay)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+import numpy as np
+from chess_file_handler import PgnGame, read_games_parallel
+
+"""
+   Compacte binaire partijdatabank met een index op stelling (Zobrist sleutel)
+   Een zet is 2 bytes (de 16-bit codering van chess_board), tags staan als nummers in een tabel
+   met unieke strings. De index bevat per stelling die in een partij voorkwam (sleutel, partijnummer),
+   gesorteerd op sleutel: "alle partijen met deze stelling" is een binaire zoektocht.
+
+   Het bestand wordt met mmap geopend, de tabellen zijn memoryviews op het bestand;
+   openen en zoeken lezen enkel de pagina's die nodig zijn.
+
+   import_pgn("twic.pgn", "twic.tcdb")
+   with GameDatabase("twic.tcdb") as db:
+       for game_id in db.find(board.key): db.game(game_id).headers
+
+   Indeling (getallen in de bytevolgorde van de machine, zoals array ze schrijft):
+       header | partijen | partij-offsets Q[games + 1] | string-offsets Q[strings + 1] | strings (utf-8)
+       | index-sleutels Q[positions] | index-partijen I[positions]
+   Een partij: plies H, resultaat B, aantal tags B, dan per tag (naam-id I, waarde-id I), dan plies zetten H
+"""
+
+DATABASE_MAGIC = b"TCMDB\x00\x00\x01"
+DATABASE_VERSION = 1
+# magic, versie, partijen, strings, posities, dan de posities van de secties in het bestand
+_HEADER = struct.Struct("<8sIIQQQQQQQ")
+_GAME = struct.Struct("<HBB")
+_TAG = struct.Struct("<II")
+RESULT_CODES = ("*", "1-0", "0-1", "1/2-1/2")
+
+
+def _pad(f):
+    # secties die als Q of I gelezen worden beginnen op een veelvoud van 8
+    f.write(b"\x00" * (-f.tell() % 8))
+
+
+class GameDatabaseWriter:
+    """
+    Bouwt een databank op: de partijen worden meteen weggeschreven, de strings en de index
+    worden bij close() achteraan toegevoegd. index_plies beperkt de index tot de eerste zetten (None = alles).
+    """
+
+    def __init__(self, path, index_plies=None):
+        self.path = path
+        self.index_plies = index_plies
+        self.file = open(path, "wb")
+        self.file.write(b"\x00" * _HEADER.size)
+        self.offsets = array("Q", [_HEADER.size])
+        self.strings = {}
+        self.index_keys = array("Q")
+        self.index_games = array("I")
+
+    def _intern(self, text):
+        string_id = self.strings.get(text)
+        if string_id is None:
+            string_id = self.strings[text] = len(self.strings)
+        return string_id
+
+    def add_game(self, headers, moves, result="*", keys=()):
+        """
+        moves: zetten in de 16-bit codering, keys: de Zobrist sleutels van de stellingen in de partij.
+        Geeft het nummer van de partij.
+        """
+        game_id = len(self.offsets) - 1
+        tags = [(self._intern(name), self._intern(value)) for name, value in headers.items()
+                if name != "Result"][:255]
+        record = [_GAME.pack(len(moves), RESULT_CODES.index(result) if result in RESULT_CODES else 0, len(tags))]
+        record.extend(_TAG.pack(name, value) for name, value in tags)
+        record.append(array("H", moves).tobytes())
+        self.file.write(b"".join(record))
+        self.offsets.append(self.file.tell())
+        if self.index_plies is not None:
+            keys = keys[:self.index_plies + 1]
+        # een stelling die meermaals voorkomt in dezelfde partij staat maar 1 keer in de index
+        unique = set(keys)
+        self.index_keys.extend(unique)
+        self.index_games.extend([game_id] * len(unique))
+        return game_id
+
+    def close(self):
+        if self.file.closed:
+            return
+        f = self.file
+        _pad(f)
+        offsets_pos = f.tell()
+        f.write(self.offsets.tobytes())
+
+        encoded = [text.encode("utf-8") for text in self.strings]
+        string_offsets = array("Q", [0])
+        for data in encoded:
+            string_offsets.append(string_offsets[-1] + len(data))
+        string_offsets_pos = f.tell()
+        f.write(string_offsets.tobytes())
+        string_data_pos = f.tell()
+        f.write(b"".join(encoded))
+
+        # sorteren op sleutel (en partij) gebeurt 1 keer bij het afsluiten, met numpy
+        keys = np.frombuffer(self.index_keys, dtype=np.uint64)
+        games = np.frombuffer(self.index_games, dtype=np.uint32)
+        order = np.lexsort((games, keys))
+        _pad(f)
+        keys_pos = f.tell()
+        f.write(keys[order].tobytes())
+        games_pos = f.tell()
+        f.write(games[order].tobytes())
+
+        f.seek(0)
+        f.write(_HEADER.pack(DATABASE_MAGIC, DATABASE_VERSION, len(self.offsets) - 1, len(self.strings),
+                             len(self.index_keys), offsets_pos, string_offsets_pos, string_data_pos,
+                             keys_pos, games_pos))
+        f.close()
+        self.index_keys = self.index_games = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameDatabase:
+    """
+    Leest een databank via mmap: len(db), db.game(i), db.moves(i), db.headers(i), db.find(key)
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.games, self.string_count, self.positions, offsets_pos, string_offsets_pos,
+         self.string_data_pos, keys_pos, games_pos) = _HEADER.unpack_from(self.mm, 0)
+        if magic != DATABASE_MAGIC or version != DATABASE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a game database (version {DATABASE_VERSION})")
+        view = memoryview(self.mm)
+        self.offsets = view[offsets_pos:offsets_pos + 8 * (self.games + 1)].cast("Q")
+        self.string_offsets = view[string_offsets_pos:string_offsets_pos + 8 * (self.string_count + 1)].cast("Q")
+        self.index_keys = view[keys_pos:keys_pos + 8 * self.positions].cast("Q")
+        self.index_games = view[games_pos:games_pos + 4 * self.positions].cast("I")
+        self.views = [view, self.offsets, self.string_offsets, self.index_keys, self.index_games]
+
+    def __len__(self):
+        return self.games
+
+    def string(self, string_id):
+        start = self.string_data_pos + self.string_offsets[string_id]
+        end = self.string_data_pos + self.string_offsets[string_id + 1]
+        return self.mm[start:end].decode("utf-8")
+
+    def _record(self, game_id):
+        if not 0 <= game_id < self.games:
+            raise IndexError(f"game {game_id} out of range")
+        pos = self.offsets[game_id]
+        plies, result, tag_count = _GAME.unpack_from(self.mm, pos)
+        return pos + _GAME.size, plies, result, tag_count
+
+    def headers(self, game_id):
+        pos, _, result, tag_count = self._record(game_id)
+        headers = {}
+        for i in range(tag_count):
+            name, value = _TAG.unpack_from(self.mm, pos + i * _TAG.size)
+            headers[self.string(name)] = self.string(value)
+        headers["Result"] = RESULT_CODES[result]
+        return headers
+
+    def result(self, game_id):
+        return RESULT_CODES[self._record(game_id)[2]]
+
+    def moves(self, game_id):
+        # De zetten als 16-bit codes, zonder de partij na te spelen
+        pos, plies, _, tag_count = self._record(game_id)
+        pos += tag_count * _TAG.size
+        moves = array("H")
+        moves.frombytes(self.mm[pos:pos + 2 * plies])
+        return moves.tolist()
+
+    def game(self, game_id):
+        # Als PgnGame met de zetten in SAN (speelt de partij na)
+        headers = self.headers(game_id)
+        game = PgnGame(headers, [], headers["Result"], self.offsets[game_id])
+        board = game.start_board()
+        for move in self.moves(game_id):
+            game.moves.append(board.san(move))
+            board.make_move(move)
+        return game
+
+    def find(self, key, limit=None):
+        # Nummers van de partijen waarin de stelling met deze Zobrist sleutel voorkwam, O(log n)
+        lo = bisect_left(self.index_keys, key)
+        hi = bisect_right(self.index_keys, key, lo)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.index_games[lo:hi].tolist()
+
+    def count(self, key):
+        lo = bisect_left(self.index_keys, key)
+        return bisect_right(self.index_keys, key, lo) - lo
+
+    def close(self):
+        for view in getattr(self, "views", ()):
+            view.release()
+        self.views = []
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def encode_game(game):
+    """
+    Speelt een PgnGame na: (headers, zetten, resultaat, sleutels) of None als een zet niet klopt.
+    Staat op moduleniveau zodat read_games_parallel ze in de processen kan oproepen.
+    """
+    moves = []
+    keys = []
+    board = None
+    try:
+        for board, move in game.replay():
+            keys.append(board.key)
+            moves.append(move)
+    except ValueError:
+        return None
+    # na de laatste zet staat het bord in de eindstelling
+    keys.append(board.key if board is not None else game.start_board().key)
+    return game.headers, moves, game.result, keys
+
+
+def import_pgn(pgn_path, db_path, processes=None, index_plies=None):
+    """
+    Zet een PGN bestand om naar een databank; het nalopen van de zetten gebeurt over een procespool.
+    Partijen met een ongeldige zet worden overgeslagen. Geeft een dict met de aantallen.
+    """
+    skipped = plies = 0
+    with GameDatabaseWriter(db_path, index_plies) as writer:
+        for encoded in read_games_parallel(pgn_path, encode_game, processes=processes):
+            if encoded is None:
+                skipped += 1
+                continue
+            headers, moves, result, keys = encoded
+            writer.add_game(headers, moves, result, keys)
+            plies += len(moves)
+        games, positions = len(writer.offsets) - 1, len(writer.index_keys)
+    return {"games": games, "skipped": skipped, "plies": plies, "positions": positions,
+            "bytes": os.path.getsize(db_path)}
@@ -0,0 +1,376 @@
+import time
+from chess_board import MAX_PLY, MoveStack, move_to_uci, popcount
+from chess_eval import evaluate
+from chess_tt import TranspositionTable, BOUND_UPPER, BOUND_LOWER, BOUND_EXACT
+from chess_ordering import MoveOrdering
+
+"""
+   ChessEngine: iterative deepening alpha-beta zoektocht die in tijdschijfjes uitgevoerd kan worden
+   De zoekfunctie is een generator: om de zoveel knopen kijkt ze of het schijfje op is en doet dan yield.
+   Zo kan Game.execute_cycle per frame een paar ms rekenen zonder dat het venster hapert.
+
+   engine.start(board, time_limit=5)
+   while not engine.step(10): ...      # 10 ms per frame
+   engine.best_move                    # beste zet van de diepste volledig afgewerkte iteratie
+
+   Pondering: terwijl de tegenstander nadenkt, zoekt de motor al op de stelling na de verwachte zet
+   engine.ponder(board, engine.expected_reply(board), time_limit=30)    # in dezelfde tijdschijfjes
+   Loopt de ponder-zoektocht af (tijd of diepte), dan blijft pondering True maar thinking False: de spellus
+   kan dan slapen tot de tegenstander zet, ponder_hit geeft de gevonden zet meteen terug.
+   engine.ponder_hit(time_limit)       # de tegenstander speelde die zet: True als het resultaat al klaar is
+   engine.stop()                       # een andere zet: stoppen, de transpositietabel blijft warm
+"""
+
+MAX_DEPTH = 64
+INFINITE = 32000
+MATE_SCORE = 30000
+MATE_BOUND = MATE_SCORE - MAX_PLY
+
+# Elke zoveel knopen wordt de klok bekeken
+TIME_CHECK_NODES = 32
+
+
+def score_to_tt(score, ply):
+    # Matscores worden relatief tot de huidige knoop bewaard
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def tablebase_score(value, ply):
+    # Waarde uit chess_tablebase (mat in plies voor de speler aan zet) als score op deze ply
+    if value > 0:
+        return MATE_SCORE - ply - value
+    if value < 0:
+        return -MATE_SCORE + ply - value - 1
+    return 0
+
+
+class ChessEngine:
+    def __init__(self, tt=None):
+        self.tt = tt if tt is not None else TranspositionTable()
+        # optioneel openingsboek (chess_book.OpeningBook): staat de stelling erin, dan wordt er niet gezocht
+        self.book = None
+        # optionele eindspeldatabanken (chess_tablebase.Tablebases), opgezocht in elke knoop behalve de wortel
+        self.tablebase = None
+        self.tb_hits = 0
+        self.move_stack = MoveStack()
+        # zetvolgorde in fasen (chess_ordering): hashzet, slagen, killers, history
+        self.ordering = MoveOrdering(self.move_stack)
+        self.board = None
+        self.search = None
+        self.thinking = False
+        self.max_depth = MAX_DEPTH
+        self.first_depth = 1
+        self.deadline = None
+        self.slice_deadline = 0.0
+        self.stopped = False
+        self.nodes = 0
+        self.check_countdown = TIME_CHECK_NODES
+        self.start_time = 0.0
+        # beste zet in de wortel van de lopende iteratie, door _alphabeta zelf bijgehouden
+        self.root_move = 0
+        # resultaat van de diepste afgewerkte iteratie
+        self.best_move = 0
+        self.best_score = 0
+        self.completed_depth = 0
+        self.pv = []
+        # knopen na elke afgewerkte iteratie, voor de effectieve vertakkingsfactor
+        self.iteration_nodes = []
+        # de lopende (of afgewerkte) zoektocht is een ponder-zoektocht na ponder_move van de tegenstander
+        self.pondering = False
+        self.ponder_move = 0
+
+    def start(self, board, time_limit=None, max_depth=MAX_DEPTH, first_depth=1):
+        """
+        Start een nieuwe zoektocht op een kopie van board. time_limit in seconden (None = enkel max_depth).
+        first_depth laat helpers bij parallel zoeken op een andere diepte beginnen.
+        """
+        self.board = board.copy()
+        self.max_depth = max_depth
+        self.first_depth = min(first_depth, max_depth)
+        self.start_time = time.perf_counter()
+        self.deadline = self.start_time + time_limit if time_limit is not None else None
+        self.stopped = False
+        self.nodes = 0
+        self.tb_hits = 0
+        self.best_move = 0
+        self.best_score = 0
+        self.completed_depth = 0
+        self.pv = []
+        self.iteration_nodes = []
+        self.pondering = False
+        if self.book is not None:
+            move = self.book.pick(self.board)
+            if move:
+                self.best_move = move
+                self.pv = [move]
+                self.search = None
+                self.thinking = False
+                return
+        self.tt.new_search()
+        self.ordering.new_search()
+        self.search = self._iterate()
+        self.thinking = True
+
+    def step(self, budget_ms):
+        """
+        Rekent verder gedurende ongeveer budget_ms milliseconden.
+        Geeft True terug als de zoektocht klaar is (diepte bereikt, tijd op of gestopt).
+        """
+        if not self.thinking:
+            return True
+        self.slice_deadline = time.perf_counter() + budget_ms / 1000
+        try:
+            next(self.search)
+        except StopIteration:
+            self.thinking = False
+        return not self.thinking
+
+    def stop(self):
+        # Breekt de zoektocht af; best_move blijft die van de laatste volledige iteratie
+        if self.search is not None:
+            self.search.close()
+        self.thinking = False
+        self.pondering = False
+
+    def expected_reply(self, board):
+        """
+        Verwachte zet van de tegenstander in board (de stelling na onze zet): de tweede zet van de
+        hoofdvariant als we de eerste gespeeld hebben, anders de zet uit de transpositietabel. 0 als er geen is.
+        """
+        if len(self.pv) > 1 and board.undo_stack and board.undo_stack[-1][0] == self.pv[0]:
+            return self.pv[1]
+        entry = self.tt.probe(board.key)
+        return entry[0] if entry is not None else 0
+
+    def ponder(self, board, move, max_depth=MAX_DEPTH, time_limit=None):
+        # Start een zoektocht op board na move; False als move niet legaal is of de partij dan gedaan is
+        if not move or not board.is_legal(move):
+            return False
+        after = board.copy()
+        after.make_move(move)
+        if not after.count_legal_moves():
+            return False
+        self.start(after, time_limit, max_depth)
+        self.pondering = True
+        self.ponder_move = move
+        return True
+
+    def ponder_hit(self, time_limit):
+        """
+        De tegenstander speelde ponder_move: de ponder-zoektocht wordt een gewone zoektocht met time_limit,
+        gerekend vanaf het begin van het ponderen. True als best_move meteen gespeeld mag worden.
+        """
+        self.pondering = False
+        if not self.thinking:
+            return True
+        if self.elapsed() >= time_limit and self.completed_depth:
+            self.stop()
+            return True
+        self.deadline = self.start_time + time_limit
+        return False
+
+    def think(self, board, time_limit=None, max_depth=MAX_DEPTH):
+        # Blokkerende versie, voor gebruik zonder spellus
+        self.start(board, time_limit, max_depth)
+        while not self.step(1000):
+            pass
+        return self.best_move
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def info(self):
+        elapsed = self.elapsed()
+        return {
+            "depth": self.completed_depth,
+            "score": self.best_score,
+            "nodes": self.nodes,
+            "nps": self.nodes / elapsed if elapsed > 0 else 0.0,
+            "time": elapsed,
+            "tbhits": self.tb_hits,
+            "ebf": self.branching_factor(),
+            "fmc": self.ordering.stats()["first_move_cutoff_rate"],
+            "pv": " ".join(move_to_uci(m) for m in self.pv),
+        }
+
+    def branching_factor(self):
+        # Effectieve vertakkingsfactor: knopen van de laatste iteratie gedeeld door die van de vorige
+        counts = self.iteration_nodes
+        if len(counts) < 2:
+            return 0.0
+        previous = counts[-2] - (counts[-3] if len(counts) > 2 else 0)
+        return (counts[-1] - counts[-2]) / previous if previous else 0.0
+
+    # ---------- zoektocht ----------
+
+    def _iterate(self):
+        board = self.board
+        legal = board.legal_moves()
+        if not legal:
+            return
+        # Zelfs als de eerste iteratie niet afraakt is er een zet
+        self.best_move = legal[0]
+        for depth in range(self.first_depth, self.max_depth + 1):
+            self.root_move = 0
+            score = yield from self._alphabeta(depth, -INFINITE, INFINITE, 0)
+            if self.stopped:
+                break
+            self.completed_depth = depth
+            self.iteration_nodes.append(self.nodes)
+            self.best_score = score
+            # de wortel kan in de tabel al vervangen zijn (kleine tabel, gedeelde tabel bij lazy SMP)
+            if self.root_move:
+                self.best_move = self.root_move
+            else:
+                entry = self.tt.probe(board.key)
+                if entry is not None and entry[0]:
+                    self.best_move = entry[0]
+            self.pv = self._pv_from_tt(depth)
+            if not self.pv or self.pv[0] != self.best_move:
+                self.pv = [self.best_move]
+            if abs(score) > MATE_BOUND:
+                break
+
+    def _check_time(self):
+        self.check_countdown = TIME_CHECK_NODES
+        now = time.perf_counter()
+        if self.deadline is not None and now >= self.deadline:
+            self.stopped = True
+        return now >= self.slice_deadline
+
+    def _alphabeta(self, depth, alpha, beta, ply):
+        self.nodes += 1
+        self.check_countdown -= 1
+        if self.check_countdown <= 0 and self._check_time():
+            yield
+            self._check_time()
+        if self.stopped:
+            return 0
+
+        board = self.board
+        if ply and (board.halfmove_clock >= 100 or board.is_repetition()):
+            return 0
+        tablebase = self.tablebase
+        if ply and tablebase is not None and popcount(board.all) <= tablebase.max_men:
+            value = tablebase.probe(board)
+            if value is not None:
+                self.tb_hits += 1
+                return tablebase_score(value, ply)
+        if depth <= 0:
+            return (yield from self._quiescence(alpha, beta, ply))
+
+        tt = self.tt
+        key = board.key
+        tt_move = 0
+        entry = tt.probe(key)
+        if entry is not None:
+            tt_move, tt_score, tt_depth, tt_bound = entry
+            if ply and tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if tt_bound == BOUND_EXACT or \
+                        (tt_bound == BOUND_LOWER and tt_score >= beta) or \
+                        (tt_bound == BOUND_UPPER and tt_score <= alpha):
+                    tt.cutoffs += 1
+                    return tt_score
+
+        ordering = self.ordering
+        picker = ordering.pickers[ply]
+        picker.reset(board, tt_move, ply)
+        original_alpha = alpha
+        best_score = -INFINITE
+        best_move = 0
+        tried = 0
+        while True:
+            move = picker.next_move()
+            if not move:
+                break
+            tried += 1
+            board.make_move(move)
+            score = yield from self._alphabeta(depth - 1, -beta, -alpha, ply + 1)
+            score = -score
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        ordering.cutoff(board, move, ply, depth, tried)
+                        break
+        if not tried:
+            # geen enkele legale zet: mat of pat
+            return -MATE_SCORE + ply if board.in_check() else 0
+
+        if best_score >= beta:
+            bound = BOUND_LOWER
+        elif best_score > original_alpha:
+            bound = BOUND_EXACT
+        else:
+            bound = BOUND_UPPER
+        if not ply:
+            self.root_move = best_move
+        tt.store(key, depth, bound, score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def _quiescence(self, alpha, beta, ply):
+        # Enkel slagen en promoties, tot de stelling rustig is
+        self.nodes += 1
+        self.check_countdown -= 1
+        if self.check_countdown <= 0 and self._check_time():
+            yield
+            self._check_time()
+        if self.stopped:
+            return 0
+        board = self.board
+        stand_pat = evaluate(board)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        picker = self.ordering.pickers[ply]
+        picker.reset(board, 0, ply, captures_only=True)
+        while True:
+            move = picker.next_move()
+            if not move:
+                break
+            board.make_move(move)
+            score = yield from self._quiescence(-beta, -alpha, ply + 1)
+            score = -score
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    def _pv_from_tt(self, depth):
+        # De hoofdvariant volgt de beste zetten in de transpositietabel
+        board = self.board
+        pv = []
+        for _ in range(depth):
+            entry = self.tt.probe(board.key)
+            if entry is None or entry[0] not in board.legal_moves():
+                break
+            pv.append(entry[0])
+            board.make_move(entry[0])
+            if board.is_repetition():
+                break
+        for _ in pv:
+            board.unmake_move()
+        return pv
@@ -0,0 +1,142 @@
+"""
+   Statische evaluatie: materiaal + stuk-veld tabellen (PST), getaperd tussen middenspel en eindspel
+   ChessBoard houdt de som bij in board.mg_score, board.eg_score en board.phase, aangepast in make/unmake.
+   Een blad evalueren is dan enkel die twee accumulatoren mengen volgens de fase.
+
+   De tabellen volgen de volgorde van chess_board: PAWN, KNIGHT, BISHOP, TOWER, QUEEN, KING
+   en PST_MG[side * 6 + piece_type][sq] bevat materiaal + positie, positief voor wit en negatief voor zwart.
+"""
+
+MG_VALUES = [82, 337, 365, 477, 1025, 0]
+EG_VALUES = [94, 281, 297, 512, 936, 0]
+# Fase: 24 met alle stukken op het bord, 0 als er enkel koningen en pionnen zijn
+PHASE_WEIGHTS = [0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# Tabellen zoals je ze ziet vanuit wit: eerste rij = rank 8, laatste rij = rank 1
+_PAWN = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0]
+_PAWN_EG = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    15, 15, 15, 15, 15, 15, 15, 15,
+    5, 5, 5, 5, 5, 5, 5, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0]
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50]
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20]
+_TOWER = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0]
+_QUEEN = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20]
+_KING_MG = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20]
+_KING_EG = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50]
+
+_MG_TABLES = [_PAWN, _KNIGHT, _BISHOP, _TOWER, _QUEEN, _KING_MG]
+_EG_TABLES = [_PAWN_EG, _KNIGHT, _BISHOP, _TOWER, _QUEEN, _KING_EG]
+
+
+def _build(tables, values):
+    # Index 0..5 wit, 6..11 zwart (gespiegeld en negatief), per veld a1 = 0 .. h8 = 63
+    pst = []
+    for side in (0, 1):
+        for piece_type in range(6):
+            row = []
+            for sq in range(64):
+                rank, file = divmod(sq, 8)
+                printed = (7 - rank) * 8 + file if side == 0 else rank * 8 + file
+                value = values[piece_type] + tables[piece_type][printed]
+                row.append(value if side == 0 else -value)
+            pst.append(row)
+    return pst
+
+
+PST_MG = _build(_MG_TABLES, MG_VALUES)
+PST_EG = _build(_EG_TABLES, EG_VALUES)
+# Fasegewicht per stukcode (side * 6 + piece_type)
+PHASE_BY_CODE = PHASE_WEIGHTS + PHASE_WEIGHTS
+
+
+def taper(mg, eg, phase):
+    if phase > MAX_PHASE:
+        phase = MAX_PHASE
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+def evaluate(board):
+    # Vanuit het standpunt van de speler aan zet; leest enkel de accumulatoren van het bord
+    score = taper(board.mg_score, board.eg_score, board.phase)
+    return -score if board.side else score
+
+
+def full_accumulators(board):
+    # Berekent (mg, eg, phase) van nul, over alle 64 velden
+    mg = eg = phase = 0
+    for sq, code in enumerate(board.squares):
+        if code >= 0:
+            mg += PST_MG[code][sq]
+            eg += PST_EG[code][sq]
+            phase += PHASE_BY_CODE[code]
+    return mg, eg, phase
+
+
+def evaluate_full(board):
+    # Zelfde resultaat als evaluate, maar zonder de accumulatoren (referentie en benchmark)
+    mg, eg, phase = full_accumulators(board)
+    score = taper(mg, eg, phase)
+    return -score if board.side else score
@@ -0,0 +1,139 @@
+from itertools import chain
+import numpy as np
+from chess_board import ChessBoard, SIDE_WHITE
+from chess_eval import PST_MG, PST_EG, PHASE_BY_CODE, MAX_PHASE
+
+"""
+   Kenmerken en evaluatie voor duizenden stellingen tegelijk, met numpy
+   Een stelling wordt 12 vlakken van 64 velden (0/1), in de volgorde van de stukcodes van chess_board
+   (side * 6 + piece_type) en met a1 = 0 .. h8 = 63, samen 768 kenmerken:
+       planes = board_planes(boards)            # (n, 12, 64) uint8, uit de bitborden met unpackbits
+       planes = record_planes(records)          # idem uit de records van chess_selfplay
+   Een evaluator rekent de hele reeks in 1 matrixvermenigvuldiging uit, de scores zijn vanuit wit:
+       LinearEvaluator.from_pst()(planes)       # zelfde getallen als chess_eval, maar per batch
+       evaluate_batch(MlpEvaluator.load("net.npz"), boards)   # vanuit de speler aan zet, zoals evaluate
+"""
+
+PLANES = 12
+FEATURES = PLANES * 64
+MLP_HIDDEN = 32
+
+
+def pack_squares(squares):
+    # 64 stukcodes als 32 bytes van 2 nibbles (stukcode + 1, 0 = leeg), het bordveld van chess_selfplay records
+    codes = np.asarray(squares, dtype=np.int8).astype(np.uint8) + 1
+    return codes[0::2] | (codes[1::2] << 4)
+
+
+def unpack_squares(records):
+    # (n, 64) stukcodes van chess_board, EMPTY (-1) voor een leeg veld
+    board = records["board"]
+    squares = np.empty((len(board), 64), dtype=np.int8)
+    squares[:, 0::2] = board & 0x0F
+    squares[:, 1::2] = board >> 4
+    return squares - 1
+
+
+def bitboards(boards):
+    # (n, 12) uint64: de 12 bitborden van elke stelling, met fromiter zonder tussenlijst per stelling
+    values = chain.from_iterable(board.pieces[0] + board.pieces[1] for board in boards)
+    return np.fromiter(values, dtype=np.uint64, count=PLANES * len(boards)).reshape(-1, PLANES)
+
+
+def board_planes(boards):
+    # De bitborden als bytes (little-endian) en dan uitgepakt per bit: bit i van een bitbord is veld i
+    packed = bitboards(boards)
+    bits = np.unpackbits(packed.view(np.uint8), bitorder="little")
+    return bits.reshape(len(packed), PLANES, 64)
+
+
+def record_planes(records):
+    # Vlakken uit chess_selfplay records (of uit een (n, 64) array stukcodes met -1 voor een leeg veld)
+    if records.dtype.names:
+        squares = unpack_squares(records)
+    else:
+        squares = records
+    return (squares[:, None, :] == np.arange(PLANES, dtype=np.int8)[None, :, None]).astype(np.uint8)
+
+
+def sides(boards):
+    return np.array([board.side for board in boards], dtype=np.uint8)
+
+
+def load_epd(path):
+    # Borden uit een EPD bestand (de eerste 4 velden zijn de stelling, de rest zijn opdrachten)
+    boards = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 4:
+                boards.append(ChessBoard(" ".join(fields[:4])))
+    return boards
+
+
+class LinearEvaluator:
+    """
+    score = planes . weights, getaperd tussen middenspel en eindspel zoals chess_eval
+    (met eg_weights = None is het een gewone lineaire functie van de 768 kenmerken).
+    """
+
+    def __init__(self, mg_weights, eg_weights=None, phase_weights=None):
+        columns = [np.asarray(mg_weights, dtype=np.float32).reshape(FEATURES)]
+        if eg_weights is not None:
+            columns.append(np.asarray(eg_weights, dtype=np.float32).reshape(FEATURES))
+            columns.append(np.asarray(phase_weights, dtype=np.float32).reshape(FEATURES))
+        # alle kolommen samen: 1 matrixvermenigvuldiging per batch
+        self.weights = np.stack(columns, axis=1)
+        self.tapered = eg_weights is not None
+
+    @classmethod
+    def from_pst(cls):
+        phase = np.repeat(np.array(PHASE_BY_CODE, dtype=np.float32), 64)
+        return cls(PST_MG, PST_EG, phase)
+
+    def __call__(self, planes):
+        # Scores vanuit wit, als int32; gehele gewichten en sommen < 2^24 zijn exact in float32
+        out = planes.reshape(len(planes), FEATURES).astype(np.float32) @ self.weights
+        if not self.tapered:
+            return np.rint(out[:, 0]).astype(np.int32)
+        mg, eg, phase = np.rint(out).astype(np.int32).T
+        phase = np.minimum(phase, MAX_PHASE)
+        return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+class MlpEvaluator:
+    """
+    Klein netwerk: 768 kenmerken -> hidden (clipped ReLU) -> 1 score vanuit wit.
+    De gewichten staan in een .npz bestand met w1 (768, hidden), b1, w2 (hidden,), b2.
+    """
+
+    def __init__(self, w1, b1, w2, b2):
+        self.w1 = np.asarray(w1, dtype=np.float32)
+        self.b1 = np.asarray(b1, dtype=np.float32)
+        self.w2 = np.asarray(w2, dtype=np.float32)
+        self.b2 = np.float32(b2)
+
+    @classmethod
+    def random(cls, hidden=MLP_HIDDEN, seed=0):
+        rng = np.random.default_rng(seed)
+        return cls(rng.normal(0, 0.05, (FEATURES, hidden)), np.zeros(hidden),
+                   rng.normal(0, 100, hidden), 0.0)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["w1"], data["b1"], data["w2"], data["b2"])
+
+    def save(self, path):
+        np.savez(path, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+    def __call__(self, planes):
+        hidden = planes.reshape(len(planes), FEATURES).astype(np.float32) @ self.w1 + self.b1
+        np.clip(hidden, 0.0, 1.0, out=hidden)
+        return np.rint(hidden @ self.w2 + self.b2).astype(np.int32)
+
+
+def evaluate_batch(evaluator, boards):
+    # Scores vanuit de speler aan zet voor een lijst borden, zoals chess_eval.evaluate
+    scores = evaluator(board_planes(boards))
+    return np.where(sides(boards) == SIDE_WHITE, scores, -scores)
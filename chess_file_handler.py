@@ -0,0 +1,278 @@
+import multiprocessing as mp
+import os
+import re
+from chess_board import ChessBoard, START_FEN
+
+"""
+   PGN lezen en schrijven, ook voor databanken van vele GB met miljoenen partijen
+   read_games is een generator: het bestand wordt regel per regel gelezen en er is telkens maar 1 partij
+   in het geheugen. Met headers_only=True wordt de zettekst overgeslagen zonder ze te ontleden.
+   read_games_parallel snijdt het bestand in stukken op de grens van een partij ("[Event ") en leest
+   elk stuk in een ander proces; enkel het resultaat van fn(game) komt terug naar het hoofdproces.
+   PgnWriter bundelt de partijen in een buffer en schrijft die in grote blokken weg.
+
+   for game in read_games("twic.pgn"):
+       game.headers["White"], game.moves          # zetten in SAN, zoals ze in het bestand staan
+       for board, move in game.replay(): ...      # stelling voor de zet en de zet zelf (16-bit)
+"""
+
+PGN_ENCODING = "utf-8"
+PGN_CHUNK_BYTES = 8 << 20
+PGN_WRITE_BUFFER = 1 << 20
+PGN_LINE_WIDTH = 80
+GAME_START = b"[Event "
+# Seven Tag Roster: deze tags komen altijd eerst en in deze volgorde
+ROSTER_TAGS = (("Event", "?"), ("Site", "?"), ("Date", "????.??.??"), ("Round", "?"),
+               ("White", "?"), ("Black", "?"), ("Result", "*"))
+_ROSTER_NAMES = {tag for tag, _ in ROSTER_TAGS}
+
+_TAG_RE = re.compile(rb'\[(\w+)\s+"((?:[^"\\]|\\.)*)"')
+_UNESCAPE_RE = re.compile(r"\\(.)")
+# {commentaar}, ;commentaar tot het einde van de regel en losse [%clk ...] / [%eval ...] buiten een commentaar
+_COMMENT_RE = re.compile(r"\{[^}]*\}|;[^\n]*|\[[^\]\n]*\]")
+_VARIATION_RE = re.compile(r"\([^()]*\)")
+# Alles in de zettekst dat geen zet is: zetnummers (12. of 12...), NAG's ($1) en het resultaat
+_NOISE_RE = re.compile(r"\d+\.(?:\.\.)?|\$\d+|1-0|0-1|1/2-1/2|\*")
+
+
+class PgnGame:
+    __slots__ = ("headers", "moves", "result", "offset")
+
+    def __init__(self, headers, moves, result="*", offset=0):
+        self.headers = headers
+        # None als de zettekst overgeslagen werd (headers_only)
+        self.moves = moves
+        self.result = result
+        # positie in het bestand waar de partij begint
+        self.offset = offset
+
+    def start_board(self):
+        return ChessBoard(self.headers.get("FEN", START_FEN))
+
+    def replay(self):
+        """
+        Speelt de partij na en geeft (board, move) voor elke zet, met board de stelling voor de zet.
+        Het bord wordt hergebruikt: kopieer het als je het wil bijhouden. ValueError bij een ongeldige zet.
+        """
+        board = self.start_board()
+        for san in self.moves or ():
+            move = board.parse_san(san)
+            yield board, move
+            board.make_move(move)
+
+
+def parse_movetext(text):
+    # Commentaar en varianten (die genest kunnen zijn) eruit, dan blijven de zetten van de hoofdlijn over
+    if "{" in text or ";" in text or "[" in text:
+        text = _COMMENT_RE.sub(" ", text)
+    while "(" in text:
+        stripped = _VARIATION_RE.sub(" ", text)
+        if stripped == text:
+            break
+        text = stripped
+    return _NOISE_RE.sub(" ", text).split()
+
+
+def _make_game(headers, movetext, offset, headers_only):
+    moves = None if headers_only else parse_movetext(b"".join(movetext).decode("latin-1"))
+    return PgnGame(headers, moves, headers.get("Result", "*"), offset)
+
+
+def _comment_open(line, in_comment):
+    # Staat er na deze regel een {commentaar} open? PGN commentaar nest niet: de laatste accolade beslist
+    opened, closed = line.rfind(b"{"), line.rfind(b"}")
+    if opened == closed:
+        return in_comment
+    return opened > closed
+
+
+def _iter_games(f, headers_only, start=0, end=None):
+    # Leest partijen vanaf de huidige positie van f (= start) tot de eerste partij die op of na end begint
+    offset = game_offset = start
+    headers = {}
+    movetext = []
+    in_moves = False
+    # staat er een {commentaar} open over het einde van de regel (bv. een afgebroken [%clk ...] of [%eval ...])
+    in_comment = False
+    for line in f:
+        match = _TAG_RE.match(line) if line[:1] == b"[" and not in_comment else None
+        if match:
+            if in_moves or not headers:
+                # een nieuwe partij begint
+                if in_moves:
+                    yield _make_game(headers, movetext, game_offset, headers_only)
+                    headers, movetext, in_moves = {}, [], False
+                if end is not None and offset >= end:
+                    return
+                game_offset = offset
+            value = match.group(2).decode(PGN_ENCODING, "replace")
+            if "\\" in value:
+                value = _UNESCAPE_RE.sub(r"\1", value)
+            headers[match.group(1).decode("ascii")] = value
+        elif not line.isspace() and (in_moves or line[:1] != b"["):
+            # zetten, ook een regel die met "[" begint maar geen tag is; een losse "[" tussen de tags telt niet
+            in_moves = True
+            in_comment = _comment_open(line, in_comment)
+            if not headers_only:
+                movetext.append(line)
+        offset += len(line)
+    if headers or movetext:
+        yield _make_game(headers, movetext, game_offset, headers_only)
+
+
+def read_games(source, headers_only=False):
+    """
+    Generator over de partijen in source (een bestandsnaam of een binair geopend bestand).
+    Het geheugengebruik hangt niet af van de grootte van het bestand.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from _iter_games(f, headers_only)
+    else:
+        yield from _iter_games(source, headers_only)
+
+
+def split_chunks(path, chunk_bytes=PGN_CHUNK_BYTES):
+    # (start, end) stukken van ongeveer chunk_bytes, elk start op een "[Event " tag na een lege regel
+    # (zoals PgnWriter en de meeste exports ze scheiden): een "[Event " regel in een afgebroken commentaar
+    # of een losse "[" in de zetten begint geen stuk, net zoals _iter_games er geen nieuwe partij begint
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        pos = chunk_bytes
+        while pos < size:
+            f.seek(pos)
+            f.readline()
+            found = None
+            previous_blank = False
+            while True:
+                line_start = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if previous_blank and line.startswith(GAME_START) and _TAG_RE.match(line):
+                    found = line_start
+                    break
+                previous_blank = line.isspace()
+            if found is None:
+                break
+            bounds.append(found)
+            pos = found + chunk_bytes
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _read_chunk(task):
+    path, start, end, headers_only, fn = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        if fn is None:
+            return list(_iter_games(f, headers_only, start, end))
+        return [fn(game) for game in _iter_games(f, headers_only, start, end)]
+
+
+def read_games_parallel(path, fn=None, headers_only=False, processes=None, chunk_bytes=PGN_CHUNK_BYTES):
+    """
+    Leest path in stukken over een pool van processen en geeft fn(game) voor elke partij, in de volgorde
+    van het bestand. fn moet op moduleniveau staan (pickle); zonder fn komen de partijen zelf terug.
+    Laat fn zoveel mogelijk werk doen: de partijen naar het hoofdproces sturen kost meer dan ze lezen.
+    """
+    tasks = [(path, start, end, headers_only, fn) for start, end in split_chunks(path, chunk_bytes)]
+    with mp.Pool(processes) as pool:
+        for results in pool.imap(_read_chunk, tasks):
+            yield from results
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def format_game(headers, moves, result=None):
+    """
+    Een partij als PGN tekst. headers is een dict, moves een lijst zetten in SAN.
+    De Seven Tag Roster komt eerst (met "?" als een tag ontbreekt), dan de rest van de tags.
+    """
+    if result is None:
+        result = headers.get("Result", "*")
+    lines = []
+    for tag, default in ROSTER_TAGS:
+        value = result if tag == "Result" else headers.get(tag, default)
+        lines.append(f'[{tag} "{_escape(value)}"]')
+    for tag, value in headers.items():
+        if tag not in _ROSTER_NAMES:
+            lines.append(f'[{tag} "{_escape(value)}"]')
+    lines.append("")
+
+    number, black = 1, False
+    if "FEN" in headers:
+        fields = headers["FEN"].split()
+        black = len(fields) > 1 and fields[1] == "b"
+        number = int(fields[5]) if len(fields) > 5 else 1
+    tokens = []
+    for san in moves:
+        if not black:
+            tokens.append(f"{number}.")
+        elif not tokens:
+            tokens.append(f"{number}...")
+        tokens.append(san)
+        if black:
+            number += 1
+        black = not black
+    tokens.append(result)
+
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > PGN_LINE_WIDTH:
+            lines.append(line)
+            line = token
+        else:
+            line = line + " " + token if line else token
+    lines.append(line)
+    lines.append("")
+    lines.append("")
+    return "\n".join(lines)
+
+
+class PgnWriter:
+    """
+    Schrijft partijen naar een PGN bestand via een buffer van buffer_bytes, voor het exporteren van veel partijen.
+    with PgnWriter("out.pgn") as writer:
+        writer.write_game(headers, moves)
+    """
+
+    def __init__(self, path, buffer_bytes=PGN_WRITE_BUFFER, append=False):
+        self.file = open(path, "ab" if append else "wb")
+        self.buffer_bytes = buffer_bytes
+        self.parts = []
+        self.pending = 0
+        self.games = 0
+
+    def write_game(self, headers, moves, result=None):
+        text = format_game(headers, moves, result)
+        self.parts.append(text)
+        # lengte in tekens, voor het beslissen wanneer te schrijven is dat nauwkeurig genoeg
+        self.pending += len(text)
+        self.games += 1
+        if self.pending >= self.buffer_bytes:
+            self.flush()
+
+    def write(self, game):
+        self.write_game(game.headers, game.moves or [], game.result)
+
+    def flush(self):
+        if self.parts:
+            self.file.write("".join(self.parts).encode(PGN_ENCODING))
+            self.parts = []
+            self.pending = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -5,7 +5,12 @@ from chess_area_game import GameAreaChessBoard
 from chess_area_history import GameAreaHistory
 from chess_area_players import GameAreaPlayers
 from chess_area_controls import GameAreaControls
-from chess_board import ChessBoard
+from chess_board import ChessBoard, SIDE_WHITE
+from chess_engine import ChessEngine, MAX_DEPTH
+from chess_tt import TranspositionTable
+from chess_book import load_book
+from chess_tablebase import load_tablebases
+from chess_file_handler import format_game
 
 """
    Dit is het game object dat alles van het 
@@ -21,13 +26,102 @@ class ChessGame(Game):
         self.history_area = GameAreaHistory(self, HIST_RECT)
         self.player_area = GameAreaPlayers(self, PLAYER_RECT)
         self.control_area = GameAreaControls(self, CONTROL_RECT)
+        self.areas = [self.chessboard_area, self.history_area, self.player_area, self.control_area]
 
         # We definieren de datastructuren van ons spel
         self.chess_board = ChessBoard()
+        self.players = [PLAYER_HUMAN, PLAYER_ENGINE]   # wit, zwart
+        self.engine = ChessEngine(TranspositionTable(HASH_SIZE_MB))
+        self.book = load_book(BOOK_FILE)
+        self.engine.book = self.book
+        self.engine.tablebase = load_tablebases(TABLEBASE_DIR)
+        self.move_time = ENGINE_MOVE_TIME
+        self.max_depth = MAX_DEPTH
+        self.engine_nodes = 0
+        # ponder hit met een afgewerkte zoektocht: de motor speelt zonder verder te rekenen
+        self.ponder_ready = False
+        self.move_history = []
+        self.game_over = False
+
+    def play_move(self, move):
+        # Elke zet (van mens of motor) passeert hier
+        if self.engine.pondering:
+            if move == self.engine.ponder_move:
+                self.ponder_ready = self.engine.ponder_hit(self.move_time)
+            else:
+                self.engine.stop()
+        self.chess_board.make_move(move)
+        self.move_history.append(move)
+        self.chessboard_area.hint_move = 0
+        self.chessboard_area.mark_dirty()
+        self.history_area.mark_dirty()
+        board = self.chess_board
+        if not board.legal_moves() or board.halfmove_clock >= 100 or board.is_repetition():
+            self.game_over = True
+        elif PONDER and self.players[board.side] == PLAYER_HUMAN and self.players[board.side ^ 1] == PLAYER_ENGINE:
+            # de mens denkt na: de motor zoekt al verder op de zet die hij verwacht
+            self.engine.ponder(board, self.engine.expected_reply(board), self.max_depth, PONDER_MAX_TIME)
 
     def update_data(self):
         # whatever needs to change (animation,...)
-        pass
+        # Is de motor aan zet, dan begint die te denken; het rekenwerk gebeurt in execute_background
+        if not self.game_over and self.players[self.chess_board.side] == PLAYER_ENGINE \
+                and not self.engine.thinking:
+            if self.ponder_ready:
+                self.ponder_ready = False
+                self.play_move(self.engine.best_move)
+                return
+            self.engine.start(self.chess_board, time_limit=self.move_time, max_depth=self.max_depth)
+            if not self.engine.thinking:
+                # zet uit het openingsboek, er moest niet gezocht worden
+                self.play_move(self.engine.best_move)
+        if HEADLESS and self.game_over:
+            # zonder venster is er niets meer te doen na de partij
+            self.keep_running = False
+
+    def KEYDOWN(self, key):
+        # HINT_KEY toont de beste boekzet, de andere toetsen gaan naar Game (profiler)
+        if key == HINT_KEY:
+            self.chessboard_area.hint()
+        else:
+            Game.KEYDOWN(self, key)
+
+    def is_busy(self):
+        # De motor rekent (ook ponderen, hoogstens PONDER_MAX_TIME), er moet iets getekend worden of er wordt gesleept
+        return self.engine.thinking or self.full_redraw \
+            or any(area.dirty or area.isDragged for area in self.areas)
+
+    def execute_background(self, budget_ms):
+        # De motor rekent enkel in wat overblijft van het frame, ook tijdens het ponderen
+        engine = self.engine
+        if not engine.thinking:
+            return
+        nodes = engine.nodes
+        done = engine.step(budget_ms)
+        self.profiler.add_nodes(engine.nodes - nodes)
+        if done and not engine.pondering:
+            self.engine_nodes += engine.nodes
+            self.play_move(engine.best_move)
+
+    def result(self):
+        # PGN resultaat: "1-0", "0-1", "1/2-1/2" of "*" zolang de partij bezig is
+        board = self.chess_board
+        if not self.game_over:
+            return "*"
+        if not board.count_legal_moves() and board.in_check():
+            return "0-1" if board.side == SIDE_WHITE else "1-0"
+        return "1/2-1/2"
+
+    def to_pgn(self, headers=None):
+        board = ChessBoard()
+        moves = []
+        for move in self.move_history:
+            moves.append(board.san(move))
+            board.make_move(move)
+        headers = dict(headers or {})
+        headers.setdefault("White", self.players[0])
+        headers.setdefault("Black", self.players[1])
+        return format_game(headers, moves, self.result())
 
     def clear_window(self):
         # Omdat verschillende delen de clip rect kunnen verzetten, resetten we de clip rect tot het volledige venster
@@ -36,19 +130,17 @@ class ChessGame(Game):
         self.win.fill(GAME_BG_COLOR)
 
     def draw(self):
-        self.clear_window()
-        self.chessboard_area.draw()
-        self.history_area.draw()
-        self.player_area.draw()
-        self.control_area.draw()
-
-    """
-    Voorbeeld hoe event functies doorgegeven worden naar lager niveau
-    """
-    def MOUSEBUTTONDOWN(self, mouse_x, mouse_y):
-        self.chessboard_area.MOUSEBUTTONDOWN(mouse_x, mouse_y)
-        self.history_area.MOUSEBUTTONDOWN(mouse_x, mouse_y)
-        self.player_area.MOUSEBUTTONDOWN(mouse_x, mouse_y)
-        self.control_area.MOUSEBUTTONDOWN(mouse_x, mouse_y)
-
-
+        # Enkel de areas die dirty zijn; bij full_redraw eerst het hele venster
+        if self.full_redraw:
+            self.full_redraw = False
+            self.clear_window()
+            for area in self.areas:
+                area.mark_dirty()
+            self.dirty_rects = [(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)]
+            for area in self.areas:
+                area.redraw()
+            return
+        for area in self.areas:
+            rect = area.redraw()
+            if rect is not None:
+                self.dirty_rects.append(rect)
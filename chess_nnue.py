@@ -0,0 +1,200 @@
+import os
+import struct
+import numpy as np
+from chess_board import ChessBoard, START_FEN, EMPTY, PAWN, TOWER, MAX_PLY, FLAG_PROMO, FLAG_EP_CAPTURE, \
+    FLAG_CASTLE_KING, FLAG_CASTLE_QUEEN, CASTLING_TOWER, SIDE_WHITE
+
+"""
+   NNUE-achtige evaluatie: een netwerk waarvan de eerste laag incrementeel bijgehouden wordt
+   De kenmerken zijn de 768 (stukcode, veld) paren, 1 keer vanuit wit en 1 keer vanuit zwart gezien
+   (kleuren omgewisseld en het bord gespiegeld). De eerste laag geeft per kant een accumulator van
+   hidden int16 waarden; een zet verandert maar 2 tot 4 kenmerken, dus make_move telt enkel die rijen
+   van W0 erbij of trekt ze af. Bij evaluate rekenen enkel de kleine lagen daarna:
+       [acc(aan zet), acc(tegenstander)] -> clipped ReLU -> L1 (int8) -> clipped ReLU -> 1 score
+
+   NnueBoard is een ChessBoard met een stapel accumulators: unmake_move zakt gewoon 1 plaats terug.
+   Het gewone ChessBoard en de zoektocht met de PST evaluatie blijven ongewijzigd.
+
+   net = NnueNetwork("net.nnue")          # gewichten via np.memmap, laden kost geen tijd
+   board = NnueBoard(fen, net)
+   board.make_move(move); board.evaluate(); board.unmake_move()
+
+   Bestand: header | W0 int16 (768, hidden) | b0 int16 | W1 int8 (2 * hidden, l1) | b1 int32 | W2 int8 (l1) | b2 int32
+   elke sectie begint op een veelvoud van 64 bytes.
+"""
+
+NNUE_MAGIC = b"TCMNNUE\x01"
+NNUE_VERSION = 1
+NNUE_FEATURES = 768
+NNUE_HIDDEN = 128
+NNUE_L1 = 32
+NNUE_QA = 127            # de accumulators worden op 0 .. QA geknipt
+NNUE_SHIFT = 6           # W1 staat in 1/64
+NNUE_OUTPUT_DIV = 16     # uitvoer / 16 = centipionnen
+NNUE_STACK = 2 * MAX_PLY
+# magic, versie, kenmerken, hidden, l1
+_HEADER = struct.Struct("<8sIIII")
+_ALIGN = 64
+
+
+def _feature(view, code, sq):
+    # Kenmerk van (code, sq) vanuit view: zwart ziet het bord gespiegeld en met de kleuren omgewisseld
+    if view == SIDE_WHITE:
+        return code * 64 + sq
+    return (code + 6) % 12 * 64 + (sq ^ 56)
+
+
+# FEATURE_PAIRS[code][sq] = [kenmerk voor wit, kenmerk voor zwart], om W0[pair] als (2, hidden) te lezen
+FEATURE_PAIRS = [[np.array([_feature(0, code, sq), _feature(1, code, sq)]) for sq in range(64)]
+                 for code in range(12)]
+
+
+def _sections(hidden, l1):
+    # (naam, dtype, shape) in de volgorde van het bestand
+    return [("w0", np.int16, (NNUE_FEATURES, hidden)), ("b0", np.int16, (hidden,)),
+            ("w1", np.int8, (2 * hidden, l1)), ("b1", np.int32, (l1,)),
+            ("w2", np.int8, (l1,)), ("b2", np.int32, (1,))]
+
+
+def write_network(path, w0, b0, w1, b1, w2, b2):
+    hidden, l1 = np.shape(w1)[0] // 2, np.shape(w1)[1]
+    arrays = {"w0": w0, "b0": b0, "w1": w1, "b1": b1, "w2": w2, "b2": np.reshape(b2, 1)}
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(NNUE_MAGIC, NNUE_VERSION, NNUE_FEATURES, hidden, l1))
+        for name, dtype, shape in _sections(hidden, l1):
+            f.write(b"\x00" * (-f.tell() % _ALIGN))
+            f.write(np.ascontiguousarray(arrays[name], dtype=dtype).reshape(shape).tobytes())
+
+
+def random_network(path, hidden=NNUE_HIDDEN, l1=NNUE_L1, seed=0):
+    # Willekeurige gekwantiseerde gewichten, voor benchmarks en tests van de incrementele update
+    rng = np.random.default_rng(seed)
+    write_network(path,
+                  rng.integers(-16, 17, (NNUE_FEATURES, hidden)), rng.integers(0, 64, hidden),
+                  rng.integers(-64, 65, (2 * hidden, l1)), rng.integers(-512, 513, l1),
+                  rng.integers(-64, 65, l1), 0)
+
+
+class NnueNetwork:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, features, self.hidden, self.l1 = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != NNUE_MAGIC or version != NNUE_VERSION or features != NNUE_FEATURES:
+            raise ValueError(f"{path} is not a network file (version {NNUE_VERSION})")
+        offset = _HEADER.size
+        arrays = {}
+        for name, dtype, shape in _sections(self.hidden, self.l1):
+            offset += -offset % _ALIGN
+            # asarray: een gewone ndarray op het gemapte geheugen, zonder de overhead van de memmap subklasse
+            arrays[name] = np.asarray(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+            offset += arrays[name].nbytes
+        self.w0 = arrays["w0"]
+        self.b0 = arrays["b0"]
+        # De kleine lagen rekenen in float32 (BLAS): alle tussenwaarden zijn gehele getallen < 2^24 en dus exact.
+        # W1 staat er ook met de helften omgewisseld, zodat de accumulator van de speler aan zet altijd eerst komt
+        w1 = arrays["w1"].astype(np.float32)
+        self.w1 = (w1, np.concatenate((w1[self.hidden:], w1[:self.hidden])))
+        self.b1 = arrays["b1"].astype(np.float32)
+        self.w2 = arrays["w2"].astype(np.float32)
+        self.b2 = int(arrays["b2"][0])
+        self.x = np.empty(2 * self.hidden, dtype=np.float32)
+
+    def accumulate(self, squares):
+        # Volledige berekening van de (2, hidden) accumulators uit de mailbox
+        features = [[], []]
+        for sq, code in enumerate(squares):
+            if code != EMPTY:
+                pair = FEATURE_PAIRS[code][sq]
+                features[0].append(pair[0])
+                features[1].append(pair[1])
+        acc = np.empty((2, self.hidden), dtype=np.int16)
+        for view in (0, 1):
+            acc[view] = (self.b0 + self.w0[features[view]].sum(axis=0)).astype(np.int16)
+        return acc
+
+    def output(self, acc, side):
+        # De lagen na de accumulators, score vanuit side (de speler aan zet)
+        # ufuncs met out in plaats van np.clip en astype: bij zulke kleine vectoren telt elke oproep
+        x = self.x
+        np.maximum(acc.reshape(2 * self.hidden), 0, out=x)
+        np.minimum(x, NNUE_QA, out=x)
+        h = x @ self.w1[side]
+        h += self.b1
+        h *= 1 / (1 << NNUE_SHIFT)
+        np.floor(h, out=h)
+        np.maximum(h, 0, out=h)
+        np.minimum(h, NNUE_QA, out=h)
+        return (int(h @ self.w2) + self.b2) // NNUE_OUTPUT_DIV
+
+    def evaluate_full(self, board):
+        # Referentie: alles herberekenen, voor een gewoon ChessBoard
+        return self.output(self.accumulate(board.squares), board.side)
+
+
+class NnueBoard(ChessBoard):
+    def __init__(self, fen=START_FEN, network=None):
+        self.network = network
+        self.acc = np.empty((NNUE_STACK, 2, network.hidden), dtype=np.int16)
+        self.acc_ply = 0
+        ChessBoard.__init__(self, fen)
+
+    def clear(self):
+        ChessBoard.clear(self)
+        self.acc_ply = 0
+        self.acc[0] = self.network.b0
+
+    def put_piece(self, side, piece_type, sq):
+        ChessBoard.put_piece(self, side, piece_type, sq)
+        self.acc[self.acc_ply] += self.network.w0[FEATURE_PAIRS[side * 6 + piece_type][sq]]
+
+    def remove_piece(self, sq):
+        code = self.squares[sq]
+        ChessBoard.remove_piece(self, sq)
+        self.acc[self.acc_ply] -= self.network.w0[FEATURE_PAIRS[code][sq]]
+
+    def copy(self):
+        board = ChessBoard.copy(self)
+        board.network = self.network
+        board.acc = self.acc.copy()
+        board.acc_ply = self.acc_ply
+        return board
+
+    def make_move(self, move):
+        ChessBoard.make_move(self, move)
+        captured = self.undo_stack[-1][1]
+        frm = move & 63
+        to = move >> 6 & 63
+        flag = move >> 12
+        side = self.side ^ 1
+        code = self.squares[to]
+        w0 = self.network.w0
+
+        ply = self.acc_ply
+        if ply + 1 == len(self.acc):
+            self.acc = np.concatenate((self.acc, np.empty_like(self.acc)))
+        acc = self.acc[ply + 1]
+        # het stuk verlaat frm (een pion bij promotie) en staat nu op to
+        np.subtract(self.acc[ply], w0[FEATURE_PAIRS[side * 6 + PAWN if flag & FLAG_PROMO else code][frm]], out=acc)
+        acc += w0[FEATURE_PAIRS[code][to]]
+        if captured != EMPTY:
+            acc -= w0[FEATURE_PAIRS[captured][to]]
+        elif flag == FLAG_EP_CAPTURE:
+            acc -= w0[FEATURE_PAIRS[(side ^ 1) * 6 + PAWN][to - 8 if side == SIDE_WHITE else to + 8]]
+        elif flag == FLAG_CASTLE_KING or flag == FLAG_CASTLE_QUEEN:
+            t_from, t_to = CASTLING_TOWER[to]
+            pairs = FEATURE_PAIRS[side * 6 + TOWER]
+            acc += w0[pairs[t_to]] - w0[pairs[t_from]]
+        self.acc_ply = ply + 1
+
+    def unmake_move(self):
+        ChessBoard.unmake_move(self)
+        self.acc_ply -= 1
+
+    def evaluate(self):
+        # Vanuit de speler aan zet, zoals chess_eval.evaluate
+        return self.network.output(self.acc[self.acc_ply], self.side)
+
+
+def load_network(path):
+    # Het netwerk als het bestand bestaat, anders None
+    return NnueNetwork(path) if path and os.path.exists(path) else None
@@ -0,0 +1,271 @@
+from chess_board import EMPTY, PAWN, KING, BISHOP, TOWER, QUEEN, FLAG_CAPTURE, FLAG_PROMO, FLAG_EP_CAPTURE, \
+    GEN_CAPTURES, GEN_QUIETS, MAX_PLY, MAX_MOVES
+from chess_sliders import bishop_attacks, tower_attacks
+
+"""
+   Zetvolgorde voor de zoektocht: de zetten worden in fasen gegenereerd en pas gescoord als ze nodig zijn
+       1. de zet uit de hashtabel (zonder iets te genereren, enkel board.is_legal)
+       2. slagen en promoties, beste eerst volgens MVV-LVA; slagen die volgens SEE materiaal verliezen
+          worden uitgesteld tot fase 5
+       3. de 2 killers van deze ply (stille zetten die op deze diepte al een cutoff gaven)
+       4. de stille zetten, gesorteerd op history (hoe vaak de zet elders een cutoff gaf)
+       5. de uitgestelde slagen (in quiescence vallen die weg: captures_only geeft enkel fase 2)
+   Geeft een zet in fase 1 tot 3 een cutoff, dan worden de stille zetten nooit gegenereerd.
+
+   picker = ordering.pickers[ply]
+   picker.reset(board, tt_move, ply)
+   while move := picker.next_move(): ...
+   ordering.cutoff(board, move, ply, depth, moves_tried)    # bij een beta-cutoff
+
+   ordering.stats() geeft de first-move cutoff rate (hoe vaak de eerste zet al de cutoff gaf)
+   en hoe vaak het genereren van de stille zetten uitgespaard werd.
+"""
+
+# Waarden voor MVV-LVA en SEE; de koning is onschatbaar (mag enkel als laatste slaan)
+SEE_VALUES = [100, 320, 330, 500, 900, 20000]
+HISTORY_MAX = 1 << 14
+KILLERS = 2
+
+STAGE_HASH, STAGE_GEN_CAPTURES, STAGE_CAPTURES, STAGE_KILLERS, STAGE_GEN_QUIETS, STAGE_QUIETS, \
+    STAGE_BAD_CAPTURES, STAGE_DONE = range(8)
+
+
+def see(board, move):
+    """
+    Static exchange evaluation: materiaalwinst voor de speler aan zet als beide kanten op het doelveld
+    van move blijven slaan met hun minst waardevolle stuk (en mogen stoppen). Houdt rekening met x-rays.
+    """
+    frm = move & 63
+    to = move >> 6 & 63
+    flag = move >> 12
+    squares = board.squares
+    pieces = board.pieces
+    occupied = board.all ^ (1 << frm)
+    if flag == FLAG_EP_CAPTURE:
+        gain = SEE_VALUES[PAWN]
+        occupied ^= 1 << (to - 8 if board.side == 0 else to + 8)
+    else:
+        victim = squares[to]
+        gain = SEE_VALUES[victim % 6] if victim != EMPTY else 0
+    on_square = SEE_VALUES[squares[frm] % 6]
+    if flag & FLAG_PROMO:
+        promo_value = SEE_VALUES[1 + (flag & 3)]
+        gain += promo_value - SEE_VALUES[PAWN]
+        on_square = promo_value
+
+    gains = [gain]
+    diagonal = pieces[0][BISHOP] | pieces[0][QUEEN] | pieces[1][BISHOP] | pieces[1][QUEEN]
+    orthogonal = pieces[0][TOWER] | pieces[0][QUEEN] | pieces[1][TOWER] | pieces[1][QUEEN]
+    attackers = board.attackers_to(to, occupied)
+    side = board.side ^ 1
+    while True:
+        own = attackers & board.occupied[side] & occupied
+        if not own:
+            break
+        for piece_type in range(6):
+            bb = own & pieces[side][piece_type]
+            if bb:
+                break
+        if piece_type == KING and attackers & board.occupied[side ^ 1] & occupied:
+            # de koning mag niet slaan op een veld dat nog aangevallen wordt
+            break
+        gains.append(on_square - gains[-1])
+        on_square = SEE_VALUES[piece_type]
+        occupied ^= bb & -bb
+        # stukken achter het slaande stuk (x-ray) komen nu vrij
+        attackers |= bishop_attacks(to, occupied) & diagonal | tower_attacks(to, occupied) & orthogonal
+        attackers &= occupied
+        side ^= 1
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+class MovePicker:
+    """
+    Geeft de zetten van 1 knoop een voor een in de volgorde van de fasen. Er is 1 picker per ply,
+    met de buffers van die ply: de zoektocht maakt per knoop geen nieuwe objecten aan.
+    """
+
+    def __init__(self, ordering, moves, scores):
+        self.ordering = ordering
+        self.moves = moves
+        self.scores = scores
+        self.bad_captures = [0] * MAX_MOVES
+        self.board = None
+        self.tt_move = 0
+        self.killers = None
+        self.stage = STAGE_DONE
+        self.captures_only = False
+        self.index = 0
+        self.end = 0
+        self.bad_end = 0
+        self.sorting = True
+
+    def reset(self, board, tt_move, ply, captures_only=False):
+        self.board = board
+        self.tt_move = tt_move
+        self.killers = self.ordering.killers[ply]
+        self.captures_only = captures_only
+        self.stage = STAGE_HASH if tt_move else STAGE_GEN_CAPTURES
+        self.bad_end = 0
+        if not captures_only:
+            self.ordering.nodes += 1
+
+    def _select(self):
+        # Lui sorteren: de best gescoorde zet vanaf index naar voor; zijn alle overblijvende scores 0,
+        # dan blijft de rest in de volgorde van de generator
+        moves = self.moves
+        scores = self.scores
+        i = self.index
+        if self.sorting:
+            best = max(range(i, self.end), key=scores.__getitem__)
+            if scores[best]:
+                if best != i:
+                    moves[i], moves[best] = moves[best], moves[i]
+                    scores[i], scores[best] = scores[best], scores[i]
+            else:
+                self.sorting = False
+        self.index = i + 1
+        return moves[i]
+
+    def next_move(self):
+        # Volgende zet, 0 als er geen meer zijn
+        while True:
+            stage = self.stage
+            if stage == STAGE_CAPTURES:
+                while self.index < self.end:
+                    move = self._select()
+                    if move == self.tt_move:
+                        continue
+                    # SEE enkel als een duurder stuk een goedkoper slaat, anders verliest de slag nooit materiaal
+                    squares = self.board.squares
+                    victim = squares[move >> 6 & 63]
+                    if victim != EMPTY and SEE_VALUES[victim % 6] < SEE_VALUES[squares[move & 63] % 6] \
+                            and see(self.board, move) < 0:
+                        self.bad_captures[self.bad_end] = move
+                        self.bad_end += 1
+                        continue
+                    return move
+                # in quiescence worden slagen die materiaal verliezen niet gezocht
+                self.stage = STAGE_DONE if self.captures_only else STAGE_KILLERS
+                self.index = 0
+            elif stage == STAGE_QUIETS:
+                killers = self.killers
+                while self.index < self.end:
+                    move = self._select()
+                    if move != self.tt_move and move != killers[0] and move != killers[1]:
+                        return move
+                self.stage = STAGE_BAD_CAPTURES
+                self.index = 0
+            elif stage == STAGE_HASH:
+                self.stage = STAGE_GEN_CAPTURES
+                move = self.tt_move
+                if self.board.is_legal(move):
+                    return move
+            elif stage == STAGE_GEN_CAPTURES:
+                self._generate_captures()
+                self.stage = STAGE_CAPTURES
+            elif stage == STAGE_KILLERS:
+                while self.index < KILLERS:
+                    move = self.killers[self.index]
+                    self.index += 1
+                    if move and move != self.tt_move and self.board.is_legal(move):
+                        return move
+                self.stage = STAGE_GEN_QUIETS
+            elif stage == STAGE_GEN_QUIETS:
+                self._generate_quiets()
+                self.stage = STAGE_QUIETS
+            elif stage == STAGE_BAD_CAPTURES:
+                if self.index < self.bad_end:
+                    self.index += 1
+                    return self.bad_captures[self.index - 1]
+                self.stage = STAGE_DONE
+            else:
+                return 0
+
+    def _generate_captures(self):
+        # MVV-LVA: het waardevolste slachtoffer eerst, bij gelijk slachtoffer de goedkoopste aanvaller
+        board = self.board
+        moves = self.moves
+        scores = self.scores
+        squares = board.squares
+        n = board.legal_moves_into(moves, 0, GEN_CAPTURES)
+        for i in range(n):
+            move = moves[i]
+            victim = squares[move >> 6 & 63]
+            score = (SEE_VALUES[victim % 6] if victim != EMPTY else SEE_VALUES[PAWN]) * 8 - squares[move & 63] % 6 \
+                if move >> 12 & FLAG_CAPTURE else 0
+            if move >> 12 & FLAG_PROMO:
+                score += SEE_VALUES[1 + (move >> 12 & 3)] * 8
+            scores[i] = score + 1
+        self.index = 0
+        self.end = n
+        self.sorting = True
+
+    def _generate_quiets(self):
+        board = self.board
+        moves = self.moves
+        scores = self.scores
+        history = self.ordering.history[board.side]
+        n = board.legal_moves_into(moves, 0, GEN_QUIETS)
+        for i in range(n):
+            scores[i] = history[moves[i] & 4095]
+        self.index = 0
+        self.end = n
+        self.sorting = True
+        self.ordering.quiet_generations += 1
+
+
+class MoveOrdering:
+    """
+    Killers en history over de hele zoektocht, de pickers per ply en de tellers voor de statistiek.
+    """
+
+    def __init__(self, move_stack):
+        self.killers = [[0] * KILLERS for _ in range(MAX_PLY)]
+        # history[side][van | naar << 6]
+        self.history = [[0] * 4096, [0] * 4096]
+        self.pickers = [MovePicker(self, move_stack.moves[ply], move_stack.scores[ply]) for ply in range(MAX_PLY)]
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # knopen van de hoofdzoektocht (zonder quiescence) en hoeveel daarvan de stille zetten genereerden
+        self.nodes = 0
+        self.quiet_generations = 0
+
+    def new_search(self):
+        # Killers gelden enkel voor deze zoektocht; history blijft maar telt minder zwaar
+        for killers in self.killers:
+            killers[0] = killers[1] = 0
+        for table in self.history:
+            for i in range(4096):
+                table[i] >>= 2
+        self.reset_stats()
+
+    def cutoff(self, board, move, ply, depth, moves_tried):
+        # Oproepen bij een beta-cutoff door move, de moves_tried-de zet in deze knoop
+        self.cutoffs += 1
+        if moves_tried == 1:
+            self.first_move_cutoffs += 1
+        if move >> 12 & (FLAG_CAPTURE | FLAG_PROMO):
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        history = self.history[board.side]
+        index = move & 4095
+        history[index] += depth * depth
+        if history[index] >= HISTORY_MAX:
+            for i in range(4096):
+                history[i] >>= 1
+
+    def stats(self):
+        return {
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            "quiet_generations_saved": self.nodes - self.quiet_generations,
+        }
@@ -0,0 +1,80 @@
+import time
+from chess_board import ChessBoard, START_FEN, move_to_uci
+
+"""
+   Perft: telt alle legale zetreeksen tot een bepaalde diepte
+   De aantallen van de standaard teststellingen liggen vast, elke afwijking is een fout in de zetgenerator.
+   Tegelijk is het de snelheidsmeting van de zetgenerator (knopen per seconde).
+"""
+
+# naam: (FEN, {diepte: aantal knopen})
+PERFT_POSITIONS = {
+    "startpos": (START_FEN,
+                 {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    "position4": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    "position5": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    "position6": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+}
+
+
+def perft(board, depth):
+    if depth == 0:
+        return 1
+    if depth == 1:
+        # bulk counting: de bladeren worden geteld, niet gespeeld
+        return board.count_legal_moves()
+    nodes = 0
+    for move in board.legal_moves():
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, depth):
+    # Aantal knopen per zet in de stelling, handig om een fout tot 1 zet terug te brengen
+    result = []
+    for move in board.legal_moves():
+        board.make_move(move)
+        result.append((move_to_uci(move), perft(board, depth - 1)))
+        board.unmake_move()
+    return result
+
+
+def run_perft(fen, depth, expected=None):
+    board = ChessBoard(fen)
+    start = time.perf_counter()
+    nodes = perft(board, depth)
+    seconds = time.perf_counter() - start
+    return {
+        "depth": depth,
+        "nodes": nodes,
+        "expected": expected,
+        "ok": expected is None or nodes == expected,
+        "seconds": seconds,
+        "nps": nodes / seconds if seconds > 0 else 0.0,
+    }
+
+
+def run_suite(max_depth, names=None):
+    """
+    Draait perft op de standaard stellingen tot max_depth (of de diepste gekende diepte).
+    Geeft per (naam, diepte) een resultaat-dict, met "ok" False bij een afwijkend aantal.
+    """
+    results = []
+    for name in names or PERFT_POSITIONS:
+        fen, expected = PERFT_POSITIONS[name]
+        for depth in sorted(expected):
+            if depth > max_depth:
+                break
+            result = run_perft(fen, depth, expected[depth])
+            result["name"] = name
+            results.append(result)
+    return results
@@ -11,13 +11,13 @@ class ChessPieceKing(ChessPiece):
     def __init__(self,pos):
         ChessPiece.__init__(self, pos)
         self.repeat_moves = False
-        self.possible_moves=[(1,0),(1,1),(0,1),(-1,-1),(-1,0),(-1,-1),(0,-1),(1,-1)]
+        self.possible_moves=[(1,0),(1,1),(0,1),(-1,1),(-1,0),(-1,-1),(0,-1),(1,-1)]
 
 class ChessPieceKnight(ChessPiece):
     def __init__(self, pos):
         ChessPiece.__init__(self, pos)
         self.repeat_moves = False
-        self.possible_moves=[(2, 1),(1,2),(-1, 2),(1,-2),(-2,-1),(-1,-2),(1,-2),(2,-1)]
+        self.possible_moves=[(2, 1),(1,2),(-1, 2),(-2,1),(-2,-1),(-1,-2),(1,-2),(2,-1)]
 
 class ChessPieceBishop(ChessPiece):
     def __init__(self, pos):
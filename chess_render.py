@@ -0,0 +1,171 @@
+import time
+from chess_board import ChessBoard, START_FEN, EMPTY, PIECE_CHARS
+from game_constants import HEADLESS, BOARD_THEME
+from colors import *
+if not HEADLESS:
+    import pygame as pg
+
+"""
+   Tekenen van het bord en de stukken met voorgerenderde surfaces
+   Het bord (64 velden) wordt 1 keer per veldgrootte en thema getekend, de 12 stukken 1 keer per
+   veldgrootte in een atlas (1 rij van 12 velden, in de volgorde van de stukcodes). Per frame is het
+   dan 1 blit voor het bord en 1 blits oproep voor alle stukken, zonder pg.draw of font.render.
+   Een andere veldgrootte (resize) of een ander thema maakt de cache ongeldig, de volgende draw
+   rendert opnieuw.
+
+   renderer = BoardRenderer("brown")
+   renderer.draw(win, x, y, size, board.squares)
+   renderer.set_theme("green")             # het bord wordt bij de volgende draw opnieuw gerenderd
+"""
+
+# lichte en donkere velden per thema
+BOARD_THEMES = {
+    "brown": (B_cornsilk, B_peru),
+    "wheat": (B_wheat, B_sienna),
+    "green": ((238, 238, 210), (118, 150, 86)),
+    "gray": (LTGRAY, GRAY),
+}
+# achtergrond van de atlas, wordt transparant (colorkey met RLE blit sneller dan per-pixel alpha)
+ATLAS_KEY = (255, 0, 255)
+
+
+def draw_squares(surface, x, y, size, theme):
+    # De 64 velden, a1 (linksonder) is donker
+    light, dark = BOARD_THEMES[theme]
+    surface.fill(light, (x, y, 8 * size, 8 * size))
+    for sq in range(64):
+        file, rank = sq & 7, sq >> 3
+        if (file + rank) % 2 == 0:
+            surface.fill(dark, (x + file * size, y + (7 - rank) * size, size, size))
+
+
+def draw_piece(surface, code, rect, font):
+    # Een stuk als schijf in de kleur van de speler met de letter van het stuktype erop
+    x, y, size, _ = rect
+    white = code < 6
+    fill, ink = (WHITE, BLACK) if white else (DKGRAY, WHITE)
+    center = (x + size // 2, y + size // 2)
+    radius = size * 3 // 8
+    pg.draw.circle(surface, fill, center, radius)
+    pg.draw.circle(surface, BLACK, center, radius, max(1, size // 25))
+    letter = font.render(PIECE_CHARS[code].upper(), True, ink)
+    surface.blit(letter, letter.get_rect(center=center))
+
+
+def piece_font(size):
+    if not pg.font.get_init():
+        pg.font.init()
+    # het standaard font van pygame, er zijn geen font bestanden in het project
+    return pg.font.Font(None, size * 3 // 5)
+
+
+def _for_display(surface):
+    # Omzetten naar het pixelformaat van het venster maakt elke blit goedkoper (enkel als er een venster is)
+    if pg.display.get_surface() is None:
+        return surface
+    return surface.convert()
+
+
+class BoardRenderer:
+    """
+    Cache van het gerenderde bord en de stukkenatlas. builds telt hoe vaak er gerenderd werd.
+    """
+
+    def __init__(self, theme=BOARD_THEME):
+        self.theme = theme
+        self.size = 0
+        self.board = None
+        self.atlas = None
+        self.builds = 0
+
+    def invalidate(self):
+        self.board = None
+        self.atlas = None
+
+    def set_theme(self, theme):
+        # Enkel het bord hangt af van het thema, de atlas blijft geldig
+        if theme not in BOARD_THEMES:
+            raise ValueError(f"unknown board theme {theme!r}, expected one of {', '.join(BOARD_THEMES)}")
+        if theme != self.theme:
+            self.theme = theme
+            self.board = None
+
+    def prepare(self, size):
+        # Rendert wat ontbreekt voor deze veldgrootte; een andere grootte maakt alles ongeldig
+        if size != self.size:
+            self.invalidate()
+            self.size = size
+        if self.board is None:
+            board = pg.Surface((8 * size, 8 * size))
+            draw_squares(board, 0, 0, size, self.theme)
+            self.board = _for_display(board)
+            self.builds += 1
+        if self.atlas is None:
+            atlas = pg.Surface((12 * size, size))
+            atlas.fill(ATLAS_KEY)
+            font = piece_font(size)
+            for code in range(12):
+                draw_piece(atlas, code, (code * size, 0, size, size), font)
+            atlas.set_colorkey(ATLAS_KEY, pg.RLEACCEL)
+            self.atlas = _for_display(atlas)
+            self.builds += 1
+
+    def draw(self, win, x, y, size, squares):
+        self.prepare(size)
+        win.blit(self.board, (x, y))
+        atlas = self.atlas
+        win.blits([(atlas, (x + (sq & 7) * size, y + (7 - (sq >> 3)) * size), (code * size, 0, size, size))
+                   for sq, code in enumerate(squares) if code != EMPTY], False)
+
+
+def draw_uncached(win, x, y, size, squares, theme=BOARD_THEME, font=None):
+    # Zonder cache: elk frame alle velden en stukken opnieuw met pg.draw en font.render (referentie)
+    draw_squares(win, x, y, size, theme)
+    font = font or piece_font(size)
+    for sq, code in enumerate(squares):
+        if code != EMPTY:
+            draw_piece(win, code, (x + (sq & 7) * size, y + (7 - (sq >> 3)) * size, size, size), font)
+
+
+def bench_render(frames=300, size=75, fen=START_FEN):
+    """
+    Tijd per frame voor het bord met stukken: alles opnieuw tekenen versus de BoardRenderer cache,
+    en wat 1 keer renderen kost na een resize of themawissel. Tekent op een gewone surface, er is geen
+    venster nodig.
+    """
+    board = ChessBoard(fen)
+    win = pg.Surface((8 * size + 8, 8 * size + 8))
+    font = piece_font(size)
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw_uncached(win, 4, 4, size, board.squares, font=font)
+    uncached = time.perf_counter() - start
+
+    renderer = BoardRenderer()
+    start = time.perf_counter()
+    renderer.draw(win, 4, 4, size, board.squares)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(frames):
+        renderer.draw(win, 4, 4, size, board.squares)
+    cached = time.perf_counter() - start
+
+    # een andere grootte en een ander thema: elk frame moet opnieuw renderen
+    start = time.perf_counter()
+    for i in range(frames):
+        renderer.set_theme(("brown", "green")[i & 1])
+        renderer.draw(win, 4, 4, size - (i & 1), board.squares)
+    invalidated = time.perf_counter() - start
+
+    return {
+        "frames": frames,
+        "square_size": size,
+        "pieces": sum(code != EMPTY for code in board.squares),
+        "uncached_ms_per_frame": uncached * 1000 / frames,
+        "cached_ms_per_frame": cached * 1000 / frames,
+        "speedup": uncached / cached if cached else 0.0,
+        "build_ms": build * 1000,
+        "invalidated_ms_per_frame": invalidated * 1000 / frames,
+        "builds": renderer.builds,
+    }
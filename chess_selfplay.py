@@ -0,0 +1,211 @@
+import glob
+import gzip
+import multiprocessing as mp
+import os
+import random
+import struct
+import time
+import numpy as np
+from chess_board import ChessBoard, SIDE_WHITE
+from chess_features import pack_squares
+from chess_engine import ChessEngine
+from chess_tt import TranspositionTable
+from chess_tablebase import load_tablebases
+
+"""
+   Zelfspel: de motor speelt partijen tegen zichzelf over een pool van processen en de stellingen
+   worden met de score van de zoektocht en de uitslag weggeschreven als trainingsdata.
+
+   Elke stelling is een record van vaste breedte (SELFPLAY_RECORD, 56 bytes): het bord als 64 nibbles
+   (stukcode + 1, 0 = leeg), zijstatus, score, beste zet en de uitslag vanuit de speler aan zet.
+   De records staan in scherven (shards) van ongeveer shard_positions stellingen, elk een gzip bestand:
+       header | partijnummers I[games] | records
+   Een scherf wordt eerst onder een tijdelijke naam geschreven en dan hernoemd, dus een onderbroken run
+   laat enkel volledige scherven achter. Bij een herstart worden de partijnummers en sleutels uit de
+   bestaande scherven gelezen: afgewerkte partijen worden niet opnieuw gespeeld en een stelling die al
+   in de data zit (zelfde Zobrist sleutel) wordt niet nog eens geschreven.
+
+   stats = run_selfplay("selfplay", games=1000, depth=5)
+   for records in iter_shards("selfplay"): records["score"], records["result"], chess_features.unpack_squares(records)
+"""
+
+SELFPLAY_DIR = "selfplay"
+SELFPLAY_MAGIC = b"TCMSP\x00\x00\x01"
+SELFPLAY_VERSION = 1
+SELFPLAY_SUFFIX = ".tcsp"
+SELFPLAY_SHARD_POSITIONS = 1 << 16
+SELFPLAY_DEPTH = 4
+SELFPLAY_RANDOM_PLIES = 8
+SELFPLAY_MAX_PLIES = 300
+SELFPLAY_HASH_MB = 16
+# een werkproces wordt na zoveel partijen vervangen door een vers proces
+SELFPLAY_TASKS_PER_CHILD = 200
+# magic, versie, aantal records, aantal partijen
+_HEADER = struct.Struct("<8sIII")
+
+SELFPLAY_RECORD = np.dtype([
+    ("key", "<u8"),
+    ("board", "u1", 32),       # veld 2i in de lage nibble, veld 2i+1 in de hoge nibble
+    ("side", "u1"),
+    ("castling", "u1"),
+    ("ep", "i1"),
+    ("result", "i1"),          # 1 winst, 0 remise, -1 verlies voor de speler aan zet
+    ("score", "<i2"),          # score van de zoektocht voor de speler aan zet
+    ("move", "<u2"),           # beste zet (16-bit codering van chess_board)
+    ("ply", "<u2"),
+    ("halfmove", "u1"),
+    ("pad", "u1", 5),
+])
+
+_engine = None
+
+
+def _worker_engine(hash_mb, tablebase_dir):
+    # 1 motor per proces, de hashtabel wordt over de partijen heen hergebruikt
+    global _engine
+    if _engine is None:
+        _engine = ChessEngine(TranspositionTable(hash_mb))
+        _engine.tablebase = load_tablebases(tablebase_dir)
+    return _engine
+
+
+def play_game(task):
+    """
+    Speelt 1 partij: eerst random_plies willekeurige zetten voor de variatie, dan zoekt de motor elke zet
+    tot depth. Geeft (game_id, records) met een record per gezochte stelling.
+    Staat op moduleniveau zodat de procespool ze kan oproepen.
+    """
+    game_id, seed, depth, random_plies, max_plies, hash_mb, tablebase_dir = task
+    rng = random.Random(seed)
+    engine = _worker_engine(hash_mb, tablebase_dir)
+    board = ChessBoard()
+    rows = []
+    white_result = 0
+    for ply in range(max_plies):
+        moves = board.legal_moves()
+        if not moves:
+            if board.in_check():
+                white_result = -1 if board.side == SIDE_WHITE else 1
+            break
+        if board.halfmove_clock >= 100 or board.is_repetition():
+            break
+        if ply < random_plies:
+            board.make_move(rng.choice(moves))
+            continue
+        move = engine.think(board, max_depth=depth)
+        rows.append((board.key, pack_squares(board.squares), board.side, board.castling, board.ep_square,
+                     engine.best_score, move, ply, min(board.halfmove_clock, 255)))
+        board.make_move(move)
+
+    records = np.zeros(len(rows), dtype=SELFPLAY_RECORD)
+    if rows:
+        key, packed, side, castling, ep, score, move, ply, halfmove = zip(*rows)
+        records["key"] = key
+        records["board"] = packed
+        records["side"] = side
+        records["castling"] = castling
+        records["ep"] = ep
+        records["result"] = np.where(np.array(side) == SIDE_WHITE, white_result, -white_result)
+        records["score"] = np.clip(score, -32767, 32767)
+        records["move"] = move
+        records["ply"] = ply
+        records["halfmove"] = halfmove
+    return game_id, records
+
+
+def write_shard(path, game_ids, records):
+    # Eerst naar een tijdelijk bestand, dan hernoemen: een scherf is er volledig of niet
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb", compresslevel=6) as f:
+        f.write(_HEADER.pack(SELFPLAY_MAGIC, SELFPLAY_VERSION, len(records), len(game_ids)))
+        f.write(np.asarray(game_ids, dtype="<u4").tobytes())
+        f.write(records.tobytes())
+    os.replace(tmp, path)
+
+
+def read_shard(path):
+    # (partijnummers, records) van 1 scherf
+    with gzip.open(path, "rb") as f:
+        data = f.read()
+    magic, version, count, games = _HEADER.unpack_from(data, 0)
+    if magic != SELFPLAY_MAGIC or version != SELFPLAY_VERSION:
+        raise ValueError(f"{path} is not a self-play shard (version {SELFPLAY_VERSION})")
+    game_ids = np.frombuffer(data, dtype="<u4", count=games, offset=_HEADER.size)
+    records = np.frombuffer(data, dtype=SELFPLAY_RECORD, count=count, offset=_HEADER.size + 4 * games)
+    return game_ids, records
+
+
+def shard_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "shard-*" + SELFPLAY_SUFFIX)))
+
+
+def iter_shards(directory):
+    # De records van elke scherf, scherf per scherf (de hele dataset hoeft niet in het geheugen)
+    for path in shard_paths(directory):
+        yield read_shard(path)[1]
+
+
+def run_selfplay(directory=SELFPLAY_DIR, games=100, depth=SELFPLAY_DEPTH, processes=None,
+                 shard_positions=SELFPLAY_SHARD_POSITIONS, random_plies=SELFPLAY_RANDOM_PLIES,
+                 max_plies=SELFPLAY_MAX_PLIES, seed=1, hash_mb=SELFPLAY_HASH_MB, tablebase_dir=None, log=None):
+    """
+    Speelt de partijen 0 .. games-1 die nog niet in directory staan en schrijft ze weg in scherven.
+    Partij i gebruikt seed + i, dus een herstart speelt dezelfde partijen als de onderbroken run.
+    log(dict) wordt na elke scherf opgeroepen. Geeft een dict met de aantallen en de doorvoer.
+    """
+    os.makedirs(directory, exist_ok=True)
+    seen = set()
+    done = set()
+    paths = shard_paths(directory)
+    for path in paths:
+        game_ids, records = read_shard(path)
+        done.update(game_ids.tolist())
+        seen.update(records["key"].tolist())
+    next_shard = int(os.path.basename(paths[-1])[6:-len(SELFPLAY_SUFFIX)]) + 1 if paths else 0
+
+    tasks = [(game_id, seed + game_id, depth, random_plies, max_plies, hash_mb, tablebase_dir)
+             for game_id in range(games) if game_id not in done]
+    stats = {"games": 0, "skipped_games": games - len(tasks), "positions": 0, "duplicates": 0, "shards": 0}
+    pending_games = []
+    pending_records = []
+    pending = 0
+    start = time.perf_counter()
+
+    def flush():
+        nonlocal pending_games, pending_records, pending, next_shard
+        path = os.path.join(directory, f"shard-{next_shard:05d}{SELFPLAY_SUFFIX}")
+        write_shard(path, pending_games, np.concatenate(pending_records))
+        next_shard += 1
+        stats["shards"] += 1
+        pending_games, pending_records, pending = [], [], 0
+        if log is not None:
+            log(_rates(stats, time.perf_counter() - start))
+
+    with mp.Pool(processes, maxtasksperchild=SELFPLAY_TASKS_PER_CHILD) as pool:
+        for game_id, records in pool.imap_unordered(play_game, tasks):
+            # ontdubbelen op Zobrist sleutel, ook binnen dezelfde partij
+            keep = np.zeros(len(records), dtype=bool)
+            for i, key in enumerate(records["key"].tolist()):
+                if key not in seen:
+                    seen.add(key)
+                    keep[i] = True
+            records = records[keep]
+            stats["games"] += 1
+            stats["positions"] += len(records)
+            stats["duplicates"] += len(keep) - len(records)
+            pending_games.append(game_id)
+            pending_records.append(records)
+            pending += len(records)
+            if pending >= shard_positions:
+                flush()
+    if pending_games:
+        flush()
+    return _rates(stats, time.perf_counter() - start)
+
+
+def _rates(stats, seconds):
+    result = dict(stats)
+    result["seconds"] = seconds
+    result["games_per_hour"] = stats["games"] * 3600 / seconds if seconds else 0.0
+    result["positions_per_sec"] = stats["positions"] / seconds if seconds else 0.0
+    return result
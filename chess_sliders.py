@@ -0,0 +1,156 @@
+import marshal
+import os
+from chess_pieces import ChessPieceBishop, ChessPieceTower
+
+"""
+   Aanvallen van lopers, torens en dames via tabellen geindexeerd op de bezetting (PEXT-stijl)
+   Per veld is er een masker met de relevante velden (de stralen zonder de rand).
+   De aanvallen voor een bezetting zijn dan 1 opzoeking: BISHOP_TABLE[sq][occupied & BISHOP_MASKS[sq]]
+
+   Python heeft geen PEXT instructie en een magic-vermenigvuldiging op grote integers is trager dan
+   een dict-opzoeking, dus de gemaskeerde bezetting zelf is de sleutel.
+   De tabellen worden 1 keer opgebouwd en op schijf bewaard zodat het opstarten snel blijft.
+"""
+
+SLIDER_CACHE_VERSION = 1
+SLIDER_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slider_tables.cache")
+
+
+def _rays(vectors):
+    # Per richting: (richting stijgt in veldnummer, per veld het bitboard van de straal tot aan de rand)
+    rays = []
+    for d_rank, d_file in vectors:
+        table = [0] * 64
+        for sq in range(64):
+            rank, file = divmod(sq, 8)
+            r, f = rank + d_rank, file + d_file
+            while 0 <= r < 8 and 0 <= f < 8:
+                table[sq] |= 1 << (r * 8 + f)
+                r, f = r + d_rank, f + d_file
+        rays.append((d_rank * 8 + d_file > 0, table))
+    return rays
+
+
+DIAGONAL_RAYS = _rays(ChessPieceBishop(None).possible_moves)
+ORTHOGONAL_RAYS = _rays(ChessPieceTower(None).possible_moves)
+
+
+def ray_attacks(rays, sq, occupied):
+    # Klassieke straal-aanpak: de straal tot de eerste blokkeerder (die blokkeerder inbegrepen)
+    attacks = 0
+    for positive, table in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def _relevant_mask(rays, sq):
+    # Het laatste veld van elke straal doet er niet toe: daar stopt de straal sowieso
+    mask = 0
+    for positive, table in rays:
+        ray = table[sq]
+        if ray:
+            edge = ray.bit_length() - 1 if positive else (ray & -ray).bit_length() - 1
+            mask |= ray ^ (1 << edge)
+    return mask
+
+
+def _build_table(rays, masks):
+    tables = []
+    for sq in range(64):
+        mask = masks[sq]
+        table = {}
+        # Carry-Rippler: overloop alle deelverzamelingen van het masker
+        subset = 0
+        while True:
+            table[subset] = ray_attacks(rays, sq, subset)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        tables.append(table)
+    return tables
+
+
+def _between():
+    # BETWEEN[a][b]: de velden strikt tussen a en b als ze op 1 lijn liggen, anders 0
+    between = [[0] * 64 for _ in range(64)]
+    for positive, table in DIAGONAL_RAYS + ORTHOGONAL_RAYS:
+        for sq in range(64):
+            ray = table[sq]
+            while ray:
+                lsb = ray & -ray
+                ray ^= lsb
+                target = lsb.bit_length() - 1
+                between[sq][target] = table[sq] ^ table[target] ^ lsb
+    return between
+
+
+def _lines():
+    # LINE[a][b]: de volledige lijn (van rand tot rand) door a en b als ze op 1 lijn liggen, anders 0
+    lines = [[0] * 64 for _ in range(64)]
+    for rays in (DIAGONAL_RAYS, ORTHOGONAL_RAYS):
+        # de stralen komen in paren: richting i en i + 2 zijn tegengesteld
+        for i in range(4):
+            table, opposite = rays[i][1], rays[(i + 2) % 4][1]
+            for sq in range(64):
+                line = table[sq] | opposite[sq] | 1 << sq
+                ray = table[sq]
+                while ray:
+                    lsb = ray & -ray
+                    ray ^= lsb
+                    lines[sq][lsb.bit_length() - 1] = line
+    return lines
+
+
+BETWEEN = _between()
+LINE = _lines()
+BISHOP_MASKS = [_relevant_mask(DIAGONAL_RAYS, sq) for sq in range(64)]
+TOWER_MASKS = [_relevant_mask(ORTHOGONAL_RAYS, sq) for sq in range(64)]
+
+
+def load_slider_tables(cache_file=SLIDER_CACHE_FILE):
+    """
+    Geeft (bishop_table, tower_table). Leest eerst de cache op schijf, anders worden ze opgebouwd
+    en (indien cache_file niet None is) weggeschreven. Een onleesbare of verouderde cache wordt genegeerd.
+    """
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                version, bishop_table, tower_table = marshal.load(f)
+            if version == SLIDER_CACHE_VERSION and len(bishop_table) == 64 and len(tower_table) == 64:
+                return bishop_table, tower_table
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+    bishop_table = _build_table(DIAGONAL_RAYS, BISHOP_MASKS)
+    tower_table = _build_table(ORTHOGONAL_RAYS, TOWER_MASKS)
+    if cache_file:
+        try:
+            tmp_file = cache_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                marshal.dump((SLIDER_CACHE_VERSION, bishop_table, tower_table), f)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+    return bishop_table, tower_table
+
+
+BISHOP_TABLE, TOWER_TABLE = load_slider_tables()
+
+
+def bishop_attacks(sq, occupied):
+    return BISHOP_TABLE[sq][occupied & BISHOP_MASKS[sq]]
+
+
+def tower_attacks(sq, occupied):
+    return TOWER_TABLE[sq][occupied & TOWER_MASKS[sq]]
+
+
+def queen_attacks(sq, occupied):
+    return BISHOP_TABLE[sq][occupied & BISHOP_MASKS[sq]] | TOWER_TABLE[sq][occupied & TOWER_MASKS[sq]]
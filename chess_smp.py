@@ -0,0 +1,102 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from chess_engine import ChessEngine, MAX_DEPTH
+from chess_tt import TranspositionTable, table_bytes, GENERATION_MASK
+from game_constants import HASH_SIZE_MB
+
+"""
+   Lazy SMP: meerdere processen zoeken dezelfde stelling en delen 1 transpositietabel
+   De tabel staat in multiprocessing.shared_memory, elk proces maakt er een TranspositionTable rond.
+   Helpers beginnen op een verschoven diepte zodat ze andere delen van de boom eerst vullen;
+   wat ze vinden komt via de gedeelde tabel bij de anderen terecht.
+   Het resultaat is dat van de diepste afgewerkte iteratie, bij gelijke diepte beslist de meerderheid.
+
+   with ParallelSearch(threads=8, size_mb=256) as smp:
+       result = smp.search(board, time_limit=10)
+"""
+
+SMP_SLICE_MS = 50
+
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _search_worker(task):
+    worker_id, board, time_limit, max_depth, shm_name, size_mb, generation = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    tt = TranspositionTable(size_mb, buffer=shm.buf)
+    # engine.start verhoogt de generatie, alle processen moeten dezelfde hebben als de hoofdtabel
+    tt.generation = (generation - 1) & GENERATION_MASK
+    engine = ChessEngine(tt)
+    engine.start(board, time_limit, max_depth, first_depth=1 + worker_id % 3)
+    while not engine.step(SMP_SLICE_MS):
+        if _stop_event.is_set():
+            engine.stop()
+    if worker_id == 0:
+        # de hoofdzoeker bepaalt wanneer iedereen stopt
+        _stop_event.set()
+    result = engine.info()
+    result["move"] = engine.best_move
+    result["worker"] = worker_id
+    engine = None
+    tt.release()
+    shm.close()
+    return result
+
+
+def pick_result(results):
+    # Diepste afgewerkte iteratie wint; bij gelijke diepte de zet met de meeste stemmen, dan de hoogste score
+    deepest = max(r["depth"] for r in results)
+    candidates = [r for r in results if r["depth"] == deepest and r["move"]]
+    if not candidates:
+        return results[0]
+    votes = {}
+    for r in candidates:
+        votes[r["move"]] = votes.get(r["move"], 0) + 1
+    return max(candidates, key=lambda r: (votes[r["move"]], r["score"]))
+
+
+class ParallelSearch:
+    def __init__(self, threads, size_mb=HASH_SIZE_MB):
+        self.threads = threads
+        self.size_mb = size_mb
+        self.shm = shared_memory.SharedMemory(create=True, size=table_bytes(size_mb))
+        self.tt = TranspositionTable(size_mb, buffer=self.shm.buf)
+        self.stop_event = mp.Event()
+        self.pool = mp.Pool(threads, initializer=_init_worker, initargs=(self.stop_event,))
+
+    def search(self, board, time_limit=None, max_depth=MAX_DEPTH):
+        """
+        Zoekt met alle processen tegelijk. Geeft een dict met move, score, depth, nodes (som van alle processen), ...
+        """
+        self.tt.new_search()
+        self.stop_event.clear()
+        tasks = [(i, board, time_limit, max_depth, self.shm.name, self.size_mb, self.tt.generation)
+                 for i in range(self.threads)]
+        results = self.pool.map(_search_worker, tasks)
+        best = dict(pick_result(results))
+        best["nodes"] = sum(r["nodes"] for r in results)
+        best["time"] = max(r["time"] for r in results)
+        best["nps"] = best["nodes"] / best["time"] if best["time"] > 0 else 0.0
+        best["threads"] = self.threads
+        return best
+
+    def clear(self):
+        self.tt.clear()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.tt.release()
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,698 @@
+import mmap
+import multiprocessing as mp
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from chess_board import SIDE_WHITE, SIDE_BLACK, PAWN, KNIGHT, BISHOP, TOWER, QUEEN, KING, PIECE_CHARS, \
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, iter_bits
+from chess_sliders import BETWEEN, DIAGONAL_RAYS, ORTHOGONAL_RAYS
+from game_constants import TABLEBASE_DIR
+
+"""
+   Eindspeldatabanken (tablebases) voor kleine materiaalverhoudingen: KQK, KRK, KPK, KBNK, KQKR, ...
+   Per stelling: winst, remise of verlies voor de speler aan zet, met de afstand tot mat in plies (DTM).
+
+   Een tabel is een materiaalverhouding zoals "KBNK": eerst de witte stukken, dan de zwarte.
+   Index van een stelling: aan_zet * 64^n + som(veld_i * 64^(n - 1 - i)) over de n stukken in die volgorde.
+   Een waarde is 1 byte:
+       0            remise
+       v > 0        de speler aan zet geeft mat in v plies (v oneven)
+       v < 0        de speler aan zet staat mat na -v - 1 plies (-1 = staat nu mat)
+       TB_ILLEGAL   geen geldige stelling (stukken op elkaar, de speler die niet aan zet is staat schaak, ...)
+   Stellingen met de sterkste kant in het zwart worden gespiegeld (rijen omgedraaid, kleuren gewisseld).
+
+   Opbouw (build_tablebase) is retrograde analyse in numpy over alle indexen tegelijk:
+   1. per stelling: ongeldig of niet, schaak of niet                           (parallel over een procespool)
+   2. per stelling: aantal legale zetten binnen de tabel, en de waarde van de zetten die de tabel verlaten
+      (slagen en promoties: die komen uit de kleinere tabellen, die eerst opgebouwd worden) (parallel)
+   3. laag per laag terug vanaf de matstellingen: de voorgangers van een verloren stelling zijn gewonnen,
+      een voorganger is verloren als al zijn zetten naar gewonnen stellingen leiden (teller op 0)
+   Wat na de laatste laag niet beslist is, is remise.
+   De 50-zettenregel, rokade en en passant worden niet meegerekend.
+
+   Op schijf: blokken van TB_BLOCK_ENTRIES waarden, elk apart met zlib gecomprimeerd, en een tabel met de
+   offsets van de blokken. Opzoeken mapt het bestand (mmap) en pakt enkel het blok met de index uit.
+
+   tb = Tablebases("tablebases")
+   tb.probe(board)          # None als er geen tabel is voor dat materiaal
+"""
+
+TB_ILLEGAL = 127
+_UNKNOWN = -128
+TB_MAGIC = b"TCMTB\x00\x00\x01"
+TB_VERSION = 1
+TB_SUFFIX = ".tcb"
+TB_BLOCK_ENTRIES = 1 << 14
+TB_CACHE_BLOCKS = 256
+TB_MAX_LAYER = 126
+# Tabellen met meer stukken lukken in principe ook, maar 5 stukken zijn 2 * 64^5 = 2 miljard stellingen
+TB_MAX_MEN = 4
+_HEADER = struct.Struct("<8sIIQ")
+_FRONTIER_BATCH = 1 << 18
+_NO_EXIT = 0x7FFF
+
+# Volgorde van de stukken binnen een kant in een tabelnaam, en de sterkte om te beslissen welke kant wit is
+_ORDER = "KQRBNP"
+_STRENGTH = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3, "P": 1}
+_PROMOTIONS = (QUEEN, TOWER, BISHOP, KNIGHT)
+
+
+def _side_letters(types):
+    return "".join(sorted((PIECE_CHARS[t] for t in types), key=_ORDER.index))
+
+
+def canonical(white_types, black_types):
+    """
+    Tabelnaam voor dit materiaal en of de kleuren daarvoor gewisseld moeten worden.
+    De kant met het meeste materiaal is wit in de tabel.
+    """
+    white, black = _side_letters(white_types), _side_letters(black_types)
+    if (sum(_STRENGTH[c] for c in black), black) > (sum(_STRENGTH[c] for c in white), white):
+        return black + white, True
+    return white + black, False
+
+
+def parse_signature(signature):
+    # "KBNK" -> [(side, type), ...] in de volgorde van de tabel
+    second_king = signature.index("K", 1)
+    pieces = []
+    for side, letters in ((SIDE_WHITE, signature[:second_king]), (SIDE_BLACK, signature[second_king:])):
+        if letters[0] != "K" or "K" in letters[1:]:
+            raise ValueError(f"invalid material {signature}")
+        for c in letters:
+            pieces.append((side, PIECE_CHARS.index(c)))
+    return pieces
+
+
+def table_path(directory, signature):
+    return os.path.join(directory, signature + TB_SUFFIX)
+
+
+# ---------- tabellen voor numpy ----------
+
+_ONE = np.uint64(1)
+_KNIGHT_BB = np.array(KNIGHT_ATTACKS, dtype=np.uint64)
+_KING_BB = np.array(KING_ATTACKS, dtype=np.uint64)
+_PAWN_BB = [np.array(PAWN_ATTACKS[side], dtype=np.uint64) for side in (SIDE_WHITE, SIDE_BLACK)]
+_BETWEEN_BB = np.array(BETWEEN, dtype=np.uint64)
+
+
+def _aligned(rays):
+    # _aligned[a, b]: b ligt op een straal vanuit a
+    table = np.zeros((64, 64), dtype=bool)
+    for _, ray in rays:
+        for sq in range(64):
+            for target in iter_bits(ray[sq]):
+                table[sq, target] = True
+    return table
+
+
+def _ray_squares(rays):
+    # [veld, richting, stap] -> veld op de straal, -1 voorbij de rand
+    table = np.full((64, len(rays), 7), -1, dtype=np.int64)
+    for d, (positive, ray) in enumerate(rays):
+        for sq in range(64):
+            squares = sorted(iter_bits(ray[sq]), reverse=not positive)
+            table[sq, d, :len(squares)] = squares
+    return table
+
+
+def _step_squares(attacks):
+    table = np.full((64, 8), -1, dtype=np.int64)
+    for sq in range(64):
+        squares = list(iter_bits(attacks[sq]))
+        table[sq, :len(squares)] = squares
+    return table
+
+
+_DIAGONAL = _aligned(DIAGONAL_RAYS)
+_ORTHOGONAL = _aligned(ORTHOGONAL_RAYS)
+_LINES = {BISHOP: _DIAGONAL, TOWER: _ORTHOGONAL, QUEEN: _DIAGONAL | _ORTHOGONAL}
+_SLIDER_RAYS = {BISHOP: _ray_squares(DIAGONAL_RAYS), TOWER: _ray_squares(ORTHOGONAL_RAYS),
+                QUEEN: _ray_squares(DIAGONAL_RAYS + ORTHOGONAL_RAYS)}
+_STEP_SQUARES = {KNIGHT: _step_squares(KNIGHT_ATTACKS), KING: _step_squares(KING_ATTACKS)}
+
+
+class _Layout:
+    # Indexering van 1 tabel
+    def __init__(self, signature):
+        self.signature = signature
+        self.pieces = parse_signature(signature)
+        self.n = len(self.pieces)
+        self.half = 64 ** self.n
+        self.size = 2 * self.half
+        self.weights = [64 ** (self.n - 1 - i) for i in range(self.n)]
+        self.chunk = 64 ** (self.n - 1)
+
+    def decode(self, idx):
+        return [idx // w % 64 for w in self.weights]
+
+    def encode(self, stm, squares):
+        idx = stm * self.half
+        for sq, w in zip(squares, self.weights):
+            idx = idx + sq * w
+        return idx
+
+
+def _attacked(target, attackers, occ):
+    # target en de velden van de aanvallers zijn arrays; attackers: [(type, side, squares)]
+    hit = np.zeros(target.shape, dtype=bool)
+    bit = _ONE << target.astype(np.uint64)
+    for piece_type, side, sq in attackers:
+        if piece_type == KNIGHT:
+            hit |= (_KNIGHT_BB[sq] & bit) != 0
+        elif piece_type == KING:
+            hit |= (_KING_BB[sq] & bit) != 0
+        elif piece_type == PAWN:
+            hit |= (_PAWN_BB[side][sq] & bit) != 0
+        else:
+            hit |= _LINES[piece_type][sq, target] & ((_BETWEEN_BB[sq, target] & occ) == 0)
+    return hit
+
+
+def _occupancy(squares):
+    occ = np.zeros(squares[0].shape, dtype=np.uint64)
+    for sq in squares:
+        occ |= _ONE << sq.astype(np.uint64)
+    return occ
+
+
+def _is_occupied(target, squares):
+    hit = np.zeros(target.shape, dtype=bool)
+    for sq in squares:
+        hit |= target == sq[:, None]
+    return hit
+
+
+def _targets(piece_type, side, sq, squares, own):
+    """
+    Bestemmingen van een stuk (geen pion): (targets, valid) van vorm (batch, k).
+    valid: op het bord, niet op een eigen stuk en (lopers, torens, dames) niet voorbij een ander stuk.
+    """
+    if piece_type in _STEP_SQUARES:
+        targets = _STEP_SQUARES[piece_type][sq]
+        valid = (targets >= 0) & ~_is_occupied(targets, own)
+        return targets, valid
+    rays = _SLIDER_RAYS[piece_type][sq]
+    batch, directions, steps = rays.shape
+    valid = np.zeros(rays.shape, dtype=bool)
+    blocked = np.zeros((batch, directions), dtype=bool)
+    for step in range(steps):
+        target = rays[:, :, step]
+        on_board = (target >= 0) & ~blocked
+        occupied = _is_occupied(target, squares)
+        own_piece = _is_occupied(target, own)
+        valid[:, :, step] = on_board & ~own_piece
+        blocked |= occupied | (target < 0)
+    return rays.reshape(batch, -1), valid.reshape(batch, -1)
+
+
+def _pawn_moves(side, sq, squares, enemies):
+    # (pushes, valid pushes), (captures, valid captures) voor een pion
+    forward = 8 if side == SIDE_WHITE else -8
+    rank = sq // 8
+    one = sq + forward
+    two = sq + 2 * forward
+    start_rank = 1 if side == SIDE_WHITE else 6
+    empty_one = ~_is_occupied(one[:, None], squares)[:, 0]
+    empty_two = ~_is_occupied(two[:, None], squares)[:, 0]
+    pushes = np.stack([one, two], axis=1)
+    push_valid = np.stack([empty_one, empty_one & empty_two & (rank == start_rank)], axis=1)
+    files = sq % 8
+    captures = np.stack([one - 1, one + 1], axis=1)
+    capture_valid = np.stack([files > 0, files < 7], axis=1) & _is_occupied(captures, enemies)
+    return (pushes, push_valid), (captures, capture_valid)
+
+
+# ---------- opbouw ----------
+
+_tables = {}
+
+
+def _values(directory, signature):
+    # De volledige waarden van een (kleinere) tabel als numpy array, per proces 1 keer ingelezen
+    values = _tables.get(signature)
+    if values is None:
+        with open(table_path(directory, signature), "rb") as f:
+            data = f.read()
+        magic, version, block_entries, entries = _HEADER.unpack_from(data, 0)
+        blocks = (entries + block_entries - 1) // block_entries
+        offsets = np.frombuffer(data, dtype="<u8", count=blocks + 1, offset=_HEADER.size)
+        start = _HEADER.size + 8 * (blocks + 1)
+        values = np.frombuffer(b"".join(zlib.decompress(data[start + offsets[i]:start + offsets[i + 1]])
+                                        for i in range(blocks)), dtype=np.int8)
+        _tables[signature] = values
+    return values
+
+
+class _Exit:
+    """
+    Een zet die de tabel verlaat (slag en/of promotie): naar welke tabel, en hoe de velden daar liggen.
+    source[i] = het stuk uit de huidige tabel dat in de nieuwe tabel op plaats i staat.
+    """
+    def __init__(self, layout, moved, captured, promotion):
+        pieces = []
+        for i, (side, piece_type) in enumerate(layout.pieces):
+            if i == captured:
+                continue
+            pieces.append((side, promotion if i == moved and promotion is not None else piece_type, i))
+        white = [t for side, t, _ in pieces if side == SIDE_WHITE]
+        black = [t for side, t, _ in pieces if side == SIDE_BLACK]
+        self.signature, self.flipped = canonical(white, black)
+        self.layout = _Layout(self.signature)
+        free = list(pieces)
+        self.source = []
+        for side, piece_type in self.layout.pieces:
+            wanted = side ^ self.flipped
+            match = next(p for p in free if p[0] == wanted and p[1] == piece_type)
+            free.remove(match)
+            self.source.append(match[2])
+
+    def index(self, stm, squares):
+        # stm = de speler aan zet na de zet (in de huidige tabel)
+        flip = 56 if self.flipped else 0
+        return self.layout.encode(stm ^ self.flipped, [squares[i] ^ flip for i in self.source])
+
+
+def _exits(layout):
+    # Alle soorten zetten die uit deze tabel leiden, per (stuk, geslagen stuk, promotie)
+    exits = {}
+    for j, (side, piece_type) in enumerate(layout.pieces):
+        captures = [None] + [m for m, (s, t) in enumerate(layout.pieces) if s != side and t != KING]
+        promotions = (None,) + (_PROMOTIONS if piece_type == PAWN else ())
+        for m in captures:
+            for promotion in promotions:
+                if m is not None or promotion is not None:
+                    exits[j, m, promotion] = _Exit(layout, j, m, promotion)
+    return exits
+
+
+def required_tables(signature):
+    # De tabellen waar deze tabel naartoe kan (na een slag of promotie)
+    return sorted({e.signature for e in _exits(_Layout(signature)).values()})
+
+
+def _chunk_arrays(layout, chunk_id):
+    start = chunk_id * layout.chunk
+    idx = np.arange(start, start + layout.chunk, dtype=np.int64)
+    stm = start // layout.half
+    return idx, stm, layout.decode(idx)
+
+
+def _pass_legal(task):
+    # Stap 1: ongeldige stellingen en schaak, voor 1 blok indexen (1 kant aan zet, 1 veld voor het eerste stuk)
+    signature, work_dir, chunk_id = task
+    layout = _Layout(signature)
+    idx, stm, squares = _chunk_arrays(layout, chunk_id)
+    illegal = np.zeros(idx.shape, dtype=bool)
+    for i in range(layout.n):
+        for j in range(i + 1, layout.n):
+            illegal |= squares[i] == squares[j]
+    for (side, piece_type), sq in zip(layout.pieces, squares):
+        if piece_type == PAWN:
+            illegal |= (sq < 8) | (sq >= 56)
+    occ = _occupancy(squares)
+    kings = {side: squares[i] for i, (side, piece_type) in enumerate(layout.pieces) if piece_type == KING}
+    attackers = {side: [(t, s, sq) for (s, t), sq in zip(layout.pieces, squares) if s == side]
+                 for side in (SIDE_WHITE, SIDE_BLACK)}
+    # de speler die niet aan zet is mag niet schaak staan
+    illegal |= _attacked(kings[stm ^ 1], attackers[stm], occ)
+    in_check = _attacked(kings[stm], attackers[stm ^ 1], occ)
+    files = _work_files(work_dir, layout, "r+")
+    sl = slice(idx[0], idx[-1] + 1)
+    files["illegal"][sl] = illegal
+    files["in_check"][sl] = in_check
+    files["illegal"].flush()
+    files["in_check"].flush()
+
+
+def _pass_moves(task):
+    # Stap 2: legale zetten binnen de tabel tellen en de zetten naar andere tabellen evalueren
+    signature, work_dir, directory, chunk_id = task
+    layout = _Layout(signature)
+    idx, stm, squares = _chunk_arrays(layout, chunk_id)
+    files = _work_files(work_dir, layout, "r+")
+    illegal_all = files["illegal"]
+    sl = slice(idx[0], idx[-1] + 1)
+    # enkel de geldige stellingen, de rest blijft 0
+    keep = ~np.asarray(illegal_all[sl])
+    idx = idx[keep]
+    squares = [sq[keep] for sq in squares]
+    batch = idx.shape[0]
+    count = np.zeros(batch, dtype=np.int32)
+    win_exit = np.full(batch, _NO_EXIT, dtype=np.int16)
+    loss_exit = np.zeros(batch, dtype=np.int16)
+    draw_exit = np.zeros(batch, dtype=bool)
+    exits = _exits(layout)
+    flip_stm = (1 - 2 * stm) * layout.half
+    own = [sq for (side, _), sq in zip(layout.pieces, squares) if side == stm]
+    enemy_slots = [m for m, (side, t) in enumerate(layout.pieces) if side != stm and t != KING]
+    enemies = [squares[m] for m in enemy_slots]
+
+    def add_exit(j, targets, valid, captured, promotion):
+        rows, cols = np.nonzero(valid)
+        if not rows.size:
+            return
+        new_squares = [sq[rows] for sq in squares]
+        new_squares[j] = targets[rows, cols]
+        exit_ = exits[j, captured, promotion]
+        values = _values(directory, exit_.signature)[exit_.index(stm ^ 1, new_squares)].astype(np.int16)
+        legal = values != TB_ILLEGAL
+        # de tegenstander staat verloren na p plies: wij winnen in p + 1 = -value plies
+        lost = legal & (values < 0)
+        np.minimum.at(win_exit, rows[lost], -values[lost])
+        # de tegenstander wint in value plies: wij verliezen na value + 1 plies
+        won = legal & (values > 0)
+        np.maximum.at(loss_exit, rows[won], values[won] + 1)
+        draw_exit[rows[legal & (values == 0)]] = True
+
+    for j, (side, piece_type) in enumerate(layout.pieces):
+        if side != stm:
+            continue
+        sq = squares[j]
+        if piece_type == PAWN:
+            (pushes, push_valid), (captures, capture_valid) = _pawn_moves(side, sq, squares, enemies)
+            last_rank = (pushes >= 56) | (pushes < 8)
+            quiet = push_valid & ~last_rank
+            targets = [(pushes, quiet)]
+            for promotion in _PROMOTIONS:
+                add_exit(j, pushes, push_valid & last_rank, None, promotion)
+            for m, enemy in zip(enemy_slots, enemies):
+                hit = capture_valid & (captures == enemy[:, None])
+                promoting = (captures >= 56) | (captures < 8)
+                add_exit(j, captures, hit & ~promoting, m, None)
+                for promotion in _PROMOTIONS:
+                    add_exit(j, captures, hit & promoting, m, promotion)
+        else:
+            moves, valid = _targets(piece_type, side, sq, squares, own)
+            empty = valid & ~_is_occupied(moves, squares)
+            targets = [(moves, empty)]
+            for m, enemy in zip(enemy_slots, enemies):
+                add_exit(j, moves, valid & (moves == enemy[:, None]), m, None)
+        for moves, valid in targets:
+            succ = idx[:, None] + (np.where(valid, moves, 0) - sq[:, None]) * layout.weights[j] + flip_stm
+            legal = valid & ~illegal_all[np.where(valid, succ, 0)]
+            count += legal.sum(axis=1)
+
+    win_exit[win_exit == _NO_EXIT] = 0
+    files["count"][idx] = count
+    files["win_exit"][idx] = win_exit
+    files["loss_exit"][idx] = loss_exit
+    files["draw_exit"][idx] = draw_exit
+    for name in ("count", "win_exit", "loss_exit", "draw_exit"):
+        files[name].flush()
+
+
+_WORK_ARRAYS = (("illegal", bool), ("in_check", bool), ("count", np.uint8), ("win_exit", np.int16),
+                ("loss_exit", np.int16), ("draw_exit", bool))
+
+
+def _work_files(work_dir, layout, mode):
+    # Tussenresultaten als gemapte .npy bestanden, zodat alle processen in hetzelfde geheugen schrijven
+    files = {}
+    for name, dtype in _WORK_ARRAYS:
+        path = os.path.join(work_dir, f"{layout.signature}.{name}.npy")
+        if mode == "w+":
+            files[name] = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(layout.size,))
+        else:
+            files[name] = np.load(path, mmap_mode=mode)
+    return files
+
+
+def _unmoves(layout, frontier, illegal):
+    """
+    Voorgangers van de stellingen in frontier (allemaal met dezelfde kant aan zet): de stellingen waaruit
+    de tegenstander met een zet zonder slag of promotie in frontier belandt. Geeft een array met indexen,
+    1 keer per (voorganger, zet); ongeldige voorgangers vallen weg.
+    """
+    stm = int(frontier[0] // layout.half)
+    mover = stm ^ 1
+    squares = layout.decode(frontier)
+    flip_stm = (1 - 2 * stm) * layout.half
+    found = []
+    for j, (side, piece_type) in enumerate(layout.pieces):
+        if side != mover:
+            continue
+        sq = squares[j]
+        if piece_type == PAWN:
+            back = -8 if side == SIDE_WHITE else 8
+            one = sq + back
+            two = sq + 2 * back
+            double_rank = 3 if side == SIDE_WHITE else 4
+            empty_one = ~_is_occupied(one[:, None], squares)[:, 0]
+            empty_two = ~_is_occupied(two[:, None], squares)[:, 0]
+            origins = np.stack([one, two], axis=1)
+            valid = np.stack([empty_one, empty_one & empty_two & (sq // 8 == double_rank)], axis=1)
+        else:
+            origins, valid = _targets(piece_type, side, sq, squares, squares)
+        rows, cols = np.nonzero(valid)
+        pred = frontier[rows] + (origins[rows, cols] - sq[rows]) * layout.weights[j] + flip_stm
+        found.append(pred[~illegal[pred]])
+    return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+
+def _retrograde(layout, files):
+    # Stap 3: laag k bevat de stellingen met mat in k plies; winst op oneven lagen, verlies op even lagen
+    illegal = np.asarray(files["illegal"])
+    in_check = np.asarray(files["in_check"])
+    count = np.array(files["count"])
+    win_exit = np.asarray(files["win_exit"])
+    loss_exit = np.asarray(files["loss_exit"])
+    draw_exit = np.asarray(files["draw_exit"])
+    values = np.full(layout.size, _UNKNOWN, dtype=np.int8)
+    values[illegal] = TB_ILLEGAL
+    legal = ~illegal
+    no_moves = legal & (count == 0)
+    no_exits = (win_exit == 0) & (loss_exit == 0) & ~draw_exit
+    values[no_moves & no_exits & ~in_check] = 0                    # pat
+    values[no_moves & (win_exit == 0) & draw_exit] = 0             # enkel nog een slag naar remise
+    frontier = np.nonzero(no_moves & no_exits & in_check)[0]       # mat
+    values[frontier] = -1
+
+    # zetten naar andere tabellen beslissen een stelling pas op hun eigen laag
+    scheduled_wins = {}
+    candidates = np.nonzero(legal & (win_exit > 0))[0]
+    for layer in np.unique(win_exit[candidates]):
+        scheduled_wins[int(layer)] = candidates[win_exit[candidates] == layer]
+    scheduled_losses = {}
+    waiting = np.nonzero(no_moves & (win_exit == 0) & ~draw_exit & (loss_exit > 0))[0]
+    for layer in np.unique(loss_exit[waiting]):
+        scheduled_losses[int(layer)] = waiting[loss_exit[waiting] == layer]
+
+    layer = 0
+    while frontier.size or any(k > layer for k in list(scheduled_wins) + list(scheduled_losses)):
+        layer += 1
+        if layer > TB_MAX_LAYER:
+            raise ValueError(f"{layout.signature}: distance to mate does not fit in a byte")
+        found = []
+        for start in range(0, frontier.size, _FRONTIER_BATCH):
+            batch = frontier[start:start + _FRONTIER_BATCH]
+            for stm in (SIDE_WHITE, SIDE_BLACK):
+                part = batch[batch // layout.half == stm]
+                if part.size:
+                    found.append(_unmoves(layout, part, illegal))
+        preds = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+        if layer % 2:
+            # de voorgangers van verloren stellingen zijn gewonnen
+            new = preds[values[preds] == _UNKNOWN]
+            extra = scheduled_wins.pop(layer, None)
+            if extra is not None:
+                new = np.concatenate([new, extra[values[extra] == _UNKNOWN]])
+            new = np.unique(new)
+            values[new] = layer
+        else:
+            # een zet minder die niet naar een gewonnen stelling leidt; op 0 is de stelling verloren
+            np.subtract.at(count, preds, 1)
+            done = np.unique(preds)
+            done = done[(count[done] == 0) & (values[done] == _UNKNOWN) & (win_exit[done] == 0) & ~draw_exit[done]]
+            later = loss_exit[done] > layer
+            for k in np.unique(loss_exit[done][later]):
+                waiting = done[later & (loss_exit[done] == k)]
+                scheduled_losses[int(k)] = np.concatenate([scheduled_losses.get(int(k), waiting[:0]), waiting])
+            new = done[~later]
+            extra = scheduled_losses.pop(layer, None)
+            if extra is not None:
+                new = np.unique(np.concatenate([new, extra[values[extra] == _UNKNOWN]]))
+            values[new] = -(layer + 1)
+        frontier = new
+    values[values == _UNKNOWN] = 0
+    return values
+
+
+def write_table(path, values):
+    # Blokken van TB_BLOCK_ENTRIES waarden, elk apart gecomprimeerd, met de offsets vooraan
+    data = values.astype(np.int8).tobytes()
+    blocks = [zlib.compress(data[i:i + TB_BLOCK_ENTRIES], 9) for i in range(0, len(data), TB_BLOCK_ENTRIES)]
+    offsets = np.zeros(len(blocks) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(block) for block in blocks])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(TB_MAGIC, TB_VERSION, TB_BLOCK_ENTRIES, len(data)))
+        f.write(offsets.tobytes())
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp_path, path)
+
+
+def build_tablebase(signature, directory, processes=None, log=None):
+    """
+    Bouwt de tabel voor signature (bv. "KRK") in directory, samen met de kleinere tabellen die ze nodig heeft
+    en die er nog niet zijn. Geeft per opgebouwde tabel een dict met de statistieken.
+    """
+    layout = _Layout(signature)
+    if canonical(*[[t for s, t in layout.pieces if s == side] for side in (SIDE_WHITE, SIDE_BLACK)]) \
+            != (signature, False):
+        raise ValueError(f"{signature} is not in canonical form (strongest side first, pieces in order {_ORDER})")
+    if layout.n > TB_MAX_MEN:
+        raise ValueError(f"{signature}: at most {TB_MAX_MEN} pieces")
+    os.makedirs(directory, exist_ok=True)
+    results = []
+    for required in required_tables(signature):
+        if not os.path.exists(table_path(directory, required)):
+            results.extend(build_tablebase(required, directory, processes, log))
+
+    start = time.perf_counter()
+    work_dir = directory
+    _work_files(work_dir, layout, "w+")
+    chunks = range(layout.size // layout.chunk)
+    with mp.Pool(processes) as pool:
+        pool.map(_pass_legal, [(signature, work_dir, c) for c in chunks])
+        pool.map(_pass_moves, [(signature, work_dir, directory, c) for c in chunks])
+    files = _work_files(work_dir, layout, "r")
+    values = _retrograde(layout, files)
+    files = None
+    for name, _ in _WORK_ARRAYS:
+        os.remove(os.path.join(work_dir, f"{signature}.{name}.npy"))
+    path = table_path(directory, signature)
+    write_table(path, values)
+    decisive = values[values != TB_ILLEGAL]
+    result = {
+        "table": signature,
+        "positions": int(decisive.size),
+        "wins": int((decisive > 0).sum()),
+        "losses": int((decisive < 0).sum()),
+        "draws": int((decisive == 0).sum()),
+        "longest_mate": int(decisive.max(initial=0)),
+        "bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - start,
+    }
+    if log is not None:
+        log(result)
+    results.append(result)
+    return results
+
+
+# ---------- opzoeken ----------
+
+class TablebaseFile:
+    """
+    1 tabel op schijf, via mmap. Een blok wordt pas uitgepakt als er een index in gevraagd wordt,
+    de laatste TB_CACHE_BLOCKS blokken blijven bewaard.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.block_entries, self.entries = _HEADER.unpack_from(self.mm, 0)
+        if magic != TB_MAGIC or version != TB_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a tablebase (version {TB_VERSION})")
+        blocks = (self.entries + self.block_entries - 1) // self.block_entries
+        self.offsets = struct.unpack_from(f"<{blocks + 1}Q", self.mm, _HEADER.size)
+        self.data_pos = _HEADER.size + 8 * (blocks + 1)
+        self.cache = {}
+
+    def value(self, index):
+        block_id, i = divmod(index, self.block_entries)
+        block = self.cache.get(block_id)
+        if block is None:
+            start = self.data_pos + self.offsets[block_id]
+            block = zlib.decompress(self.mm[start:self.data_pos + self.offsets[block_id + 1]])
+            if len(self.cache) >= TB_CACHE_BLOCKS:
+                # het oudste blok eruit (dicts houden de volgorde van toevoegen bij)
+                del self.cache[next(iter(self.cache))]
+            self.cache[block_id] = block
+        value = block[i]
+        return value - 256 if value > 127 else value
+
+    def close(self):
+        self.cache = {}
+        self.mm.close()
+        self.file.close()
+
+
+class Tablebases:
+    """
+    Alle tabellen (*.tcb) in een map. probe(board) geeft de waarde voor de speler aan zet (zie bovenaan),
+    of None als er geen tabel is, of als de stelling nog rokade- of en passant rechten heeft.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.paths = {}
+        for name in os.listdir(directory):
+            if name.endswith(TB_SUFFIX):
+                self.paths[name[:-len(TB_SUFFIX)]] = os.path.join(directory, name)
+        self.tables = {}
+        self.layouts = {}
+        self.max_men = max((len(signature) for signature in self.paths), default=0)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _table(self, signature):
+        table = self.tables.get(signature)
+        if table is None and signature in self.paths:
+            table = self.tables[signature] = TablebaseFile(self.paths[signature])
+            self.layouts[signature] = _Layout(signature)
+        return table
+
+    def probe(self, board):
+        if board.castling or board.ep_square >= 0:
+            return None
+        pieces = board.pieces
+        white = [t for t in range(6) for _ in range(pieces[SIDE_WHITE][t].bit_count())]
+        black = [t for t in range(6) for _ in range(pieces[SIDE_BLACK][t].bit_count())]
+        signature, flipped = canonical(white, black)
+        table = self._table(signature)
+        if table is None:
+            return None
+        layout = self.layouts[signature]
+        flip = 56 if flipped else 0
+        index = (board.side ^ flipped) * layout.half
+        used = {}
+        for (side, piece_type), weight in zip(layout.pieces, layout.weights):
+            # bij twee gelijke stukken maakt de volgorde niet uit, de tabel bevat beide
+            key = (side ^ flipped, piece_type)
+            bb = used.get(key, pieces[key[0]][piece_type])
+            sq = (bb & -bb).bit_length() - 1
+            used[key] = bb ^ (1 << sq)
+            index += (sq ^ flip) * weight
+        value = table.value(index)
+        return None if value == TB_ILLEGAL else value
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def tablebase_dir(directory=TABLEBASE_DIR):
+    # Een relatief pad hoort bij de map van deze module, niet bij de map van waaruit gestart werd (zoals BOOK_FILE)
+    if directory and not os.path.isabs(directory):
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), directory)
+    return directory
+
+
+def load_tablebases(directory):
+    # De tabellen in directory, of None als de map niet bestaat (het spel werkt ook zonder)
+    directory = tablebase_dir(directory)
+    return Tablebases(directory) if directory and os.path.isdir(directory) else None
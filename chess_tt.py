@@ -0,0 +1,141 @@
+from array import array
+from game_constants import HASH_SIZE_MB
+
+"""
+   TranspositionTable: vaste tabel met zoekresultaten, geindexeerd op de Zobrist sleutel van ChessBoard
+   Het geheugen wordt 1 keer gereserveerd volgens een budget in MB, de tabel groeit nooit.
+
+   Per bucket 2 entries:
+     slot 0: depth-preferred, wordt enkel overschreven door een diepere zoektocht of als het verouderd is
+     slot 1: always-replace
+   Een entry is 2 woorden van 64 bit: (sleutel XOR data, data). Zo kan een half geschreven entry
+   nooit voor een andere stelling doorgaan (nodig als de tabel gedeeld wordt tussen processen).
+
+   data = move (16 bits) | score + 32768 (16 bits) | depth (8 bits) | bound (2 bits) | generation (6 bits)
+"""
+
+BOUND_NONE, BOUND_UPPER, BOUND_LOWER, BOUND_EXACT = 0, 1, 2, 3
+
+BUCKET_ENTRIES = 2
+ENTRY_WORDS = 2
+BUCKET_BYTES = BUCKET_ENTRIES * ENTRY_WORDS * 8
+GENERATION_MASK = 63
+
+
+def pack_entry(move, score, depth, bound, generation):
+    return move | (score + 32768) << 16 | depth << 32 | bound << 40 | generation << 42
+
+
+def unpack_entry(data):
+    # Returns (move, score, depth, bound)
+    return data & 0xFFFF, (data >> 16 & 0xFFFF) - 32768, data >> 32 & 0xFF, data >> 40 & 3
+
+
+def table_bytes(size_mb):
+    # Aantal bytes van de tabel: de grootste macht van 2 aan buckets binnen het budget,
+    # zodat de index een masker is
+    buckets = 1
+    while buckets * 2 * BUCKET_BYTES <= size_mb * 1024 * 1024:
+        buckets *= 2
+    return buckets * BUCKET_BYTES
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=HASH_SIZE_MB, buffer=None):
+        # :param buffer: optioneel geheugen van buiten (bv. multiprocessing.shared_memory), anders een eigen array
+        nbytes = table_bytes(size_mb)
+        self.size_mb = size_mb
+        self.buckets = nbytes // BUCKET_BYTES
+        self.mask = self.buckets - 1
+        if buffer is None:
+            self.words = array("Q", bytes(nbytes))
+        else:
+            self.words = memoryview(buffer)[:nbytes].cast("Q")
+        self.generation = 0
+        self.reset_stats()
+
+    def release(self):
+        # Nodig voor gedeeld geheugen: het geheugen kan pas gesloten worden als er geen view meer naar verwijst
+        if isinstance(self.words, memoryview):
+            self.words.release()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0        # wordt door de zoekfunctie verhoogd als een entry de zoektocht afbreekt
+        self.stores = 0
+        self.overwrites = 0     # een geldige entry van een andere stelling werd vervangen
+
+    def clear(self):
+        self.words[:] = array("Q", bytes(len(self.words) * 8))
+        self.generation = 0
+
+    def new_search(self):
+        # Entries van vorige zoektochten verouderen, ze worden dan eerst vervangen
+        self.generation = (self.generation + 1) & GENERATION_MASK
+
+    def probe(self, key):
+        """
+        Zoekt de stelling op. Geeft (move, score, depth, bound) terug of None.
+        """
+        self.probes += 1
+        words = self.words
+        base = (key & self.mask) << 2
+        data = words[base + 1]
+        if words[base] ^ data == key and data:
+            self.hits += 1
+            return data & 0xFFFF, (data >> 16 & 0xFFFF) - 32768, data >> 32 & 0xFF, data >> 40 & 3
+        data = words[base + 3]
+        if words[base + 2] ^ data == key and data:
+            self.hits += 1
+            return data & 0xFFFF, (data >> 16 & 0xFFFF) - 32768, data >> 32 & 0xFF, data >> 40 & 3
+        return None
+
+    def store(self, key, depth, bound, score, move=0):
+        self.stores += 1
+        words = self.words
+        base = (key & self.mask) << 2
+        generation = self.generation
+
+        old = words[base + 1]
+        old_key = words[base] ^ old
+        if old_key == key or not old or (old >> 42) != generation or depth >= (old >> 32 & 0xFF):
+            slot = base
+        else:
+            slot = base + 2
+            old = words[base + 3]
+            old_key = words[base + 2] ^ old
+
+        if old_key == key:
+            if not move:
+                # zelfde stelling zonder nieuwe beste zet: de oude zet bijhouden
+                move = old & 0xFFFF
+        elif old:
+            self.overwrites += 1
+        data = move | (score + 32768) << 16 | depth << 32 | bound << 40 | generation << 42
+        words[slot] = key ^ data
+        words[slot + 1] = data
+
+    def hashfull(self):
+        # Per mille van de entries (in de eerste 1000 buckets) gevuld tijdens de huidige zoektocht
+        words = self.words
+        sample = min(1000, self.buckets)
+        used = 0
+        for base in range(0, sample * 4, 2):
+            data = words[base + 1]
+            if data and data >> 42 == self.generation:
+                used += 1
+        return used * 1000 // (sample * BUCKET_ENTRIES)
+
+    def stats(self):
+        return {
+            "size_mb": self.size_mb,
+            "entries": self.buckets * BUCKET_ENTRIES,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "cutoffs": self.cutoffs,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "hashfull": self.hashfull(),
+        }
@@ -1,11 +1,19 @@
 from game_constants import *
 from evt_obj import EvtObj
+from game_profiler import FrameProfiler
 import time as t
-import pygame as pg
+if not HEADLESS:
+    import pygame as pg
 
 """
 Generieke klasse Game die basisfunctionaliteiten voor een game beheert
 Heeft niets te maken met de specifieke functionaliteiten zoals die van van een schaakspel
+Muis events gaan enkel naar de GameArea onder de muis (hit-test op area.rect, met event.pos):
+    - na MOUSEBUTTONDOWN houdt die area de muis vast (capture) tot MOUSEBUTTONUP,
+      ook als er buiten haar rechthoek gesleept of losgelaten wordt
+    - opeenvolgende MOUSEMOTION events worden samengevoegd: enkel de laatste positie wordt doorgegeven,
+      dus slepen kost 1 dispatch per frame hoeveel events er ook binnenkomen
+Elke cyclus wordt gemeten door self.profiler (game_profiler), PROFILER_KEY toont de overlay
 """
 class Game(EvtObj):
     def __init__(self, window, clock):
@@ -14,27 +22,120 @@ class Game(EvtObj):
         self.clock = clock
         self.keep_running = True
         self.last_cycle = t.time()
+        # rechthoeken die deze frame getekend werden; full_redraw tekent het hele venster (eerste frame)
+        self.dirty_rects = []
+        self.full_redraw = True
+        # schermgebieden (GameArea), in te vullen door de afgeleide klasse; de laatste ligt bovenaan
+        self.areas = []
+        # area die de muis vasthoudt tussen MOUSEBUTTONDOWN en MOUSEBUTTONUP, en de area onder de muis
+        self.captured = None
+        self.hovered = None
+        self.mouse_pos = (0, 0)
+        # tellers: alle events, binnengekomen MOUSEMOTION events en hoeveel er doorgegeven werden
+        self.events = 0
+        self.motion_events = 0
+        self.motion_dispatches = 0
+        self.profiler = FrameProfiler()
+        # idle mode: het event waarop gewacht werd, en de tellers voor loop_stats
+        self.waited_event = None
+        self.last_cycle_cpu = t.process_time()
+        self.frames = 0
+        self.idle_frames = 0
+        self.idle_seconds = 0.0
+        self.idle_cpu_seconds = 0.0
+
     def handle_events(self):
         """
         Deze functie zet pygame events om naar onze eigen handige routines
         Je kan dan bijvoorbeeld de functie self.MOUSEBUTTONDOWN(x, y) oproepen,
         zonder te weten hoe de pygame eventhandler dit opslaat.
         """
-        # Keyboard Events are already filtered out
-        for event in pg.event.get():
+        # KEYDOWN gaat naar self.KEYDOWN met de naam van de toets (profiler, tip, ...)
+        events = pg.event.get()
+        if self.waited_event is not None:
+            events.insert(0, self.waited_event)
+            self.waited_event = None
+        self.events += len(events)
+        motion = None
+        for event in events:
+            if event.type == pg.MOUSEMOTION:
+                # enkel de laatste positie telt, die wordt doorgegeven voor de volgende klik of op het einde
+                motion = event.pos
+                self.motion_events += 1
+                continue
             if event.type == pg.QUIT:
                 self.keep_running = False
             if event.type == pg.MOUSEWHEEL:
                 self.MOUSEWHEEL(event.y)
-            if event.type == pg.MOUSEBUTTONDOWN:
-                mouse_x, mouse_y = pg.mouse.get_pos()
-                self.MOUSEBUTTONDOWN(mouse_x, mouse_y)
-            if event.type == pg.MOUSEBUTTONUP:
-                mouse_x, mouse_y = pg.mouse.get_pos()
-                self.MOUSEBUTTONUP(mouse_x, mouse_y)
-            if event.type == pg.MOUSEMOTION:
-                mouse_x, mouse_y = pg.mouse.get_pos()
-                self.MOUSEMOTION(mouse_x, mouse_y)
+            if event.type == pg.KEYDOWN:
+                self.KEYDOWN(pg.key.name(event.key))
+            if event.type == pg.MOUSEBUTTONDOWN or event.type == pg.MOUSEBUTTONUP:
+                if motion is not None:
+                    self.MOUSEMOTION(*motion)
+                    motion = None
+                if event.type == pg.MOUSEBUTTONDOWN:
+                    self.MOUSEBUTTONDOWN(*event.pos)
+                else:
+                    self.MOUSEBUTTONUP(*event.pos)
+        if motion is not None:
+            self.MOUSEMOTION(*motion)
+
+    def KEYDOWN(self, key):
+        # key: de naam van pygame ("f3", "a", "space", ...)
+        if key == PROFILER_KEY:
+            self.profiler.toggle()
+            if not self.profiler.visible:
+                # wat onder de overlay lag opnieuw tekenen
+                self.full_redraw = True
+        elif key == PROFILER_EXPORT_KEY:
+            self.profiler.write_csv(PROFILER_CSV)
+
+    def area_at(self, mouse_x, mouse_y):
+        # De bovenste area waarvan de rechthoek (mouse_x, mouse_y) bevat, None als er geen is
+        for area in reversed(self.areas):
+            if area.isMouseWithin(mouse_x, mouse_y):
+                return area
+        return None
+
+    def MOUSEBUTTONDOWN(self, mouse_x, mouse_y):
+        self.mouse_pos = (mouse_x, mouse_y)
+        area = self.area_at(mouse_x, mouse_y)
+        if area is not None:
+            self.captured = area
+            area.isPressed = True
+            area.MOUSEBUTTONDOWN(mouse_x, mouse_y)
+
+    def MOUSEBUTTONUP(self, mouse_x, mouse_y):
+        # Naar de area die de muis vasthoudt, ook als de muis intussen erbuiten staat
+        self.mouse_pos = (mouse_x, mouse_y)
+        area = self.captured if self.captured is not None else self.area_at(mouse_x, mouse_y)
+        self.captured = None
+        if area is not None:
+            area.isPressed = area.isDragged = False
+            area.MOUSEBUTTONUP(mouse_x, mouse_y)
+
+    def MOUSEMOTION(self, mouse_x, mouse_y):
+        self.mouse_pos = (mouse_x, mouse_y)
+        self.motion_dispatches += 1
+        area = self.captured
+        if area is not None:
+            area.isDragged = True
+        else:
+            area = self.area_at(mouse_x, mouse_y)
+            if area is not self.hovered:
+                if self.hovered is not None:
+                    self.hovered.isWithin = False
+                if area is not None:
+                    area.isWithin = True
+                self.hovered = area
+        if area is not None:
+            area.MOUSEMOTION(mouse_x, mouse_y)
+
+    def MOUSEWHEEL(self, wheel):
+        # Een wiel event heeft geen positie: de laatst gekende positie van de muis
+        area = self.captured if self.captured is not None else self.area_at(*self.mouse_pos)
+        if area is not None:
+            area.MOUSEWHEEL(wheel)
 
     def update_data(self):
         # whatever needs to changed (used for animation or special effects)
@@ -42,22 +143,91 @@ class Game(EvtObj):
 
     def draw(self):
         # whatever needs to drawn happens here
+        # zet de gewijzigde rechthoeken in self.dirty_rects, enkel die gaan naar pg.display.update
         pass
 
+    def execute_background(self, budget_ms):
+        # Achtergrondwerk (bv. de schaakmotor) mag hier budget_ms milliseconden rekenen
+        pass
+
+    def is_busy(self):
+        # True zolang er iets beweegt of rekent (animatie, slepen, motor); anders mag de lus slapen
+        return self.full_redraw
+
+    def background_budget_ms(self):
+        # Wat overblijft van het frame na events en tekenen, met een maximum van ENGINE_SLICE_MS
+        # Zonder venster is er geen frame: de motor mag telkens HEADLESS_SLICE_MS rekenen
+        if HEADLESS:
+            return HEADLESS_SLICE_MS
+        remaining = 1000 / FRAME_RATE - (t.time() - self.last_cycle) * 1000 - FRAME_MARGIN_MS
+        return max(0.0, min(ENGINE_SLICE_MS, remaining))
+
     # execute_cycle is typically called from the main loop
     # execute_cycle can be called from 'background' routine like an AI-learning cycle
     # we can then play the game while the AI learns in the background
+    # (chess_selfplay speelt zonder venster partijen over meerdere processen om trainingsdata te maken)
     def execute_cycle(self):
         self.last_cycle = t.time()
-        self.handle_events()
+        self.last_cycle_cpu = t.process_time()
+        self.frames += 1
+        profiler = self.profiler
+        profiler.begin_frame()
+        if not HEADLESS:
+            self.handle_events()
+            profiler.lap("events")
         self.update_data()
-        self.draw()
+        profiler.lap("update")
+        if not HEADLESS:
+            self.draw()
+            profiler.lap("draw")
+        self.execute_background(self.background_budget_ms())
+        profiler.lap("engine")
+        if profiler.visible:
+            self.draw_profiler()
+        profiler.end_frame(self.events)
         return self.keep_running
 
+    def draw_profiler(self):
+        # De overlay ligt over de areas: opnieuw naar het scherm als ze veranderde of er iets onder getekend werd
+        if self.profiler.draw(self.win) or self.dirty_rects:
+            self.dirty_rects.append(PROFILER_RECT)
+
+    def update_display(self):
+        # Enkel wat veranderd is naar het scherm; niets veranderd, dan ook geen display update
+        if self.dirty_rects:
+            pg.display.update(self.dirty_rects)
+            self.dirty_rects = []
+
+    def wait_next_frame(self):
+        # Is er niets te doen, dan slapen tot er een event komt (maximaal IDLE_WAIT_MS), anders FRAME_RATE
+        # Met de profiler overlay zichtbaar hoogstens PROFILER_REFRESH_MS, zodat de overlay blijft bijwerken
+        if IDLE_MODE and not self.is_busy():
+            event = pg.event.wait(min(IDLE_WAIT_MS, PROFILER_REFRESH_MS) if self.profiler.visible else IDLE_WAIT_MS)
+            if event.type != pg.NOEVENT:
+                self.waited_event = event
+            self.idle_frames += 1
+            self.idle_seconds += t.time() - self.last_cycle
+            self.idle_cpu_seconds += t.process_time() - self.last_cycle_cpu
+        else:
+            self.clock.tick(FRAME_RATE)
+
+    def loop_stats(self):
+        # idle_cpu_percent: processortijd van de lus tijdens de rustige frames, in % van de verstreken tijd
+        return {
+            "frames": self.frames,
+            "idle_frames": self.idle_frames,
+            "idle_seconds": self.idle_seconds,
+            "idle_cpu_percent": 100 * self.idle_cpu_seconds / self.idle_seconds if self.idle_seconds else 0.0,
+            "events": self.events,
+            "motion_events": self.motion_events,
+            "motion_dispatches": self.motion_dispatches,
+        }
+
     def execute(self):
         while self.execute_cycle():
-            pg.display.update()
-            self.clock.tick(FRAME_RATE)
+            if not HEADLESS:
+                self.update_display()
+                self.wait_next_frame()
 
     def execute_from_background(self):
         elapsed_time = t.time() - self.last_cycle
@@ -1,13 +1,17 @@
+import time
 from game_constants import *
 from colors import *
 from evt_obj import EvtObj
-import pygame as pg
+if not HEADLESS:
+    import pygame as pg
 
 class GameArea(EvtObj):
     """
     Generieke klasse die een deel van het scherm afbakend
     Alle schermgebieden worden hiervan afgeleid
     GameArea is afgeleid van EvtObj zodat het user events kan ontvangen
+    Een area wordt enkel opnieuw getekend als ze dirty is (mark_dirty na elke wijziging van wat ze toont):
+    redraw() geeft dan de rechthoek terug die naar het scherm moet, anders None
     """
     def __init__(self, game, r):
         # :param game: wordt mee doorgegeven zodat we toegang hebben tot alle spelparameters en structuren
@@ -15,6 +19,36 @@ class GameArea(EvtObj):
         EvtObj.__init__(self)
         self.game = game
         self.rect = r
+        self.dirty = True
+        # naam van deze area in de profiler (draw:ChessBoard, draw:History, ...)
+        self.profile_name = "draw:" + type(self).__name__.removeprefix("GameArea")
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def isMouseWithin(self, mouse_x, mouse_y):
+        # Hit-test voor Game.area_at: ligt de muis binnen de rechthoek van deze area
+        x, y, w, h = self.rect
+        return x <= mouse_x < x + w and y <= mouse_y < y + h
+
+    def set_rect(self, r):
+        # Andere plaats of grootte (bv. na een resize van het venster)
+        self.rect = r
+        self.mark_dirty()
+
+    def redraw(self):
+        # Tekent de area opnieuw als ze dirty is, binnen haar eigen rechthoek; geeft die rechthoek of None
+        if not self.dirty:
+            return None
+        self.dirty = False
+        win = self.game.win
+        win.set_clip(self.rect)
+        win.fill(GAME_BG_COLOR, self.rect)
+        start = time.perf_counter()
+        self.draw()
+        self.game.profiler.add(self.profile_name, (time.perf_counter() - start) * 1000)
+        win.set_clip(None)
+        return self.rect
 
     def frame_area(self):
         # Tekent een kader rond de game area
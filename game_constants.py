@@ -1,9 +1,34 @@
 # central place for all game constants
 # can become chess.ini file later
+import os
+
+# Headless: no window, no pygame import, no frame limiter (batch self-play, servers)
+# Set TURING_HEADLESS=1 in the environment, or start main.py with --headless
+HEADLESS = os.environ.get("TURING_HEADLESS", "") not in ("", "0")
+HEADLESS_SLICE_MS = 1000   # engine time per cycle when there is no frame to keep smooth
 WINDOW_WIDTH, WINDOW_HEIGHT = 1024, 800
 GAME_BG_COLOR = (135, 206, 235)
 FRAME_RATE = 60
+IDLE_MODE = True           # sleep in pg.event.wait when nothing moves and the engine is idle
+IDLE_WAIT_MS = 500         # longest sleep before the loop runs one cycle anyway
 PLAYER_RECT = (4,4,200,600)
 GAME_RECT = (208,4,608,600)
+BOARD_THEME = "brown"       # light/dark square colors, see BOARD_THEMES in chess_render
 HIST_RECT = (820,4,200,600)
-CONTROL_RECT = (4,608,1016,186)
\ No newline at end of file
+CONTROL_RECT = (4,608,1016,186)
+HASH_SIZE_MB = 64          # transposition table budget, can be overridden with --hash
+ENGINE_SLICE_MS = 10       # max engine time per frame, the rest of the frame is for events and drawing
+FRAME_MARGIN_MS = 2        # kept free per frame for pg.display.update
+ENGINE_MOVE_TIME = 5.0     # seconds the engine thinks per move
+PONDER = True              # the engine keeps searching on the expected reply while the human thinks
+PONDER_MAX_TIME = 30.0     # seconds of pondering at most, then the engine rests so the idle mode can sleep
+PLAYER_HUMAN, PLAYER_ENGINE = "human", "engine"
+PROFILER_KEY = "f3"        # shows/hides the frame profiler overlay (pygame key name)
+PROFILER_EXPORT_KEY = "f4" # writes the profiler frames to PROFILER_CSV
+PROFILER_CSV = "profile.csv"
+HINT_KEY = "h"             # shows the best book move on the board (chess_area_game.hint)
+PROFILER_FRAMES = 600      # rolling window for the percentiles
+PROFILER_REFRESH_MS = 250  # the overlay text is rebuilt at most this often
+PROFILER_RECT = (8, 612, 400, 178)
+BOOK_FILE = "book.bin"     # opening book (chess_book), the game runs without it if the file is missing
+TABLEBASE_DIR = "tablebases"   # endgame tables (chess_tablebase), idem; both relative to the source folder
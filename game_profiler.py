@@ -0,0 +1,142 @@
+import csv
+import math
+import time as t
+from collections import deque
+from game_constants import HEADLESS, PROFILER_FRAMES, PROFILER_REFRESH_MS, PROFILER_RECT
+from colors import *
+if not HEADLESS:
+    import pygame as pg
+
+"""
+   Meet per frame hoe lang de delen van de spellus duren, over de laatste PROFILER_FRAMES frames:
+       events     Game.handle_events
+       update     Game.update_data
+       draw       Game.draw, met daarin draw:<area> voor elke GameArea die getekend werd
+       engine     Game.execute_background (de schijf van de motor)
+       frame      de hele cyclus, zonder het wachten op het volgende frame
+   Daaruit p50/p95/p99 per deel (in ms), events per seconde en knopen van de motor per frame.
+   De overlay (toets PROFILER_KEY) toont dat bovenop het venster, write_csv schrijft elk frame als 1 rij.
+
+   profiler.begin_frame()
+   ...; profiler.lap("events")             # tijd sinds de vorige lap of begin_frame
+   profiler.add("draw:Board", ms)          # een deel binnen een ander deel
+   profiler.end_frame(game.events)
+"""
+
+
+def percentile(values, p):
+    # Nearest-rank percentiel van een gesorteerde lijst
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p * len(values) / 100) - 1)]
+
+
+class FrameProfiler:
+    def __init__(self, frames=PROFILER_FRAMES):
+        # per frame: (tijdstip, events, knopen, {deel: ms})
+        self.rows = deque(maxlen=frames)
+        self.sections = []
+        self.current = {}
+        self.nodes = 0
+        self.events_total = 0
+        self.frame_start = self.mark = t.perf_counter()
+        self.visible = False
+        self.surface = None
+        self.font = None
+        self.rendered = 0.0
+
+    def begin_frame(self):
+        self.current = {}
+        self.nodes = 0
+        self.frame_start = self.mark = t.perf_counter()
+
+    def add(self, name, ms):
+        current = self.current
+        if name not in current:
+            current[name] = 0.0
+            if name not in self.sections:
+                self.sections.append(name)
+        current[name] += ms
+
+    def lap(self, name):
+        now = t.perf_counter()
+        self.add(name, (now - self.mark) * 1000)
+        self.mark = now
+
+    def add_nodes(self, nodes):
+        self.nodes += nodes
+
+    def end_frame(self, events_total):
+        # events_total: de teller van Game, het verschil met het vorige frame zijn de events van dit frame
+        now = t.perf_counter()
+        self.add("frame", (now - self.frame_start) * 1000)
+        self.rows.append((now, events_total - self.events_total, self.nodes, self.current))
+        self.events_total = events_total
+
+    def summary(self):
+        rows = self.rows
+        result = {"frames": len(rows)}
+        for name in self.sections:
+            values = sorted(row[3][name] for row in rows if name in row[3])
+            if not values:
+                # dit deel kwam in geen enkel frame van het venster meer voor (bv. een area die niet hertekend werd)
+                continue
+            result[name] = {"p50": percentile(values, 50), "p95": percentile(values, 95),
+                            "p99": percentile(values, 99)}
+        seconds = rows[-1][0] - rows[0][0] if len(rows) > 1 else 0.0
+        # het eerste frame van het venster telt enkel als begin van de tijdspanne
+        result["events_per_sec"] = sum(row[1] for row in list(rows)[1:]) / seconds if seconds else 0.0
+        result["nodes_per_frame"] = sum(row[2] for row in rows) / len(rows) if rows else 0.0
+        return result
+
+    def write_csv(self, path):
+        # 1 rij per frame in het venster; een deel dat in een frame niet voorkwam blijft leeg
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "time_s", "events", "nodes"] + [name + "_ms" for name in self.sections])
+            start = self.rows[0][0] if self.rows else 0.0
+            for i, (when, events, nodes, sections) in enumerate(self.rows):
+                writer.writerow([i, f"{when - start:.4f}", events, nodes] +
+                                [f"{sections[name]:.4f}" if name in sections else "" for name in self.sections])
+        return len(self.rows)
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.surface = None
+
+    def table(self):
+        # De regels van de overlay, als lijsten van kolommen
+        summary = self.summary()
+        rows = [["ms", "p50", "p95", "p99"]]
+        for name in self.sections:
+            s = summary.get(name)
+            if s is None:
+                continue
+            rows.append([name, f"{s['p50']:.2f}", f"{s['p95']:.2f}", f"{s['p99']:.2f}"])
+        rows.append([f"events/s {summary['events_per_sec']:.1f}    nodes/frame {summary['nodes_per_frame']:.0f}"
+                     f"    frames {summary['frames']}"])
+        return rows
+
+    def draw(self, win):
+        # De tekst wordt hoogstens om de PROFILER_REFRESH_MS opnieuw opgebouwd, daartussen enkel geblit.
+        # Geeft True als de overlay veranderd is
+        now = t.perf_counter()
+        refreshed = self.surface is None or (now - self.rendered) * 1000 >= PROFILER_REFRESH_MS
+        if refreshed:
+            if self.font is None:
+                if not pg.font.get_init():
+                    pg.font.init()
+                self.font = pg.font.Font(None, 18)
+            font = self.font
+            self.surface = pg.Surface(PROFILER_RECT[2:])
+            self.surface.fill(DKGRAY)
+            # het standaard font is niet monospace: de getallen rechts uitlijnen in vaste kolommen
+            for i, row in enumerate(self.table()):
+                y = 4 + i * 15
+                self.surface.blit(font.render(row[0], True, WHITE), (6, y))
+                for j, cell in enumerate(row[1:]):
+                    text = font.render(cell, True, WHITE)
+                    self.surface.blit(text, (190 + 60 * j - text.get_width(), y))
+            self.rendered = now
+        win.blit(self.surface, PROFILER_RECT[:2])
+        return refreshed
@@ -1,12 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+parser = argparse.ArgumentParser(description="Hector Chess")
+parser.add_argument("--headless", action="store_true", help="no window and no pygame: engine against engine")
+parser.add_argument("--games", type=int, default=1, help="number of games in headless mode")
+parser.add_argument("--time", type=float, default=None, help="seconds per engine move")
+parser.add_argument("--depth", type=int, default=None, help="maximum search depth per engine move")
+parser.add_argument("--profile-csv", default=None,
+                    help="window mode: write the frame profiler samples to this CSV file on exit")
+args = parser.parse_args()
+if args.headless:
+    # moet voor de import van game_constants gebeuren: die beslist of pygame geladen wordt
+    os.environ["TURING_HEADLESS"] = "1"
+
 from game_constants import *
 from chess_game import ChessGame
-import pygame as pg
-pg.init()
-
-#GAME SPECIFIC BLOCK
-pg.display.set_caption("Hector Chess - Sint-Pieterscollege, Jette")
-win = pg.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-clock = pg.time.Clock()
-theGame = ChessGame(win, clock)
-theGame.execute()
-pg.quit()
+
+if HEADLESS:
+    #HEADLESS BLOCK: de partijen naar stdout als PGN, de doorvoer naar stderr
+    start = time.perf_counter()
+    plies = nodes = 0
+    for number in range(1, args.games + 1):
+        theGame = ChessGame(None, None)
+        theGame.players = [PLAYER_ENGINE, PLAYER_ENGINE]
+        if args.time is not None:
+            theGame.move_time = args.time
+        if args.depth is not None:
+            theGame.max_depth = args.depth
+        theGame.execute()
+        plies += len(theGame.move_history)
+        nodes += theGame.engine_nodes
+        print(theGame.to_pgn({"Event": "Headless", "Round": number}), end="", flush=True)
+    seconds = time.perf_counter() - start
+    print(f"games {args.games}  plies {plies}  seconds {seconds:.1f}  plies/s {plies / seconds:.1f}"
+          f"  nps {nodes / seconds:.0f}", file=sys.stderr)
+else:
+    import pygame as pg
+    pg.init()
+
+    #GAME SPECIFIC BLOCK
+    pg.display.set_caption("Hector Chess - Sint-Pieterscollege, Jette")
+    win = pg.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    clock = pg.time.Clock()
+    theGame = ChessGame(win, clock)
+    theGame.execute()
+    pg.quit()
+    stats = theGame.loop_stats()
+    print(f"frames {stats['frames']}  idle frames {stats['idle_frames']}  idle cpu {stats['idle_cpu_percent']:.1f}%")
+    if args.profile_csv:
+        print(f"profiler: {theGame.profiler.write_csv(args.profile_csv)} frames written to {args.profile_csv}")